@@ -0,0 +1,125 @@
+"""
+Background syntax and lint checks for the editor.
+
+check_source() compiles a script to find syntax errors and, when pyflakes is
+installed (pip install pyflakes), also reports undefined names, unused
+imports and similar mistakes - all without running the script.
+
+CodeChecker runs those checks on a background thread and caches the
+diagnostics by the SHA-256 of the checked text, so the editor never waits on
+a check and text that was already checked (an unchanged file, a file saved
+again without edits, identical handler variants) is never analyzed twice.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshot_store import content_hash
+
+try:
+    from pyflakes import api as pyflakes_api
+    from pyflakes import messages as pyflakes_messages
+except ImportError:  # Lint checks are optional; syntax checks always run
+    pyflakes_api = None
+
+DEFAULT_MAX_ENTRIES = 500
+
+
+class _Collector:
+    """pyflakes reporter that collects diagnostics instead of printing them."""
+
+    def __init__(self):
+        self.diagnostics = []
+
+    def flake(self, message):
+        severity = "error" if isinstance(message, pyflakes_messages.UndefinedName) else "warning"
+        self.diagnostics.append({"line": message.lineno, "column": message.col, "severity": severity,
+                                 "message": message.message % message.message_args, "source": "pyflakes"})
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        pass  # compile() reports syntax errors before pyflakes runs
+
+    def unexpectedError(self, filename, msg):
+        pass
+
+
+def check_source(text, filename="<editor>"):
+    """
+    Find syntax errors and (with pyflakes installed) lint problems in a script.
+
+    Args:
+        text (str): Python source
+        filename (str): Name used in messages
+
+    Returns:
+        list: Diagnostics as dicts with line (1-based), column (0-based),
+            severity ("error" or "warning"), message and source, by line
+    """
+    try:
+        compile(text, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [{"line": e.lineno or 1, "column": max((e.offset or 1) - 1, 0), "severity": "error",
+                 "message": e.msg, "source": "syntax"}]
+    except ValueError as e:  # e.g. source containing null bytes
+        return [{"line": 1, "column": 0, "severity": "error", "message": str(e), "source": "syntax"}]
+
+    if pyflakes_api is None:
+        return []
+    collector = _Collector()
+    pyflakes_api.check(text, filename, collector)
+    return sorted(collector.diagnostics, key=lambda d: (d["line"], d["column"]))
+
+
+class CodeChecker:
+    """Runs check_source() off the caller's thread and caches results by content hash."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, workers=1):
+        """
+        Args:
+            max_entries (int): Checked texts remembered before the oldest are dropped
+            workers (int): Checks that may run at the same time
+        """
+        self.max_entries = max_entries
+        self.lint_enabled = pyflakes_api is not None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="code-check")
+        self._results = OrderedDict()  # content hash -> Future of the diagnostics
+        self._lock = threading.Lock()
+
+    def submit(self, text, filename="<editor>"):
+        """
+        Start checking text unless it was checked before.
+
+        Returns:
+            str: Content hash to pass to diagnostics()
+        """
+        digest = content_hash(text)
+        with self._lock:
+            if digest in self._results:
+                self._results.move_to_end(digest)
+            else:
+                self._results[digest] = self._executor.submit(check_source, text, filename)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        return digest
+
+    def diagnostics(self, digest):
+        """
+        Diagnostics of submitted text, or None while the check is still running.
+
+        A check that crashed is reported as a single error diagnostic.
+
+        Raises:
+            KeyError: If the digest is unknown or was dropped from the cache;
+                submit() the text again
+        """
+        with self._lock:
+            future = self._results.get(digest)
+        if future is None:
+            raise KeyError(digest)
+        if not future.done():
+            return None
+        error = future.exception()
+        if error is not None:
+            return [{"line": 1, "column": 0, "severity": "error", "source": "checker",
+                     "message": f"The check itself failed: {type(error).__name__}: {error}"}]
+        return future.result()
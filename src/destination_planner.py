@@ -0,0 +1,169 @@
+"""
+Spread MediaConvert output destinations across S3 sub-prefixes.
+
+S3 scales request rates per prefix, so thousands of concurrent outputs under a
+single "transcoded/" prefix get throttled. DestinationPlanner maps every source
+file deterministically onto a sharded sub-prefix of the base destination:
+
+    hash       s3://bucket/transcoded/3f/
+    date       s3://bucket/transcoded/2026/01/12/
+    hash-date  s3://bucket/transcoded/3f/2026/01/12/
+
+The date strategies partition by the day a source is first planned: plan()
+reuses the destination already recorded for the source, so planning the same
+source again on a later day gives the same destination (and the same job
+fingerprint). Pass when= to partition explicitly.
+
+Every planned destination is recorded in a reverse index - one row per source
+in a small SQLite database (.destination_index.db in the project root) - so
+consumers can find outputs without listing the bucket. Recording and looking
+up a source are single indexed statements, however many sources have been
+planned.
+"""
+import hashlib
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX_PATH = os.path.join(PROJECT_ROOT, ".destination_index.db")
+STRATEGIES = ("none", "hash", "date", "hash-date")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS destinations (
+    source TEXT PRIMARY KEY,
+    destination TEXT NOT NULL,
+    output TEXT NOT NULL,
+    strategy TEXT NOT NULL
+);
+"""
+_COLUMNS = ("source", "destination", "output", "strategy")
+
+
+class DestinationPlanner:
+    """Deterministically shard output destinations and remember where they went."""
+
+    def __init__(self, base_destination, strategy="hash", shards=256, index_path=None):
+        """
+        Args:
+            base_destination (str): Base S3 prefix, e.g. s3://my-output-bucket/transcoded/
+            strategy (str): One of "none", "hash", "date" or "hash-date"
+            shards (int): Number of hash shards (hash strategies only)
+            index_path (str): Reverse index database (defaults to .destination_index.db in the project root)
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown destination strategy '{strategy}' (expected one of {', '.join(STRATEGIES)})")
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.base_destination = base_destination if base_destination.endswith("/") else base_destination + "/"
+        self.strategy = strategy
+        self.shards = shards
+        self.index_path = index_path or DEFAULT_INDEX_PATH
+        self._conn = None
+        self._shard_width = len(format(shards - 1, "x"))
+
+    def shard_for(self, input_file_path):
+        """Return the hex shard name for a source path."""
+        digest = hashlib.sha256(input_file_path.encode("utf-8")).digest()
+        return format(int.from_bytes(digest[:8], "big") % self.shards, f"0{self._shard_width}x")
+
+    def plan(self, input_file_path, when=None):
+        """
+        Compute the destination prefix for a source file.
+
+        Args:
+            input_file_path (str): S3 path to the input video file
+            when (datetime): Partition date for the date strategies (defaults to the
+                source's recorded destination, or now (UTC) for a new source)
+
+        Returns:
+            str: Destination prefix ending with "/"
+        """
+        if when is None and self.strategy in ("date", "hash-date"):
+            recorded = self.lookup(input_file_path)
+            if (recorded and recorded["strategy"] == self.strategy
+                    and recorded["destination"].startswith(self.base_destination)):
+                return recorded["destination"]
+        parts = []
+        if self.strategy in ("hash", "hash-date"):
+            parts.append(self.shard_for(input_file_path))
+        if self.strategy in ("date", "hash-date"):
+            when = when or datetime.now(timezone.utc)
+            parts.append(when.strftime("%Y/%m/%d"))
+        if not parts:
+            return self.base_destination
+        return self.base_destination + "/".join(parts) + "/"
+
+    def record(self, input_file_path, destination, name_modifier="", extension="mp4"):
+        """
+        Add a source -> output mapping to the reverse index.
+
+        Args:
+            input_file_path (str): S3 path to the input video file
+            destination (str): Destination prefix returned by plan()
+            name_modifier (str): Output NameModifier appended by MediaConvert
+            extension (str): Output container extension
+
+        Returns:
+            dict: The indexed record
+        """
+        stem = os.path.splitext(os.path.basename(input_file_path))[0]
+        entry = {
+            "source": input_file_path,
+            "destination": destination,
+            "output": f"{destination}{stem}{name_modifier}.{extension}",
+            "strategy": self.strategy,
+        }
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO destinations VALUES (?, ?, ?, ?)",
+                         tuple(entry[column] for column in _COLUMNS))
+        return entry
+
+    def lookup(self, input_file_path):
+        """Return the latest indexed record for a source file, or None."""
+        row = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM destinations WHERE source = ?", (input_file_path,)
+        ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = _open_index(self.index_path)
+        return self._conn
+
+
+def _open_index(index_path):
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.executescript(_SCHEMA)
+    return conn
+
+
+def load_index(index_path=DEFAULT_INDEX_PATH):
+    """
+    Load the whole reverse index as {source: record}.
+
+    Args:
+        index_path (str): Reverse index database
+
+    Returns:
+        dict: Latest record per source path
+    """
+    if not os.path.exists(index_path):
+        return {}
+    conn = _open_index(index_path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM destinations").fetchall()
+    finally:
+        conn.close()
+    return {row[0]: dict(zip(_COLUMNS, row)) for row in rows}
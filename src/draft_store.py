@@ -0,0 +1,225 @@
+"""
+Write-behind autosave drafts of unsaved editor changes.
+
+Edits only reach the server when the editor applies them, and are lost when
+the tab closes unless the file is saved. DraftStore keeps the latest applied
+text of every (owner, file) pair as a draft in .drafts/ (override with
+EDITOR_DRAFTS_DIR), apart from the saved files and their update history.
+
+stage() only records the text in memory and returns. A background thread
+writes a draft once it has not changed for debounce seconds, so a burst of
+edits costs one write. Drafts are stored as a line delta
+(snapshot_store.make_delta) against the saved version of the file, whose
+full text is kept once in the SnapshotStore, so a draft costs roughly the
+size of the unsaved changes.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from file_writer import atomic_write
+from history_store import PROJECT_ROOT
+from snapshot_store import apply_delta, content_hash, make_delta
+
+DEFAULT_DRAFTS_DIR = os.path.join(PROJECT_ROOT, ".drafts")
+DEFAULT_DEBOUNCE = 2.0
+RETRY_DELAY = 1.0  # Seconds before retrying a failed write, doubled after every further failure
+MAX_WRITE_ATTEMPTS = 5
+
+_log = logging.getLogger(__name__)
+
+
+class DraftStore:
+    """Debounced, delta-encoded drafts of unsaved editor text keyed by owner and file."""
+
+    def __init__(self, snapshots, drafts_dir=None, debounce=DEFAULT_DEBOUNCE):
+        """
+        Args:
+            snapshots (SnapshotStore): Where the saved versions drafts are based on are kept
+            drafts_dir (str): Directory for draft files (defaults to .drafts in the project root)
+            debounce (float): Seconds a draft must stay unchanged before it is written
+        """
+        self.snapshots = snapshots
+        self.drafts_dir = drafts_dir or os.environ.get("EDITOR_DRAFTS_DIR", DEFAULT_DRAFTS_DIR)
+        self.debounce = debounce
+        os.makedirs(self.drafts_dir, exist_ok=True)
+        self._info = {}  # (owner, filename) -> (mtime_ns, {"hash", "base", "updated"}) of draft files read
+        self._pending = {}  # (owner, filename) -> (text, base_text, due, failed attempts)
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._write_loop, name="draft-writer", daemon=True)
+        self._thread.start()
+
+    def _path(self, owner, filename):
+        name = hashlib.sha1(f"{owner}\0{filename}".encode("utf-8")).hexdigest()
+        return os.path.join(self.drafts_dir, f"{name}.draft")
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def stage(self, owner, filename, text, base_text):
+        """
+        Record the latest unsaved text of a file; it is written after debounce seconds without changes.
+
+        Args:
+            owner (str): Whose draft it is
+            filename (str): File the draft belongs to
+            text (str): Unsaved editor text
+            base_text (str): The file's saved contents the draft is diffed against
+        """
+        key = (owner, filename)
+        with self._cond:
+            cached = self._info.get(key)
+            if key not in self._pending and cached is not None and cached[1]["hash"] == content_hash(text):
+                return  # Already written
+            self._pending[key] = (text, base_text, time.monotonic() + self.debounce, 0)
+            self._cond.notify()
+
+    def info(self, owner, filename):
+        """
+        Metadata of a file's draft, including drafts written by other server processes.
+
+        Returns:
+            dict: hash, base (content hash of the saved version it is based on),
+                updated ("%Y-%m-%d %H:%M:%S") and pending (not written yet), or None
+        """
+        key = (owner, filename)
+        with self._cond:
+            if key in self._pending:
+                return {"hash": content_hash(self._pending[key][0]), "base": None, "updated": None,
+                        "pending": True}
+            cached = self._info.get(key)
+        path = self._path(owner, filename)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if cached is None or cached[0] != mtime_ns:
+                draft = self._read(path)
+                cached = (mtime_ns, {"hash": draft["hash"], "base": draft["base"], "updated": draft["updated"]})
+        except (OSError, ValueError, KeyError):
+            cached = None
+        with self._cond:
+            if cached is None:
+                self._info.pop(key, None)
+                return None
+            self._info[key] = cached
+            return dict(cached[1], pending=False)
+
+    def load(self, owner, filename):
+        """
+        Text of a file's draft, or None if there is none.
+
+        Raises:
+            KeyError: If the saved version the draft is based on is no longer stored
+        """
+        key = (owner, filename)
+        with self._cond:
+            if key in self._pending:
+                return self._pending[key][0]
+        try:
+            draft = self._read(self._path(owner, filename))
+        except FileNotFoundError:
+            return None
+        base_lines = self.snapshots.get(draft["base"]).splitlines(keepends=True)
+        return "".join(apply_delta(base_lines, draft["ops"]))
+
+    def bases(self):
+        """Snapshot hashes the written drafts are based on (they must outlive SnapshotStore.prune())."""
+        bases = set()
+        try:
+            names = os.listdir(self.drafts_dir)
+        except FileNotFoundError:
+            return bases
+        for name in names:
+            if name.endswith(".draft"):
+                try:
+                    bases.add(self._read(os.path.join(self.drafts_dir, name))["base"])
+                except (OSError, ValueError, KeyError):
+                    continue
+        return bases
+
+    def discard(self, owner, filename):
+        """Forget a file's draft (after it was saved or thrown away)."""
+        key = (owner, filename)
+        with self._cond:
+            self._pending.pop(key, None)
+            self._info.pop(key, None)
+        try:
+            os.unlink(self._path(owner, filename))
+        except FileNotFoundError:
+            pass
+
+    def flush(self):
+        """Write every pending draft now."""
+        with self._cond:
+            due = list(self._pending)
+        for key in due:
+            self._write(key)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                now = time.monotonic()
+                next_due = min(staged[2] for staged in self._pending.values())
+                if next_due > now:
+                    self._cond.wait(next_due - now)
+                    continue
+                keys = [key for key, staged in self._pending.items() if staged[2] <= now]
+            for key in keys:
+                self._write(key)
+
+    def _write(self, key):
+        # flush() and the writer thread must not interleave: a draft written twice would look discarded
+        with self._write_lock:
+            self._write_staged(key)
+
+    def _write_staged(self, key):
+        with self._cond:
+            staged = self._pending.get(key)
+        if staged is None:
+            return
+        text, base_text, _, failures = staged
+        owner, filename = key
+        path = self._path(owner, filename)
+        try:
+            base = self.snapshots.put(base_text)  # Deduplicated: usually already stored by the last save
+            ops = make_delta(base_text.splitlines(keepends=True), text.splitlines(keepends=True))
+            draft = {"owner": owner, "filename": filename, "base": base, "hash": content_hash(text),
+                     "updated": time.strftime("%Y-%m-%d %H:%M:%S"), "ops": ops}
+            with self._cond:
+                if self._pending.get(key) is not staged:
+                    return  # Changed or discarded meanwhile: the newer state wins
+            os.makedirs(self.drafts_dir, exist_ok=True)  # Recreated if it was deleted while running
+            atomic_write(path, json.dumps(draft, separators=(",", ":")))
+            mtime_ns = os.stat(path).st_mtime_ns
+        except Exception:
+            # Drafts are best effort: back off instead of retrying a failing write in a tight loop
+            with self._cond:
+                if self._pending.get(key) is not staged:
+                    return
+                if failures + 1 >= MAX_WRITE_ATTEMPTS:
+                    _log.exception("Giving up on the draft of %s after %d failed writes", filename, failures + 1)
+                    del self._pending[key]
+                else:
+                    _log.warning("Writing the draft of %s failed, retrying", filename, exc_info=True)
+                    delay = RETRY_DELAY * 2 ** failures
+                    self._pending[key] = (text, base_text, time.monotonic() + delay, failures + 1)
+            return
+        with self._cond:
+            if self._pending.get(key) is staged:
+                del self._pending[key]
+                self._info[key] = (mtime_ns, {"hash": draft["hash"], "base": base, "updated": draft["updated"]})
+                return
+            discarded = key not in self._pending
+        if discarded:
+            # discard() ran while the file was being written: do not let the draft come back after a save
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
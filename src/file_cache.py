@@ -0,0 +1,164 @@
+"""
+Process-wide cache of file contents for the editor.
+
+Switching files, reloading and opening the same file in several sessions used
+to re-read it from disk every time, and every session held its own copy.
+FileContentCache keys decoded text by (path, mtime, size): a file that changed
+on disk is simply a different key, so no explicit invalidation is needed, and
+every session that opens an unchanged file gets the very same str object.
+Entries are evicted least recently used first once the cache holds more than
+max_bytes of text.
+
+Files larger than large_file_bytes are not read whole. They are memory-mapped
+and served in chunks of roughly chunk_bytes that end on line boundaries, so
+opening a multi-megabyte generated file only decodes what is shown.
+"""
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from snapshot_store import content_hash
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_LARGE_FILE_BYTES = 1024 * 1024
+DEFAULT_CHUNK_BYTES = 256 * 1024
+
+
+class FileContentCache:
+    """LRU, byte-bounded cache of decoded file text keyed by path, mtime and size."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, large_file_bytes=DEFAULT_LARGE_FILE_BYTES,
+                 chunk_bytes=DEFAULT_CHUNK_BYTES):
+        """
+        Args:
+            max_bytes (int): Total text size kept before evicting
+            large_file_bytes (int): Files above this size are only read in chunks
+            chunk_bytes (int): Approximate chunk size for large files
+        """
+        self.max_bytes = max_bytes
+        self.large_file_bytes = large_file_bytes
+        self.chunk_bytes = chunk_bytes
+        self._entries = OrderedDict()  # key -> str
+        self._boundaries = {}  # (path, mtime_ns, size) -> chunk start offsets plus the file size
+        self._versions = {}  # path -> ((path, mtime_ns, size), content hash)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def is_large(self, path):
+        """True if path is served in chunks rather than whole."""
+        return os.path.getsize(path) > self.large_file_bytes
+
+    def read(self, path):
+        """
+        Return the full text of a file, from the cache when it is unchanged.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        key = self._key(path)
+        with self._lock:
+            text = self._lookup(key)
+        if text is not None:
+            return text
+        if key[2] > self.large_file_bytes:
+            text = "".join(self.read_chunk(path, i) for i in range(self.chunk_count(path)))
+        else:
+            with open(path, 'r') as f:
+                text = f.read()
+        with self._lock:
+            return self._store(key, text)
+
+    def version(self, path):
+        """
+        Content hash of a file's full text (as snapshot_store.content_hash), computed once per change.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        key = self._key(path)
+        with self._lock:
+            cached = self._versions.get(key[0])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        digest = content_hash(self.read(path))
+        with self._lock:
+            self._versions[key[0]] = (key, digest)
+        return digest
+
+    def chunk_count(self, path):
+        """Number of line-aligned chunks a large file is served in."""
+        return len(self._chunk_offsets(self._key(path))) - 1
+
+    def read_chunk(self, path, index):
+        """Return chunk index of a file, decoded, from the cache when unchanged."""
+        file_key = self._key(path)
+        offsets = self._chunk_offsets(file_key)
+        key = file_key + (index,)
+        with self._lock:
+            text = self._lookup(key)
+        if text is not None:
+            return text
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = mm[offsets[index]:offsets[index + 1]].decode("utf-8", errors="replace")
+        with self._lock:
+            return self._store(key, text)
+
+    def read_prefix(self, path, chunks):
+        """Return the first chunks chunks of a file joined together."""
+        return "".join(self.read_chunk(path, i) for i in range(min(chunks, self.chunk_count(path))))
+
+    def _chunk_offsets(self, file_key):
+        with self._lock:
+            offsets = self._boundaries.get(file_key)
+        if offsets is not None:
+            return offsets
+        path, _, size = file_key
+        offsets = [0]
+        if size:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Cut after the first newline past each chunk_bytes mark so lines stay whole
+                    while offsets[-1] + self.chunk_bytes < size:
+                        newline = mm.find(b"\n", offsets[-1] + self.chunk_bytes)
+                        if newline == -1:
+                            break
+                        offsets.append(newline + 1)
+            if offsets[-1] != size:
+                offsets.append(size)
+        else:
+            offsets.append(0)
+        with self._lock:
+            # Offsets of older versions of this file are useless once it changed
+            for stale in [k for k in self._boundaries if k[0] == path]:
+                del self._boundaries[stale]
+            self._boundaries[file_key] = offsets
+        return offsets
+
+    def _lookup(self, key):
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+        return text
+
+    def _store(self, key, text):
+        existing = self._entries.get(key)
+        if existing is not None:
+            return existing  # Another session read it first: share that object
+        self._entries[key] = text
+        self._size += len(text)
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+        return text
+
+    def stats(self):
+        """Entry count and cached text size."""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes}
@@ -0,0 +1,198 @@
+"""
+Cached, change-invalidated index of the Python files the editor can open.
+
+Listing src/ with os.listdir plus an isfile/getsize call per file on every
+Streamlit rerun gets slow on large trees. FileIndex scans the tree once with
+os.scandir and afterwards only re-checks each directory's modification time,
+which changes whenever an entry is created, deleted or renamed in it. Only the
+directories that changed are rescanned, and re-checks are throttled to one per
+refresh_interval seconds, so reruns in between cost nothing. One index is
+shared by every editor session.
+
+Directory mtimes do not change when an existing file is rewritten (by the
+editor or anything else), so stat() re-reads the asked-for file's own size and
+mtime instead of trusting the last scan. Callers that write files (saves, new
+files) call invalidate() so the listing catches up without waiting for the
+next throttled check.
+"""
+import os
+import threading
+import time
+
+DEFAULT_EXTENSIONS = (".py",)
+DEFAULT_SKIP_DIRS = ("__pycache__", "node_modules", "venv")
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+
+def safe_join(root, relpath):
+    """
+    Resolve a path relative to root, refusing anything that escapes it.
+
+    Args:
+        root (str): Directory the path must stay inside
+        relpath (str): User-supplied relative path such as "tools/convert.py"
+
+    Returns:
+        str: Absolute path inside root
+
+    Raises:
+        ValueError: For empty, absolute or escaping paths
+    """
+    relpath = (relpath or "").strip().replace("\\", "/")
+    if not relpath or os.path.isabs(relpath):
+        raise ValueError(f"'{relpath}' must be a path relative to {os.path.basename(root)}/")
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relpath))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"'{relpath}' is outside {os.path.basename(root)}/")
+    return path
+
+
+class _Dir:
+    __slots__ = ("mtime_ns", "subdirs", "files")
+
+    def __init__(self, mtime_ns, subdirs, files):
+        self.mtime_ns = mtime_ns
+        self.subdirs = subdirs  # Child directory relpaths
+        self.files = files  # File name -> (size, mtime_ns)
+
+
+class FileIndex:
+    """Recursive, incrementally refreshed index of files under a root directory."""
+
+    def __init__(self, root, extensions=DEFAULT_EXTENSIONS, skip_dirs=DEFAULT_SKIP_DIRS,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        """
+        Args:
+            root (str): Directory to index
+            extensions (tuple): File suffixes to include
+            skip_dirs (tuple): Directory names never descended into (hidden ones are always skipped)
+            refresh_interval (float): Minimum seconds between directory mtime checks
+        """
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(extensions)
+        self.skip_dirs = set(skip_dirs)
+        self.refresh_interval = refresh_interval
+        self.version = 0  # Bumped whenever the listing changes
+        self._dirs = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Rescan directories whose mtime changed; throttled unless force is set."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._dirs and now - self._checked < self.refresh_interval:
+                return
+            self._checked = now
+            if self._refresh_dir(""):
+                self.version += 1
+
+    def _refresh_dir(self, reldir):
+        """Bring reldir and its subtree up to date; True if anything changed."""
+        path = os.path.join(self.root, reldir) if reldir else self.root
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return self._forget(reldir)
+
+        cached = self._dirs.get(reldir)
+        changed = False
+        if cached is None or cached.mtime_ns != mtime_ns:
+            previous = set(cached.subdirs) if cached else set()
+            cached = self._scan(reldir, path, mtime_ns)
+            for removed in previous.difference(cached.subdirs):
+                self._forget(removed)
+            changed = True
+        for subdir in cached.subdirs:
+            changed = self._refresh_dir(subdir) or changed
+        return changed
+
+    def _scan(self, reldir, path, mtime_ns):
+        subdirs, files = [], {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.skip_dirs:
+                                subdirs.append(f"{reldir}/{entry.name}" if reldir else entry.name)
+                        elif entry.name.endswith(self.extensions) and entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue  # Vanished or unreadable while scanning
+        except OSError:
+            pass
+        entry = _Dir(mtime_ns, sorted(subdirs), files)
+        self._dirs[reldir] = entry
+        return entry
+
+    def _forget(self, reldir):
+        if reldir not in self._dirs:
+            return False
+        prefix = f"{reldir}/"
+        for d in [d for d in self._dirs if d == reldir or d.startswith(prefix)]:
+            del self._dirs[d]
+        return True
+
+    def invalidate(self, relpath=None):
+        """
+        Force the directory containing relpath (or the whole tree) to be rescanned.
+
+        Call after writing a file, so a new file is listed without waiting for
+        the next throttled check.
+        """
+        with self._lock:
+            if relpath is None:
+                self._dirs.clear()
+            else:
+                cached = self._dirs.get(os.path.dirname(relpath))
+                if cached is not None:
+                    cached.mtime_ns = -1
+            self._checked = 0.0
+
+    def directories(self):
+        """Relative paths of directories containing indexed files ("" is the root), sorted."""
+        self.refresh()
+        with self._lock:
+            return sorted(d for d, entry in self._dirs.items() if entry.files or d == "")
+
+    def files_in(self, reldir):
+        """Relative paths of the indexed files directly inside reldir, sorted."""
+        self.refresh()
+        with self._lock:
+            entry = self._dirs.get(reldir)
+            if entry is None:
+                return []
+            return [f"{reldir}/{name}" if reldir else name for name in sorted(entry.files)]
+
+    def files(self):
+        """Relative paths of every indexed file, sorted."""
+        self.refresh()
+        with self._lock:
+            return sorted(
+                f"{d}/{name}" if d else name
+                for d, entry in self._dirs.items() for name in entry.files
+            )
+
+    def stat(self, relpath):
+        """(size, mtime_ns) of an indexed file as it is on disk now, or None if it is not indexed or gone."""
+        self.refresh()
+        reldir, name = os.path.dirname(relpath), os.path.basename(relpath)
+        with self._lock:
+            entry = self._dirs.get(reldir)
+            if entry is None or name not in entry.files:
+                return None
+        try:
+            stat = os.stat(os.path.join(self.root, relpath))
+        except OSError:
+            return None
+        current = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._dirs.get(reldir)
+            if entry is not None and name in entry.files:
+                entry.files[name] = current
+        return current
@@ -0,0 +1,110 @@
+"""
+Concurrency-safe file saves for the editor.
+
+Several sessions (and several server processes) may save the same file at
+once. Saves therefore:
+
+- hold an exclusive fcntl lock per file for the whole save, so writing the
+  file and recording its history entry happen in the same order for everyone;
+  the lock files live in .editor_locks/ in the project root (override with
+  EDITOR_LOCK_DIR) because the saved file itself is replaced on every save;
+- check the file's current contents against the version the session loaded
+  (its content hash) and raise SaveConflictError instead of silently
+  overwriting someone else's save;
+- write to a temporary file in the same directory and os.replace() it over
+  the target, so readers never see a half-written file.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import tempfile
+
+from history_store import PROJECT_ROOT
+from snapshot_store import content_hash
+
+DEFAULT_LOCK_DIR = os.path.join(PROJECT_ROOT, ".editor_locks")
+
+
+class SaveConflictError(Exception):
+    """The file changed on disk since the saving session loaded it."""
+
+    def __init__(self, path, current_text):
+        super().__init__(f"{os.path.basename(path)} was changed by someone else since it was loaded")
+        self.path = path
+        self.current_text = current_text
+
+
+def disk_version(path):
+    """Content hash of a file as it is on disk now, or None if it does not exist."""
+    try:
+        with open(path, 'r') as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def file_lock(path, lock_dir=None):
+    """Hold an exclusive lock on path (across threads and processes) for the duration of the block."""
+    lock_dir = lock_dir or os.environ.get("EDITOR_LOCK_DIR", DEFAULT_LOCK_DIR)
+    os.makedirs(lock_dir, exist_ok=True)
+    name = hashlib.sha1(os.path.realpath(path).encode("utf-8")).hexdigest()
+    with open(os.path.join(lock_dir, f"{name}.lock"), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write(path, text):
+    """Replace path with text in one step (temp file + fsync + os.replace), keeping its permissions."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)  # mkstemp creates 0600 files
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_if_unchanged(path, text, expected_version=None, create=False):
+    """
+    Atomically write text to path unless it changed since it was loaded.
+
+    Call inside file_lock(path) so nobody writes between the check and the write.
+
+    Args:
+        path (str): File to write
+        text (str): New contents
+        expected_version (str): disk_version() of the file when it was loaded;
+            None skips the check (deliberate overwrites)
+        create (bool): The file is saved under a new name ("save as") and must
+            not exist yet
+
+    Returns:
+        str: Content hash of the written text (the file's new version)
+
+    Raises:
+        SaveConflictError: If the file on disk is neither the expected version
+            nor already identical to text, or with create, if it exists with
+            other contents
+    """
+    new_version = content_hash(text)
+    if expected_version is not None or create:
+        current = disk_version(path)
+        if current is not None and current != new_version and (create or current != expected_version):
+            with open(path, 'r') as f:
+                raise SaveConflictError(path, f.read())
+    atomic_write(path, text)
+    return new_version
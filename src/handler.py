@@ -1,4 +1,21 @@
 import json
+import os
+
+from destination_planner import DestinationPlanner
+from job_cache import cache_key, get_default_cache
+from job_results import JobResultStore
+import job_metrics
+from job_metrics import (
+    BYTES_WRITTEN,
+    JOB_CACHE_LOOKUPS,
+    JOBS_GENERATED,
+    VALIDATION_FAILURES,
+    dump_metrics,
+    stage_timer,
+)
+
+# Bump whenever generate_mediaconvert_job() output changes so cached jobs are rebuilt
+TEMPLATE_VERSION = "2"
 
 
 def generate_mediaconvert_job(input_file_path, output_file_path, preset_name="System-Generic_Hd_Mp4_Av1_Aac_16x9_1920x1080p_24Hz_6000Kbps"):
@@ -85,12 +102,118 @@ def generate_mediaconvert_job(input_file_path, output_file_path, preset_name="Sy
     return job_config
 
 
+def validate_mediaconvert_job(job_config):
+    """
+    Check a generated job configuration for obvious mistakes.
+
+    Args:
+        job_config (dict): MediaConvert job configuration
+
+    Returns:
+        list: Human readable problems (empty when the job looks valid)
+    """
+    problems = []
+    settings = job_config.get("Settings", {})
+    inputs = settings.get("Inputs", [])
+    if not inputs:
+        problems.append("Job has no inputs")
+    for job_input in inputs:
+        if not str(job_input.get("FileInput", "")).startswith("s3://"):
+            problems.append(f"Input is not an S3 path: {job_input.get('FileInput')}")
+    for group in settings.get("OutputGroups", []):
+        destination = group.get("OutputGroupSettings", {}).get("FileGroupSettings", {}).get("Destination", "")
+        if not str(destination).startswith("s3://"):
+            problems.append(f"Destination is not an S3 path: {destination}")
+        if not group.get("Outputs"):
+            problems.append(f"Output group '{group.get('Name')}' has no outputs")
+    return problems
+
+
+def print_problems(problems):
+    """Print validation problems as warnings."""
+    for problem in problems:
+        print(f"WARNING: {problem}")
+
+
+def job_fingerprint(input_file_path, output_file_path, preset_name):
+    """Return the fingerprint identifying a generated job (also its cache key)."""
+    return cache_key(TEMPLATE_VERSION, input_file_path, output_file_path, preset_name)
+
+
+def build_mediaconvert_job_json(input_file_path, output_file_path, preset_name, fingerprint):
+    """
+    Generate, validate and serialize a MediaConvert job.
+
+    Args:
+        input_file_path (str): S3 path to the input video file
+        output_file_path (str): S3 path for the output video file
+        preset_name (str): MediaConvert preset name for output settings
+        fingerprint (str): Job fingerprint stamped into UserMetadata
+
+    Returns:
+        tuple: (UTF-8 encoded, indented job JSON: bytes, validation problems: list)
+    """
+    with stage_timer("generate"):
+        job_json = generate_mediaconvert_job(input_file_path, output_file_path, preset_name)
+        # Completion events echo UserMetadata, letting job_results join them back to this job
+        job_json["UserMetadata"] = {"fingerprint": fingerprint}
+    JOBS_GENERATED.inc()
+
+    with stage_timer("validate"):
+        problems = validate_mediaconvert_job(job_json)
+    if problems:
+        VALIDATION_FAILURES.inc()
+        print_problems(problems)
+
+    with stage_timer("serialize"):
+        return json.dumps(job_json, indent=2).encode("utf-8"), problems
+
+
+def get_mediaconvert_job_json(input_file_path, output_file_path, preset_name, cache=None):
+    """
+    Return serialized job JSON, served from the on-disk memo cache when possible.
+
+    Only jobs that pass validation are cached, so a hit is returned as is; a
+    job with problems is rebuilt, and its warnings printed, on every call.
+
+    Args:
+        input_file_path (str): S3 path to the input video file
+        output_file_path (str): S3 path for the output video file
+        preset_name (str): MediaConvert preset name for output settings
+        cache (JobCache): Cache to use (defaults to the process-wide cache)
+
+    Returns:
+        bytes: UTF-8 encoded, indented job JSON
+    """
+    fingerprint = job_fingerprint(input_file_path, output_file_path, preset_name)
+
+    cache = cache or get_default_cache()
+    if cache is not None:
+        job_bytes = cache.get(fingerprint)
+        JOB_CACHE_LOOKUPS.inc(labels=("hit" if job_bytes is not None else "miss",))
+        if job_bytes is not None:
+            return job_bytes
+
+    job_bytes, problems = build_mediaconvert_job_json(input_file_path, output_file_path, preset_name, fingerprint)
+    if cache is not None and not problems:
+        cache.put(fingerprint, job_bytes)
+    return job_bytes
+
+
 def main():
     """Main function that generates MediaConvert job JSON based on inputs."""
     # Define inputs
-    input_video = "s3://my-input-bucket/videos/source-video.mp4"
-    output_destination = "s3://my-output-bucket/transcoded/"
-    preset = "HD_1080p_H264"
+    with stage_timer("read_inputs"):
+        input_video = "s3://my-input-bucket/videos/source-video.mp4"
+        output_destination = "s3://my-output-bucket/transcoded/"
+        preset = "HD_1080p_H264"
+
+    # Spread outputs across sharded sub-prefixes to avoid S3 hot prefixes
+    planner = DestinationPlanner(
+        output_destination,
+        strategy=os.environ.get("MEDIACONVERT_DESTINATION_STRATEGY", "hash"),
+    )
+    planned_destination = planner.plan(input_video)
 
     print("=" * 60)
     print("AWS MediaConvert Job JSON Generator")
@@ -98,26 +221,46 @@ def main():
     print(f"\nInput Parameters:")
     print(f"  - Input Video: {input_video}")
     print(f"  - Output Destination: {output_destination}")
+    print(f"  - Planned Destination: {planned_destination}")
     print(f"  - Preset: {preset}")
     print("\n" + "=" * 60)
 
-    # Generate the MediaConvert job configuration
-    job_json = generate_mediaconvert_job(input_video, output_destination, preset)
+    # Generate (or fetch from cache) the serialized MediaConvert job configuration
+    job_bytes = get_mediaconvert_job_json(input_video, planned_destination, preset)
+    planner.record(input_video, planned_destination, name_modifier=f"_{preset}")
+    planner.close()
+
+    # Remember the generation so completion events can be joined back to it
+    store = JobResultStore()
+    try:
+        store.record_generation(
+            job_fingerprint(input_video, planned_destination, preset),
+            input_video, planned_destination, preset, f"_{preset}",
+        )
+    finally:
+        store.close()
 
     # Pretty print the JSON output
     print("\nGenerated MediaConvert Job JSON:")
     print("=" * 60)
-    print(json.dumps(job_json, indent=2))
+    print(job_bytes.decode("utf-8"))
 
     # Optionally save to file
     output_file = "mediaconvert_job.json"
-    with open(output_file, 'w') as f:
-        json.dump(job_json, f, indent=2)
+    with stage_timer("write"):
+        with open(output_file, 'wb') as f:
+            f.write(job_bytes)
+    BYTES_WRITTEN.inc(len(job_bytes))
 
     print("\n" + "=" * 60)
     print(f"JSON configuration saved to: {output_file}")
     print("=" * 60)
 
+    # Dump pipeline metrics when they are collected and a destination is configured
+    metrics_file = os.environ.get("MEDIACONVERT_METRICS_FILE")
+    if metrics_file and job_metrics.ENABLED:
+        dump_metrics(metrics_file)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,288 @@
+"""
+Indexed store for the editor's update history.
+
+The history used to live in .script_history.json, which every save rewrote in
+full and every session loaded in full at startup. HistoryStore keeps it in an
+embedded SQLite database (.script_history.db in the project root, override with
+EDITOR_HISTORY_DB) instead: a save is a single INSERT, and the sidebar and
+history view query counts and pages through indexes on filename, user and
+timestamp without loading the whole history. Update messages are full-text
+indexed with FTS5 where SQLite provides it (substring LIKE matching otherwise).
+
+An existing .script_history.json is imported once, the first time the
+database is created.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, ".script_history.db")
+LEGACY_JSON_PATH = os.path.join(PROJECT_ROOT, ".script_history.json")
+SCHEMA_VERSION = 1
+MAX_CACHED_COUNTS = 256
+BUSY_TIMEOUT = 30  # Seconds to wait for another process's write instead of failing with "database is locked"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    user TEXT NOT NULL,
+    update_message TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_filename ON history (filename, id);
+CREATE INDEX IF NOT EXISTS idx_history_user ON history (user, id);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    update_message, content='history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, update_message) VALUES (new.id, new.update_message);
+END;
+CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, update_message) VALUES ('delete', old.id, old.update_message);
+END;
+"""
+
+_COLUMNS = "id, filename, timestamp, user, update_message, file_size, content_hash"
+
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = text.split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+def insert_entry(conn, filename, user, update_message, file_size, timestamp=None, content_hash=None):
+    """
+    Insert a history entry on conn, inside the caller's transaction.
+
+    Lets SnapshotStore record a save's snapshot and its entry in one
+    transaction (both live in the same database). See HistoryStore.append()
+    for the arguments.
+
+    Returns:
+        dict: The stored entry, including its id
+    """
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor = conn.execute(
+        "INSERT INTO history (filename, timestamp, user, update_message, file_size, content_hash) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (filename, timestamp, user, update_message, file_size, content_hash),
+    )
+    return {"id": cursor.lastrowid, "filename": filename, "timestamp": timestamp, "user": user,
+            "update_message": update_message, "file_size": file_size, "content_hash": content_hash}
+
+
+class HistoryStore:
+    """SQLite-backed, append-only update history shared by all editor sessions."""
+
+    def __init__(self, db_path=None, legacy_path=LEGACY_JSON_PATH):
+        """
+        Args:
+            db_path (str): SQLite database (defaults to .script_history.db in the project root)
+            legacy_path (str): JSON history imported when the database is first created
+        """
+        self.db_path = db_path or os.environ.get("EDITOR_HISTORY_DB", DEFAULT_DB_PATH)
+        # One connection shared by every session thread, serialized by a lock; other server
+        # processes' writers are waited for (WAL lets readers continue meanwhile)
+        self.conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._counts = {}  # count() filters -> result, dropped whenever the database changes
+        self._data_version = None
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+            fts_created = self._create_fts()
+            with self.conn:
+                version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+                if version < 1:
+                    self._import_legacy(legacy_path)
+                    self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                if fts_created:
+                    # Index messages saved by a SQLite build without FTS5
+                    self.conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+
+    def close(self):
+        self.conn.close()
+
+    def _create_fts(self):
+        """Create the full-text index if SQLite supports FTS5; True if it was just created."""
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+        if exists:
+            self.fts_enabled = True
+            return False
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            self.fts_enabled = False  # Built without FTS5: search falls back to LIKE
+            return False
+        self.fts_enabled = True
+        return True
+
+    def _import_legacy(self, legacy_path):
+        if not legacy_path or not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.conn.executemany(
+            "INSERT INTO history (filename, timestamp, user, update_message, file_size) VALUES (?, ?, ?, ?, ?)",
+            [
+                (e.get("filename", ""), e.get("timestamp", ""), e.get("user", ""),
+                 e.get("update_message", ""), int(e.get("file_size", 0)))
+                for e in entries if isinstance(e, dict)
+            ],
+        )
+
+    def append(self, filename, user, update_message, file_size, timestamp=None, content_hash=None):
+        """
+        Record one save.
+
+        Args:
+            filename (str): Saved file, relative to src/
+            user (str): Who saved it
+            update_message (str): Description of the change
+            file_size (int): Saved size in characters
+            timestamp (str): "%Y-%m-%d %H:%M:%S" (defaults to now)
+            content_hash (str): SnapshotStore address of the saved contents
+
+        Returns:
+            dict: The stored entry, including its id
+        """
+        with self._lock, self.conn:
+            self._counts.clear()
+            return insert_entry(self.conn, filename, user, update_message, file_size, timestamp, content_hash)
+
+    def _where(self, filename, user, since, until, search=None):
+        clauses, params = [], []
+        if search and search.strip():
+            if self.fts_enabled:
+                clauses.append("id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+                params.append(_fts_query(search))
+            else:
+                clauses.append("update_message LIKE ? ESCAPE '\\'")
+                escaped = search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+        if filename:
+            clauses.append("filename = ?")
+            params.append(filename)
+        if user:
+            clauses.append("user = ?")
+            params.append(user)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def count(self, filename=None, user=None, since=None, until=None, search=None):
+        """
+        Number of entries matching the filters (see entries()).
+
+        Results are cached until the next write to the database, by this or any
+        other connection, so reruns that only redraw the page skip the COUNT.
+        """
+        key = (filename, user, since, until, search)
+        with self._lock:
+            # data_version changes when another connection commits; this connection's writes reset the cache
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version or len(self._counts) >= MAX_CACHED_COUNTS:
+                self._counts.clear()
+                self._data_version = version
+            if key not in self._counts:
+                where, params = self._where(filename, user, since, until, search)
+                self._counts[key] = self.conn.execute(f"SELECT COUNT(*) FROM history {where}", params).fetchone()[0]
+            return self._counts[key]
+
+    def entries(self, filename=None, user=None, since=None, until=None, search=None, limit=50, offset=0):
+        """
+        Return matching entries, newest first.
+
+        Args:
+            filename (str): Only this file
+            user (str): Only this user
+            since (str): Earliest timestamp (inclusive, "YYYY-MM-DD[ HH:MM:SS]")
+            until (str): Latest timestamp (inclusive)
+            search (str): Words that must all appear in the update message
+            limit (int): Page size
+            offset (int): Entries to skip
+
+        Returns:
+            list: Entry dicts with id, filename, timestamp, user, update_message and file_size
+        """
+        where, params = self._where(filename, user, since, until, search)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM history {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def filenames(self):
+        """Distinct saved file names, sorted."""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT filename FROM history ORDER BY filename")]
+
+    def users(self):
+        """Distinct users who saved, sorted."""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT user FROM history ORDER BY user")]
+
+    def latest(self, filename=None):
+        """Most recent entry (optionally for one file), or None."""
+        entries = self.entries(filename=filename, limit=1)
+        return entries[0] if entries else None
+
+    def latest_snapshot(self, filename, before_id=None):
+        """
+        Most recent entry of a file that has a content snapshot.
+
+        Args:
+            filename (str): Saved file
+            before_id (int): Only consider entries older than this id
+
+        Returns:
+            dict: The entry, or None
+        """
+        clause, params = ("AND id < ?", [before_id]) if before_id is not None else ("", [])
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM history WHERE filename = ? AND content_hash IS NOT NULL {clause} "
+                "ORDER BY id DESC LIMIT 1",
+                [filename] + params,
+            ).fetchone()
+        return dict(row) if row else None
+
+    def versions(self, filename, limit=100):
+        """Entries of a file that have snapshots, newest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM history WHERE filename = ? AND content_hash IS NOT NULL "
+                "ORDER BY id DESC LIMIT ?",
+                (filename, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def clear(self):
+        """
+        Delete every entry.
+
+        Their snapshots stay in the blobs table until SnapshotStore.prune() runs.
+        """
+        with self._lock, self.conn:
+            self._counts.clear()
+            self.conn.execute("DELETE FROM history")
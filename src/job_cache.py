@@ -0,0 +1,175 @@
+"""
+Persistent memo cache for generated MediaConvert job JSON.
+
+Entries are stored as serialized JSON bytes under .job_cache/ in the project
+root (override with MEDIACONVERT_JOB_CACHE_DIR), one file per key. A key is the
+SHA-256 of the template version plus the generator arguments, so bumping the
+template version invalidates every old entry. File modification times double
+as LRU timestamps: hits touch the file and writes evict the least recently
+used entries once the cache exceeds its size or entry limits.
+
+A JobCache scans the directory once, on its first write, and keeps a running
+total of bytes and entries after that. Only a write that takes the totals
+past a limit scans again. That scan evicts down to EVICT_TO of the limits,
+so evictions come in batches rather than on every later write. Entries
+written by other processes are picked up at that rescan, so the limits are
+approximate while several processes share the directory.
+
+Set MEDIACONVERT_JOB_CACHE=0 to bypass the cache entirely.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".job_cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 10000
+EVICT_TO = 0.9  # Fraction of the limits an eviction frees the cache down to
+
+CACHE_ENABLED = os.environ.get("MEDIACONVERT_JOB_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def cache_key(template_version, *args):
+    """
+    Build a stable cache key from a template version and generator arguments.
+
+    Args:
+        template_version (str): Version of the job template producing the output
+        *args: JSON-serializable generator arguments
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps([str(template_version), list(args)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobCache:
+    """Size-bounded, LRU-evicted on-disk store of serialized job JSON."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir or os.environ.get("MEDIACONVERT_JOB_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._usage = None  # [bytes, entries] counted since the last scan; None until the first write
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the stored bytes for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # Mark as most recently used
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        """Store data under key atomically and evict old entries once a limit is exceeded."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self._usage is None:
+            self._usage = self._scan_usage()
+        path = self._path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = None
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._usage[0] += len(data) - (replaced or 0)
+        self._usage[1] += replaced is None
+        if self._usage[0] > self.max_bytes or self._usage[1] > self.max_entries:
+            self._evict()
+
+    def get_or_create(self, key, build):
+        """
+        Return cached bytes for key, building and storing them on a miss.
+
+        Args:
+            key (str): Cache key from cache_key()
+            build (callable): Zero-argument function returning bytes
+
+        Returns:
+            tuple: (data: bytes, hit: bool)
+        """
+        data = self.get(key)
+        if data is not None:
+            return data, True
+        data = build()
+        self.put(key, data)
+        return data, False
+
+    def clear(self):
+        """Remove every cached entry."""
+        for entry in self._entries():
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+        self._usage = None
+
+    def _entries(self):
+        try:
+            with os.scandir(self.cache_dir) as it:
+                return [e for e in it if e.name.endswith(".json") and e.is_file()]
+        except FileNotFoundError:
+            return []
+
+    def _stat_entries(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def _scan_usage(self):
+        entries = self._stat_entries()
+        return [sum(size for _, size, _ in entries), len(entries)]
+
+    def _evict(self):
+        entries = self._stat_entries()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        if total > self.max_bytes or count > self.max_entries:
+            max_bytes, max_entries = self.max_bytes * EVICT_TO, self.max_entries * EVICT_TO
+            entries.sort()
+            for _, size, path in entries:
+                if total <= max_bytes and count <= max_entries:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                count -= 1
+        self._usage = [total, count]
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Return the process-wide JobCache, or None when caching is disabled."""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = JobCache()
+    return _default_cache
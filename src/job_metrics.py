@@ -0,0 +1,256 @@
+"""
+Lightweight Prometheus-style metrics for the MediaConvert job pipeline.
+
+Metrics are off unless the MEDIACONVERT_METRICS environment variable is set
+(or enable() is called). While disabled every counter, histogram and timer
+call returns immediately, so instrumented code pays only a flag check.
+
+Usage:
+    from job_metrics import JOBS_GENERATED, stage_timer
+
+    with stage_timer("generate"):
+        job = generate_mediaconvert_job(...)
+    JOBS_GENERATED.inc()
+
+Expose the collected values either with dump_metrics(path) (text file that a
+node_exporter textfile collector can pick up) or serve_metrics(port) (HTTP
+/metrics endpoint running in a daemon thread).
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("MEDIACONVERT_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def enable(flag=True):
+    """Turn metric collection on or off for the whole process."""
+    global ENABLED
+    ENABLED = bool(flag)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    """Monotonically increasing counter, optionally split by label values."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, labels=()):
+        """
+        Increase the counter by amount (no-op while metrics are disabled).
+
+        Args:
+            amount (int): Increment
+            labels (tuple): Label values, in labelnames order
+        """
+        if not ENABLED:
+            return
+        labels = tuple(labels)
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with _lock:
+            values = dict(self._values) or {(): 0}
+        for labelvalues, value in sorted(values.items()):
+            labels = _format_labels(list(zip(self.labelnames, labelvalues)))
+            lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by label values."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        _registry.append(self)
+
+    def observe(self, value, *labelvalues):
+        """Record one observation (no-op while metrics are disabled)."""
+        if not ENABLED:
+            return
+        with _lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with _lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for labelvalues, (counts, total, count) in sorted(series.items()):
+            base = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(base + [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(base + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {count}")
+        return lines
+
+
+class _Timer:
+    """Context manager that observes elapsed wall time into a histogram."""
+
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(histogram, *labelvalues):
+    """Return a context manager timing its block into histogram."""
+    if not ENABLED:
+        return _NOOP_TIMER
+    return _Timer(histogram, labelvalues)
+
+
+# Pipeline metrics
+STAGE_SECONDS = Histogram(
+    "mediaconvert_stage_seconds",
+    "Wall time spent in each job pipeline stage.",
+    labelnames=("stage",),
+)
+JOBS_GENERATED = Counter(
+    "mediaconvert_jobs_generated_total",
+    "MediaConvert job configurations generated.",
+)
+BYTES_WRITTEN = Counter(
+    "mediaconvert_bytes_written_total",
+    "Bytes of job JSON written to disk.",
+)
+VALIDATION_FAILURES = Counter(
+    "mediaconvert_validation_failures_total",
+    "Generated jobs that failed validation.",
+)
+JOB_CACHE_LOOKUPS = Counter(
+    "mediaconvert_job_cache_lookups_total",
+    "Job memo cache lookups by result.",
+    labelnames=("result",),
+)
+SUBMISSION_SECONDS = Histogram(
+    "mediaconvert_submission_seconds",
+    "Latency of CreateJob submissions to MediaConvert.",
+)
+
+# Editor metrics
+EDITOR_FIRST_RENDER_SECONDS = Histogram(
+    "editor_first_render_seconds",
+    "Time for a new editor session's first page run to finish rendering.",
+)
+
+
+def stage_timer(stage):
+    """Time a pipeline stage (read_inputs, generate, serialize, write, ...)."""
+    return timer(STAGE_SECONDS, stage)
+
+
+def submission_timer():
+    """Time a job submission call."""
+    return timer(SUBMISSION_SECONDS)
+
+
+def render_metrics():
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def dump_metrics(path):
+    """Write the current metrics to path atomically (textfile collector format)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port=9108, addr="127.0.0.1"):
+    """
+    Serve /metrics over HTTP from a daemon thread.
+
+    Args:
+        port (int): TCP port to listen on
+        addr (str): Interface to bind
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it)
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,332 @@
+"""
+Join MediaConvert completion events back to the jobs that produced them.
+
+handler.py stamps each job with UserMetadata.fingerprint and records the
+generation (source, destination, preset, NameModifier) here. This module then
+consumes completion events - EventBridge "MediaConvert Job State Change"
+events or GetJob/ListJobs status records, one JSON document per line - joins
+them to their generation record and keeps incremental per-preset, per-day
+rollups in a local SQLite store (.job_results.db in the project root).
+
+Dashboards read the rollups table instead of rescanning raw events:
+
+    python src/job_results.py ingest events.jsonl
+    python src/job_results.py rollups --since 2026-01-01
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".job_results.db")
+TERMINAL_STATUSES = ("COMPLETE", "ERROR", "CANCELED")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    fingerprint TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    preset TEXT NOT NULL,
+    name_modifier TEXT NOT NULL,
+    generated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    job_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    fingerprint TEXT,
+    preset TEXT NOT NULL,
+    day TEXT NOT NULL,
+    event_time TEXT NOT NULL,
+    output_duration_ms INTEGER NOT NULL,
+    output_bytes INTEGER NOT NULL,
+    output_paths TEXT NOT NULL,
+    error_code TEXT,
+    error_message TEXT,
+    PRIMARY KEY (job_id, status)
+);
+CREATE INDEX IF NOT EXISTS idx_events_fingerprint ON events (fingerprint);
+CREATE TABLE IF NOT EXISTS rollups (
+    preset TEXT NOT NULL,
+    day TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    errored INTEGER NOT NULL DEFAULT 0,
+    canceled INTEGER NOT NULL DEFAULT 0,
+    output_duration_ms INTEGER NOT NULL DEFAULT 0,
+    output_bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (preset, day)
+);
+"""
+
+
+def _parse_time(value):
+    if not value:
+        return datetime.now(timezone.utc)
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, timezone.utc)
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"Timestamp out of range: {value}") from e
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    # Naive times would not compare or convert consistently; MediaConvert reports UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def normalize_event(record):
+    """
+    Flatten an EventBridge event or a GetJob status record.
+
+    output_duration_ms is the summed media duration of the job's outputs
+    (durationInMs), not how long the encode took.
+
+    Args:
+        record (dict): Raw completion event or job status record
+
+    Returns:
+        dict: job_id, status, fingerprint, event_time, output_duration_ms, output_bytes,
+              output_paths, error_code and error_message; None for non-terminal states
+
+    Raises:
+        ValueError: If the record is not a JSON object or has malformed fields (e.g. timestamps)
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"Expected a JSON object, got {type(record).__name__}")
+    try:
+        return _normalize_event(record)
+    except (TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed record: {e}") from e
+
+
+def _normalize_event(record):
+    if "detail" in record:
+        detail = record["detail"]
+        job_id = detail.get("jobId")
+        status = detail.get("status")
+        metadata = detail.get("userMetadata") or {}
+        groups = detail.get("outputGroupDetails") or []
+        event_time = _parse_time(record.get("time"))
+        error_code = detail.get("errorCode")
+        error_message = detail.get("errorMessage")
+    else:
+        job_id = record.get("Id")
+        status = record.get("Status")
+        metadata = record.get("UserMetadata") or {}
+        groups = record.get("OutputGroupDetails") or []
+        timing = record.get("Timing") or {}
+        event_time = _parse_time(timing.get("FinishTime") or timing.get("SubmitTime"))
+        error_code = record.get("ErrorCode")
+        error_message = record.get("ErrorMessage")
+
+    if not job_id or status not in TERMINAL_STATUSES:
+        return None
+
+    output_duration_ms = 0
+    output_bytes = 0
+    output_paths = []
+    for group in groups:
+        for output in group.get("outputDetails") or group.get("OutputDetails") or []:
+            output_duration_ms += int(output.get("durationInMs") or output.get("DurationInMs") or 0)
+            # Sizes are not part of MediaConvert events; producers may enrich them (e.g. from S3 HEAD)
+            output_bytes += int(output.get("sizeInBytes") or output.get("SizeInBytes") or 0)
+            output_paths.extend(output.get("outputFilePaths") or output.get("OutputFilePaths") or [])
+
+    return {
+        "job_id": job_id,
+        "status": status,
+        "fingerprint": metadata.get("fingerprint"),
+        "event_time": event_time,
+        "output_duration_ms": output_duration_ms,
+        "output_bytes": output_bytes,
+        "output_paths": output_paths,
+        "error_code": None if error_code is None else str(error_code),
+        "error_message": error_message,
+    }
+
+
+class JobResultStore:
+    """SQLite-backed store of generations, joined events and rollups."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("MEDIACONVERT_RESULTS_DB", DEFAULT_DB_PATH)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_generation(self, fingerprint, source, destination, preset, name_modifier, generated_at=None):
+        """Remember which inputs produced a job fingerprint."""
+        generated_at = generated_at or datetime.now(timezone.utc)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, source, destination, preset, name_modifier, generated_at.isoformat()),
+            )
+
+    def ingest(self, record):
+        """
+        Join one completion record and fold it into the rollups.
+
+        Duplicate deliveries of the same (job id, status) are ignored, so the
+        stream can be replayed safely.
+
+        Returns:
+            bool: True when the record was new and counted
+
+        Raises:
+            ValueError: If the record is malformed (see normalize_event())
+        """
+        with self.conn:
+            return self._ingest(record)
+
+    def consume(self, lines, batch_size=500):
+        """
+        Ingest a stream of JSON lines, committing in batches.
+
+        Lines that are not valid JSON objects or have malformed fields are
+        counted as invalid and skipped, so one bad record never aborts the stream.
+
+        Args:
+            lines (iterable): JSON documents, one per item
+            batch_size (int): Records per transaction
+
+        Returns:
+            tuple: (ingested: int, skipped: int, invalid: int); skipped counts
+                duplicates and non-terminal states
+        """
+        ingested = skipped = invalid = pending = 0
+        try:
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = normalize_event(json.loads(line))
+                except ValueError:
+                    invalid += 1
+                    continue
+                if self._ingest_event(event):
+                    ingested += 1
+                else:
+                    skipped += 1
+                pending += 1
+                if pending >= batch_size:
+                    self.conn.commit()
+                    pending = 0
+        finally:
+            self.conn.commit()
+        return ingested, skipped, invalid
+
+    def _ingest(self, record):
+        return self._ingest_event(normalize_event(record))
+
+    def _ingest_event(self, event):
+        if event is None:
+            return False
+
+        generation = None
+        if event["fingerprint"]:
+            generation = self.conn.execute(
+                "SELECT preset FROM generations WHERE fingerprint = ?", (event["fingerprint"],)
+            ).fetchone()
+        preset = generation["preset"] if generation else "unknown"
+        day = event["event_time"].astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                event["job_id"], event["status"], event["fingerprint"], preset, day,
+                event["event_time"].isoformat(), event["output_duration_ms"], event["output_bytes"],
+                json.dumps(event["output_paths"]), event["error_code"], event["error_message"],
+            ),
+        )
+        if cursor.rowcount == 0:
+            return False
+
+        status = event["status"]
+        self.conn.execute(
+            """
+            INSERT INTO rollups (preset, day, completed, errored, canceled, output_duration_ms, output_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (preset, day) DO UPDATE SET
+                completed = completed + excluded.completed,
+                errored = errored + excluded.errored,
+                canceled = canceled + excluded.canceled,
+                output_duration_ms = output_duration_ms + excluded.output_duration_ms,
+                output_bytes = output_bytes + excluded.output_bytes
+            """,
+            (
+                preset, day,
+                int(status == "COMPLETE"), int(status == "ERROR"), int(status == "CANCELED"),
+                event["output_duration_ms"], event["output_bytes"],
+            ),
+        )
+        return True
+
+    def rollups(self, preset=None, since=None, until=None):
+        """Return precomputed per-preset, per-day aggregates as dicts."""
+        clauses, params = [], []
+        if preset:
+            clauses.append("preset = ?")
+            params.append(preset)
+        if since:
+            clauses.append("day >= ?")
+            params.append(since)
+        if until:
+            clauses.append("day <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(f"SELECT * FROM rollups {where} ORDER BY day, preset", params)
+        return [dict(row) for row in rows]
+
+    def results_for(self, fingerprint):
+        """Return the generation record joined with every event for a fingerprint."""
+        generation = self.conn.execute(
+            "SELECT * FROM generations WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        events = self.conn.execute(
+            "SELECT * FROM events WHERE fingerprint = ? ORDER BY event_time", (fingerprint,)
+        ).fetchall()
+        return {
+            "generation": dict(generation) if generation else None,
+            "events": [dict(event) for event in events],
+        }
+
+
+def main(argv=None):
+    """Command line entry point for ingesting events and printing rollups."""
+    parser = argparse.ArgumentParser(description="Aggregate MediaConvert job results")
+    parser.add_argument("--db", help="SQLite store (default: .job_results.db in the project root)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Ingest JSON-lines events (use - for stdin)")
+    ingest_parser.add_argument("files", nargs="+")
+
+    rollup_parser = subparsers.add_parser("rollups", help="Print per-preset, per-day aggregates")
+    rollup_parser.add_argument("--preset")
+    rollup_parser.add_argument("--since", help="First day (YYYY-MM-DD)")
+    rollup_parser.add_argument("--until", help="Last day (YYYY-MM-DD)")
+
+    args = parser.parse_args(argv)
+    store = JobResultStore(args.db)
+    try:
+        if args.command == "ingest":
+            for path in args.files:
+                if path == "-":
+                    ingested, skipped, invalid = store.consume(sys.stdin)
+                else:
+                    with open(path, 'r') as f:
+                        ingested, skipped, invalid = store.consume(f)
+                print(f"{path}: ingested {ingested}, skipped {skipped}, invalid {invalid}")
+        else:
+            for row in store.rollups(args.preset, args.since, args.until):
+                print(json.dumps(row))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
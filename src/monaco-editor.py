@@ -1,46 +1,82 @@
+import time
+
+_run_started = time.perf_counter()  # Timed from before the imports, for the first-render measurement
+
 import streamlit as st
 from streamlit_ace import st_ace
+import difflib
 import os
-import sys
-import subprocess
-import tempfile
+import re
+import uuid
 from io import StringIO
-from datetime import datetime
+from pathlib import Path
 import getpass
-import json
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from code_checker import CodeChecker
+from draft_store import DraftStore
+from file_cache import FileContentCache
+from file_index import FileIndex, safe_join
+from file_writer import SaveConflictError, file_lock, write_if_unchanged
+from history_store import HistoryStore
+import job_metrics
+from job_metrics import EDITOR_FIRST_RENDER_SECONDS, serve_metrics
+from run_benchmark import DEFAULT_ITERATIONS, DEFAULT_REGRESSION_THRESHOLD, compare, summarize
+from run_cache import RunResultCache, run_cache_key
+from run_queue import QueueFullError, RunQueue
+from run_sweep import MAX_ROWS, parse_rows, result_row
+from script_runner import DEFAULT_POOL_SIZE, WorkerPool
+from search_index import DEFAULT_MAX_HITS, TrigramIndex
+from session_memory import OutputSpool, SessionMemory
+from snapshot_store import SnapshotStore, content_hash
+from symbol_index import SymbolIndex
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCRIPT = "# Write your Python script here\n\ndef main():\n    print('Hello, World!')\n\nif __name__ == '__main__':\n    main()"
 
 st.set_page_config(layout="wide", page_title="Python Script Editor")
 
 st.title("🐍 Python Script Editor with Monaco")
 
-# Initialize session state
-if 'script_content' not in st.session_state:
-    # Load handler.py content on first run
-    handler_path = os.path.join(os.path.dirname(__file__), 'handler.py')
-    if os.path.exists(handler_path):
-        with open(handler_path, 'r') as f:
-            st.session_state.script_content = f.read()
-    else:
-        st.session_state.script_content = "# Write your Python script here\n\ndef main():\n    print('Hello, World!')\n\nif __name__ == '__main__':\n    main()"
+# Initialize session state (the open file's contents are set up once the shared resources are defined below)
+if 'session_started' not in st.session_state:
+    st.session_state.session_started = _run_started
 
 if 'execution_output' not in st.session_state:
-    st.session_state.execution_output = ""
+    st.session_state.execution_output = None  # OutputSpool handle of the last run's output
 
 if 'save_filename' not in st.session_state:
     st.session_state.save_filename = "handler.py"
 
-if 'update_history' not in st.session_state:
-    # Load history from project root (one level up from src/)
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    history_file = os.path.join(project_root, ".script_history.json")
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r') as f:
-                st.session_state.update_history = json.load(f)
-        except:
-            st.session_state.update_history = []
-    else:
-        st.session_state.update_history = []
+if 'active_run_id' not in st.session_state:
+    st.session_state.active_run_id = None
+
+if 'last_run_success' not in st.session_state:
+    st.session_state.last_run_success = None
+
+if 'last_run_cached' not in st.session_state:
+    st.session_state.last_run_cached = False
+
+if 'last_run_profile' not in st.session_state:
+    st.session_state.last_run_profile = None  # {"profile": ..., "import_times": ...} of the last profiled run
+
+if 'run_timeout' not in st.session_state:
+    st.session_state.run_timeout = 30
+
+if 'run_memory_mb' not in st.session_state:
+    st.session_state.run_memory_mb = 0  # 0 means no memory limit
+
+if 'active_benchmark' not in st.session_state:
+    st.session_state.active_benchmark = None  # {"run_id": ..., "file": ..., "threshold": ...}
+
+if 'benchmark_report' not in st.session_state:
+    st.session_state.benchmark_report = None
+
+if 'active_sweep' not in st.session_state:
+    st.session_state.active_sweep = None  # {"file", "source", "options", "rows": [...]} of the running sweep
+
+if 'sweep_report' not in st.session_state:
+    st.session_state.sweep_report = None  # {"file", "rows": [{"line", "output"}]} of the last finished sweep
 
 if 'update_message' not in st.session_state:
     st.session_state.update_message = ""
@@ -57,176 +93,932 @@ if 'show_minimap' not in st.session_state:
 if 'selected_file' not in st.session_state:
     st.session_state.selected_file = "handler.py"
 
+if 'save_conflict' not in st.session_state:
+    st.session_state.save_conflict = None  # {"filename", "code", "message", "their_text"} of a refused save
+
+if 'loaded_chunks' not in st.session_state:
+    st.session_state.loaded_chunks = None  # Chunks of a large file shown so far; None when the whole file is loaded
+
+if 'highlight_line' not in st.session_state:
+    st.session_state.highlight_line = None  # 1-based line of the open file picked from search results
+
+if 'draft_hash' not in st.session_state:
+    st.session_state.draft_hash = None  # Content hash of the open file's text this session last autosaved
+
+
+@st.cache_resource
+def get_file_index():
+    """Process-wide index of the Python files under src/, refreshed when directories change."""
+    return FileIndex(SRC_DIR)
+
 
 def get_python_files():
-    """Get all Python files in the current directory."""
-    try:
-        current_dir = os.path.dirname(__file__) if os.path.dirname(__file__) else "."
-        files = [f for f in os.listdir(current_dir) if f.endswith('.py') and os.path.isfile(os.path.join(current_dir, f))]
-        return sorted(files)
-    except Exception as e:
-        st.error(f"Error listing files: {str(e)}")
-        return []
+    """Get all Python files under src/ as paths relative to it (from the shared index)."""
+    return get_file_index().files()
+
 
+@st.cache_resource
+def get_file_cache():
+    """Process-wide file content cache; sessions viewing the same unchanged file share one copy."""
+    return FileContentCache(max_bytes=int(os.environ.get("EDITOR_FILE_CACHE_MB", 64)) * 1024 * 1024)
 
-def load_file_content(filename):
-    """Load content from a Python file."""
+
+def load_file_content(filename, max_chunks=None):
+    """
+    Load content from a Python file (path relative to src/) through the shared content cache.
+
+    Files over the cache's large-file threshold are read in line-aligned chunks;
+    pass max_chunks to load only the first ones.
+    """
     try:
-        filepath = os.path.join(os.path.dirname(__file__) if os.path.dirname(__file__) else ".", filename)
+        filepath = safe_join(SRC_DIR, filename)
         if os.path.exists(filepath):
-            with open(filepath, 'r') as f:
-                return f.read()
+            cache = get_file_cache()
+            if max_chunks is not None and cache.is_large(filepath):
+                return cache.read_prefix(filepath, max_chunks)
+            return cache.read(filepath)
         else:
             return f"# File not found: {filename}"
     except Exception as e:
         return f"# Error loading file: {str(e)}"
 
 
-def execute_python_script(script_code):
+@st.cache_resource
+def get_search_index():
+    """Process-wide trigram index of the Python files under src/ for the sidebar search."""
+    return TrigramIndex(SRC_DIR)
+
+
+@st.cache_resource
+def get_symbol_index():
+    """Process-wide symbol index for the outline and jump-to-definition (parsed on a background thread)."""
+    return SymbolIndex(SRC_DIR)
+
+
+@st.cache_resource
+def get_code_checker():
+    """Process-wide background syntax/lint checker with results cached by content hash."""
+    return CodeChecker()
+
+
+@st.cache_resource
+def get_session_memory():
+    """Process-wide store of the sessions' editor buffers, bounded by EDITOR_SESSION_MEMORY_MB."""
+    return SessionMemory(budget_bytes=int(os.environ.get("EDITOR_SESSION_MEMORY_MB", 256)) * 1024 * 1024,
+                         is_active=session_is_active)
+
+
+def session_is_active(session_id):
+    """False once the browser session with this id has ended (its buffer can be released)."""
+    try:
+        return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True  # No runtime to ask (e.g. bare mode): keep the buffer until it idles out
+
+
+@st.cache_resource
+def get_output_spool():
+    """Process-wide spool that keeps large run output on disk."""
+    return OutputSpool()
+
+
+def get_script_content():
+    """The open buffer's text (reloaded from disk if an idle session's buffer was evicted)."""
+    text = get_session_memory().get(st.session_state.buffer_id)
+    if text is None:
+        text = load_file_content(st.session_state.selected_file, st.session_state.loaded_chunks)
+        get_session_memory().set(st.session_state.buffer_id, text, shared=True)
+        st.session_state.loaded_version = None if st.session_state.loaded_chunks else current_version(
+            st.session_state.selected_file)
+        st.session_state.buffer_evicted = True
+    return text
+
+
+def set_script_content(text, shared=False):
+    """
+    Replace the open buffer's text.
+
+    Args:
+        text (str): New contents
+        shared (bool): text came unchanged from the shared file cache (costs no extra memory)
+    """
+    get_session_memory().set(st.session_state.buffer_id, text, shared=shared)
+
+
+@st.cache_resource
+def get_draft_store():
+    """Process-wide autosave drafts of unsaved editor changes (.drafts/ in the project root)."""
+    return DraftStore(get_snapshot_store(), debounce=float(os.environ.get("EDITOR_DRAFT_DEBOUNCE_SECONDS", 2)))
+
+
+def get_draft_owner():
+    """Whose drafts the session sees: stable across tabs and restarts, unlike the session id."""
+    try:
+        if st.user.is_logged_in:
+            return st.user.email
+    except Exception:
+        pass
+    return getpass.getuser()
+
+
+def saved_text(filename):
+    """A file's saved contents from the shared cache (empty for a file that was never saved)."""
+    try:
+        return get_file_cache().read(safe_join(SRC_DIR, filename))
+    except (OSError, ValueError):
+        return ""
+
+
+def autosave_draft(code):
+    """Hand the editor's text to the background draft writer if it changed (never blocks on I/O)."""
+    filename = st.session_state.selected_file
+    code_hash = content_hash(code)
+    if code_hash == st.session_state.draft_hash:
+        return
+    if code_hash == st.session_state.loaded_version:
+        # Edited back to the saved version: the draft is obsolete
+        if st.session_state.draft_hash is not None:
+            get_draft_store().discard(get_draft_owner(), filename)
+        st.session_state.draft_hash = None
+    elif code != get_script_content():
+        get_draft_store().stage(get_draft_owner(), filename, code, saved_text(filename))
+        st.session_state.draft_hash = code_hash
+
+
+def restore_draft(filename):
+    """Draft banner callback: load the autosaved draft into the editor."""
+    draft_store = get_draft_store()
+    info = draft_store.info(get_draft_owner(), filename)
+    try:
+        text = draft_store.load(get_draft_owner(), filename)
+    except KeyError:
+        text = None
+    if info is None or text is None:
+        return
+    set_script_content(text)
+    # Saving checks against the version the draft was based on, so newer saves by others raise a conflict
+    st.session_state.loaded_version = info.get("base") or current_version(filename)
+    st.session_state.draft_hash = content_hash(text)
+
+
+def discard_draft(filename):
+    """Draft banner callback: throw the autosaved draft away."""
+    get_draft_store().discard(get_draft_owner(), filename)
+    st.session_state.draft_hash = None
+
+
+def set_execution_output(output):
+    """Show new run output (an OutputSpool handle), releasing the previous one."""
+    get_output_spool().discard(st.session_state.execution_output)
+    st.session_state.execution_output = output
+    st.session_state.output_page = 0
+
+
+@st.cache_resource
+def get_history_store():
+    """Process-wide update history store (.script_history.db in the project root)."""
+    return HistoryStore()
+
+
+@st.cache_resource
+def get_snapshot_store():
+    """Process-wide store of delta-compressed file snapshots (same database as the history)."""
+    return SnapshotStore()
+
+
+@st.cache_resource
+def get_worker_pool():
+    """Process-wide pool of pre-warmed Python workers shared by all sessions."""
+    # The pool size is also the cap on concurrently running scripts across all users
+    return WorkerPool(size=int(os.environ.get("EDITOR_MAX_CONCURRENT_RUNS", DEFAULT_POOL_SIZE)))
+
+
+@st.cache_resource
+def get_run_queue():
+    """Process-wide fair run queue in front of the worker pool."""
+    return RunQueue(get_worker_pool(), cache=RunResultCache())
+
+
+@st.cache_resource
+def get_metrics_server():
     """
-    Execute Python script locally and capture output.
+    Serve the editor's metrics on /metrics (port EDITOR_METRICS_PORT, default 9108) once per process.
+
+    Returns None when metrics are disabled (MEDIACONVERT_METRICS unset) or the port is taken,
+    e.g. by another editor process on the same host.
+    """
+    if not job_metrics.ENABLED:
+        return None
+    try:
+        return serve_metrics(port=int(os.environ.get("EDITOR_METRICS_PORT", 9108)))
+    except OSError:
+        return None
+
+
+def get_current_user():
+    """Identify who is running scripts, for fair scheduling between users."""
+    try:
+        if st.user.is_logged_in:
+            return st.user.email
+    except Exception:
+        pass
+    # Without authentication every browser session counts as its own user
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else getpass.getuser()
+
+
+def format_run_output(result, output_files=None):
+    """
+    Turn a worker run result into the text shown in the output panel.
+
+    Args:
+        result (dict): Result from WorkerPool.run() or RunHandle.poll()
+        output_files (tuple): (stdout, stderr) spool files with the run's complete output, shown
+            instead of the bounded tails in the result
+
+    Returns:
+        tuple: (success: bool, output: list of str and Path parts for OutputSpool.store_parts())
+
+    Raises:
+        OSError: If an output file is gone
+    """
+    if result["timed_out"]:
+        return False, [f"Error: Script execution timed out ({result['duration']:.0f} seconds)"]
+
+    # Combine stdout and stderr
+    streams = [result["stdout"], result["stderr"]]
+    if output_files:
+        streams = [Path(path) if os.path.getsize(path) else "" for path in output_files]
+    output = []
+    for label, stream in zip(("STDOUT", "STDERR"), streams):
+        if stream:
+            output += ["\n\n" if output else "", f"{label}:\n", stream]
+
+    if result["cancelled"]:
+        return False, [f"Run cancelled after {result['duration']:.1f} seconds", "\n\n" if output else ""] + output
+
+    if result["returncode"] != 0:
+        return False, [f"Execution failed with return code {result['returncode']}\n\n"] + output
+
+    return True, output if output else ["Script executed successfully (no output)"]
+
+
+def spool_run_output(result, output_files=None):
+    """
+    Store a finished run's output for the output panel.
+
+    Args:
+        result (dict): Final result from RunQueue.status()
+        output_files (tuple): The status' output_files; without them (cached or failed runs, or
+            files already deleted) only the result's output tails are stored
+
+    Returns:
+        tuple: (success: bool, OutputSpool handle)
+    """
+    spool = get_output_spool()
+    if output_files:
+        try:
+            success, output = format_run_output(result, output_files)
+            return success, spool.store_parts(output)
+        except OSError:
+            pass
+    success, output = format_run_output(result)
+    return success, spool.store_parts(output)
+
+
+def execute_python_script(script_code, timeout=30, memory_limit_mb=None, use_cache=False, profile=False,
+                          import_time=False):
+    """
+    Queue a Python script for execution in a pre-warmed worker process.
+
+    Runs go through the shared fair queue so the page stays responsive; poll
+    the returned run id with get_run_queue().status() or stop it with cancel().
 
     Args:
         script_code (str): The Python script code to execute
+        timeout (float): Seconds the script may run once started
+        memory_limit_mb (int): Memory cap for the script (None for no cap)
+        use_cache (bool): Reuse the stored result of an identical earlier run (ignored when profiling)
+        profile (bool): Collect function timings, allocation sites and peak memory
+        import_time (bool): Also measure how long the script's imports take
 
     Returns:
-        tuple: (success: bool, output: str)
+        tuple: (success: bool, run_id or error message: str)
     """
     try:
         if script_code is None:
             return False, "Error: No script content to execute"
 
-        # Create a temporary file to store the script
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp_file:
-            tmp_file.write(script_code)
-            tmp_file_path = tmp_file.name
-
-        # Execute the script and capture output
-        result = subprocess.run(
-            [sys.executable, tmp_file_path],
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
+        key = run_cache_key(script_code, memory_limit_mb) if use_cache and not profile else None
+        run_id = get_run_queue().submit(get_current_user(), script_code, timeout=timeout,
+                                        memory_limit_mb=memory_limit_mb, cache_key=key,
+                                        profile=profile, import_time=profile and import_time)
+        return True, run_id
 
-        # Clean up temporary file
-        os.unlink(tmp_file_path)
+    except QueueFullError as e:
+        return False, f"Error: {str(e)}"
+    except Exception as e:
+        return False, f"Error executing script: {str(e)}"
+
+
+@st.fragment(run_every=0.5)
+def show_active_run():
+    """Poll the active run and show its queue position or live output."""
+    run_queue = get_run_queue()
+    run_id = st.session_state.active_run_id
+    status = run_queue.status(run_id)
+
+    if status is None or status["state"] == "done":
+        if status is None:
+            success, output = False, get_output_spool().store("Error: Run result is no longer available")
+        else:
+            success, output = spool_run_output(status["result"], status.get("output_files"))
+            run_queue.forget(run_id)
+        set_execution_output(output)
+        st.session_state.last_run_success = success
+        st.session_state.last_run_cached = status is not None and status["result"].get("cached", False)
+        if status is not None and "profile" in status["result"]:
+            st.session_state.last_run_profile = {
+                "profile": status["result"]["profile"],
+                "import_times": status["result"].get("import_times"),
+            }
+        st.session_state.active_run_id = None
+        st.rerun()
+
+    info_col, cancel_col = st.columns([4, 1])
+    with cancel_col:
+        if st.button("⏹️ Cancel", key=f"cancel_{run_id}", use_container_width=True):
+            run_queue.cancel(run_id)  # The next poll picks up the cancelled result
+    with info_col:
+        if status["state"] == "queued":
+            stats = run_queue.stats()
+            st.info(f"⏳ Run `{run_id}` queued – {status['position']} run(s) ahead of yours "
+                    f"({stats['running']}/{stats['max_concurrent']} workers busy)")
+        else:
+            st.info(f"▶️ Run `{run_id}` running for {status['elapsed']:.1f}s...")
+    if status["state"] == "running":
+        if st.session_state.stream_output and (status["stdout"] or status["stderr"]):
+            live = "STDOUT:\n" + status["stdout"] + ("\n\nSTDERR:\n" + status["stderr"] if status["stderr"] else "")
+            st.code(live, language="text")
+
+
+def show_profile_report(report):
+    """Render a profiled run's timings, allocations and import times as sortable tables."""
+    profile = report["profile"]
+    st.metric("Peak traced memory", f"{profile['peak_memory'] / (1024 * 1024):.2f} MB")
+    tab_names = ["⏱️ Functions", "🧠 Allocations"]
+    if report["import_times"] is not None:
+        tab_names.append("📦 Imports")
+    tabs = st.tabs(tab_names)
+    with tabs[0]:
+        st.caption("Slowest functions by cumulative time (click a column to sort)")
+        st.dataframe(profile["functions"], use_container_width=True, hide_index=True)
+    with tabs[1]:
+        st.caption("Largest allocation sites still live when the script finished")
+        st.dataframe(profile["allocations"], use_container_width=True, hide_index=True)
+    if report["import_times"] is not None:
+        with tabs[2]:
+            if report["import_times"]:
+                st.caption("Top-level imports measured in a fresh interpreter (python -X importtime)")
+                st.dataframe(report["import_times"], use_container_width=True, hide_index=True)
+            else:
+                st.caption("The script has no top-level imports")
 
-        # Combine stdout and stderr
-        output = ""
-        if result.stdout:
-            output += "STDOUT:\n" + result.stdout
-        if result.stderr:
-            if output:
-                output += "\n\n"
-            output += "STDERR:\n" + result.stderr
 
-        if result.returncode != 0:
-            return False, f"Execution failed with return code {result.returncode}\n\n{output}"
+def start_benchmark(script_code, filename, iterations, threshold, timeout=30, memory_limit_mb=None):
+    """
+    Queue the editor buffer as a repeated benchmark run against the last saved version of a file.
 
-        return True, output if output else "Script executed successfully (no output)"
+    Args:
+        script_code (str): Current editor content
+        filename (str): File whose last saved version is the baseline (skipped if it has none)
+        iterations (int): Runs per version
+        threshold (float): Relative slowdown flagged as a regression
+        timeout (float): Seconds allowed per iteration
+        memory_limit_mb (int): Memory cap per iteration (None for no cap)
 
-    except subprocess.TimeoutExpired:
-        return False, "Error: Script execution timed out (30 seconds)"
+    Returns:
+        tuple: (success: bool, error message or None)
+    """
+    try:
+        baseline = saved_version(filename)
     except Exception as e:
-        return False, f"Error executing script: {str(e)}"
+        return False, f"Error loading the saved version: {str(e)}"
+
+    run_queue = get_run_queue()
+    versions = 1 if baseline is None else 2
+    try:
+        run_id = run_queue.submit(get_current_user(), script_code, timeout=timeout * iterations * versions,
+                                  memory_limit_mb=memory_limit_mb, repeat=iterations, baseline=baseline)
+    except QueueFullError as e:
+        return False, f"Error: {str(e)}"
+
+    st.session_state.active_benchmark = {"run_id": run_id, "file": filename, "threshold": threshold}
+    return True, None
+
+
+def saved_version(filename):
+    """
+    Text of a file's last saved version, or None if it was never saved.
+
+    The last snapshot in the update history is preferred over the file on disk,
+    which may have been changed outside the editor since.
+    """
+    entry = get_history_store().latest_snapshot(filename)
+    if entry is not None:
+        try:
+            return get_snapshot_store().get(entry["content_hash"])
+        except KeyError:
+            pass  # Snapshot removed: fall back to the file on disk
+    filepath = safe_join(SRC_DIR, filename)
+    if os.path.exists(filepath):
+        return get_file_cache().read(filepath)
+    return None
+
+
+@st.fragment(run_every=0.5)
+def show_active_benchmark():
+    """Poll the benchmark run and build the comparison report once it finishes."""
+    run_queue = get_run_queue()
+    benchmark = st.session_state.active_benchmark
+    status = run_queue.status(benchmark["run_id"])
+
+    if status is None or status["state"] == "done":
+        summaries, errors = {}, []
+        if status is None:
+            errors.append("The benchmark's result is no longer available")
+        else:
+            result = status["result"]
+            run_queue.forget(status["run_id"])
+            if result["cancelled"]:
+                errors.append("Benchmark cancelled")
+            elif result["timed_out"]:
+                errors.append("The benchmark timed out")
+            else:
+                summaries["current"] = summarize(result)
+                if "baseline_iterations" in result:
+                    summaries["saved"] = summarize(result, "baseline_iterations")
+        report = {"file": benchmark["file"], "threshold": benchmark["threshold"], "errors": errors,
+                  "summaries": summaries}
+        if "current" in summaries:
+            report["rows"] = compare(summaries["current"], summaries.get("saved"), benchmark["threshold"])
+        st.session_state.benchmark_report = report
+        st.session_state.active_benchmark = None
+        st.rerun()
+
+    info_col, cancel_col = st.columns([4, 1])
+    with cancel_col:
+        if st.button("⏹️ Cancel", key="cancel_benchmark", use_container_width=True):
+            run_queue.cancel(benchmark["run_id"])
+    with info_col:
+        st.info(f"🏁 Benchmarking {benchmark['file']} ({status['state']})...")
+
+
+def show_benchmark_report(report):
+    """Render a finished benchmark and flag regressions against the saved version."""
+    for error in report["errors"]:
+        st.error(error)
+    if "rows" not in report:
+        return
+    current = report["summaries"]["current"]
+    if current["failures"]:
+        st.warning(f"{current['failures']} of {current['runs']} runs of the editor version failed")
+    if "saved" not in report["summaries"]:
+        st.info(f"{report['file']} has no saved version yet, showing the editor version only")
+    st.dataframe(report["rows"], use_container_width=True, hide_index=True)
+    regressions = [row["metric"] for row in report["rows"] if row["regression"]]
+    if regressions:
+        st.error(f"⚠️ Regression beyond {report['threshold']:.0%}: {', '.join(regressions)}")
+    elif "saved" in report["summaries"]:
+        st.success(f"✅ No regressions beyond {report['threshold']:.0%} against the saved {report['file']}")
+
+
+def start_sweep(script_code, filename, table_rows, timeout=30, memory_limit_mb=None):
+    """
+    Start running the editor buffer once per row of the sweep table.
+
+    Rows are queued from show_active_sweep() as the user's share of the run
+    queue allows, so a long sweep never fills the queue for everybody else.
 
+    Args:
+        script_code (str): Current editor content
+        filename (str): File being swept (for display)
+        table_rows (list): Rows of the sweep table ("Arguments", "Environment")
+        timeout (float): Seconds allowed per row
+        memory_limit_mb (int): Memory cap per row (None for no cap)
 
-def save_script_to_file(script_code, filename="handler.py", update_message=""):
-    """Save the script to a file and record update history."""
+    Returns:
+        tuple: (success: bool, error message or None)
+    """
     try:
-        if script_code is None:
-            return False, "Error: No script content to save"
+        params = parse_rows(table_rows)
+    except ValueError as e:
+        return False, f"Error: {str(e)}"
+    spool = get_output_spool()
+    for row in (st.session_state.sweep_report or {}).get("rows", ()):
+        spool.discard(row["output"])
+    st.session_state.sweep_report = None
+    st.session_state.sweep_output_page = 0
+    st.session_state.active_sweep = {
+        "file": filename,
+        "source": script_code,
+        "options": {"timeout": timeout, "memory_limit_mb": memory_limit_mb},
+        "rows": [{"params": p, "run_id": None, "line": result_row(p, "pending"), "output": None, "done": False}
+                 for p in params],
+    }
+    return True, None
+
+
+def finish_sweep_row(row, result, output_files=None):
+    """Record a sweep row's final result; its full output goes to the output spool."""
+    row["line"] = result_row(row["params"], None, result)
+    row["output"] = spool_run_output(result, output_files)[1]
+    row["done"] = True
+
+
+@st.fragment(run_every=0.5)
+def show_active_sweep():
+    """Queue the sweep's remaining rows as room frees up and stream finished rows into the results table."""
+    run_queue = get_run_queue()
+    sweep = st.session_state.active_sweep
+
+    for row in sweep["rows"]:
+        if row["run_id"] is None and not row["done"]:
+            try:
+                row["run_id"] = run_queue.submit(get_current_user(), sweep["source"], argv=row["params"]["argv"],
+                                                 env=row["params"]["env_vars"], **sweep["options"])
+            except QueueFullError:
+                break  # The user's share of the queue is full; the next poll queues more
+            row["line"] = result_row(row["params"], "queued")
+
+    for row in sweep["rows"]:
+        if row["run_id"] is None or row["done"]:
+            continue
+        status = run_queue.status(row["run_id"])
+        if status is None:
+            finish_sweep_row(row, {"returncode": None, "duration": 0.0, "timed_out": False, "cancelled": False,
+                                   "stdout": "", "stderr": "Run result is no longer available"})
+        elif status["state"] == "done":
+            finish_sweep_row(row, status["result"], status.get("output_files"))
+            run_queue.forget(row["run_id"])
+        else:
+            row["line"] = result_row(row["params"], status["state"], elapsed=status.get("elapsed"))
+
+    done = sum(1 for row in sweep["rows"] if row["done"])
+    if done == len(sweep["rows"]):
+        st.session_state.sweep_report = {"file": sweep["file"],
+                                         "rows": [{"line": row["line"], "output": row["output"]}
+                                                  for row in sweep["rows"]]}
+        st.session_state.active_sweep = None
+        st.rerun()
+
+    info_col, cancel_col = st.columns([4, 1])
+    with cancel_col:
+        if st.button("⏹️ Cancel", key="cancel_sweep", use_container_width=True):
+            for row in sweep["rows"]:
+                if row["run_id"] is not None:
+                    run_queue.cancel(row["run_id"])  # The next poll picks up the cancelled result
+                elif not row["done"]:
+                    finish_sweep_row(row, {"returncode": None, "duration": 0.0, "timed_out": False,
+                                           "cancelled": True, "stdout": "", "stderr": ""})
+    with info_col:
+        running = sum(1 for row in sweep["rows"] if row["line"]["status"] == "running")
+        st.info(f"🧪 Sweeping {sweep['file']}: {done} of {len(sweep['rows'])} rows done, {running} running...")
+    st.progress(done / len(sweep["rows"]))
+    st.dataframe([row["line"] for row in sweep["rows"]], use_container_width=True, hide_index=True)
+
+
+def show_sweep_report(report):
+    """Render a finished sweep as a sortable table with each row's full output on demand."""
+    lines = [row["line"] for row in report["rows"]]
+    counts = {}
+    for line in lines:
+        counts[line["status"]] = counts.get(line["status"], 0) + 1
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    if counts.get("ok") == len(lines):
+        st.success(f"✅ All {len(lines)} rows of the {report['file']} sweep succeeded")
+    else:
+        st.warning(f"⚠️ {report['file']} sweep: {summary}")
+    st.caption("Click a column to sort")
+    st.dataframe(lines, use_container_width=True, hide_index=True)
+    labels = [f"Row {line['row']}: {line['arguments'] or line['environment']} ({line['status']})" for line in lines]
+    picked = st.selectbox("Show output of row", range(len(lines)), key="sweep_output_row",
+                          format_func=lambda i: labels[i])
+    if picked is not None and picked < len(lines):
+        show_execution_output(report["rows"][picked]["output"], page_key="sweep_output_page")
+
+
+def show_execution_output(handle, page_key="output_page"):
+    """Render run output, one page at a time when it was spooled to disk (page number kept in page_key)."""
+    spool = get_output_spool()
+    pages = spool.page_count(handle)
+    if pages == 0:
+        st.warning("This output is no longer available")
+        return
+    page = min(st.session_state.get(page_key, 0), pages - 1)
+    if pages > 1:
+        st.caption(f"Output is {handle['size'] / 1024:.0f} KB, shown in {pages} pages")
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("⬅️ Previous", key=f"{page_key}_prev", use_container_width=True, disabled=page == 0):
+                st.session_state[page_key] = page - 1
+                st.rerun()
+        with page_col:
+            st.caption(f"Page {page + 1} of {pages}")
+        with next_col:
+            if st.button("Next ➡️", key=f"{page_key}_next", use_container_width=True, disabled=page >= pages - 1):
+                st.session_state[page_key] = page + 1
+                st.rerun()
+    st.code(spool.page(handle, page), language="text")
+
+
+def restore_snapshot(entry):
+    """Load a saved version from the history into the editor (saving it is up to the user)."""
+    st.session_state.loaded_chunks = None
+    st.session_state.loaded_version = current_version(entry["filename"])  # Saving replaces what is on disk now
+    st.session_state.draft_hash = None
+    set_script_content(get_snapshot_store().get(entry["content_hash"]))
+    st.session_state.selected_file = entry["filename"]
+    st.session_state.save_filename = entry["filename"]
+    st.session_state.update_message = f"Restore version from {entry['timestamp']}"
+
+
+def show_version_diff(old_entry, new_entry):
+    """Render the diff between two history entries' snapshots."""
+    diff = get_snapshot_store().diff(
+        old_entry["content_hash"], new_entry["content_hash"],
+        f"{old_entry['filename']} @ {old_entry['timestamp']}", f"{new_entry['filename']} @ {new_entry['timestamp']}"
+    )
+    if diff:
+        st.code(diff, language="diff")
+    else:
+        st.caption("No changes between these versions")
 
-        # Ensure filename is just the basename (no path)
-        filename = os.path.basename(filename)
 
-        # Construct filepath in src/ directory
-        src_dir = os.path.dirname(__file__)  # Gets the src/ directory
-        filepath = os.path.join(src_dir, filename)
+def format_version(entry):
+    """Label of a history entry in version pickers."""
+    return f"#{entry['id']} · {entry['timestamp']} · {entry['user']} · {entry['update_message'][:40]}"
 
-        # Save the script to src/ directory
-        with open(filepath, 'w') as f:
-            f.write(script_code)
-
-        # Record history entry
-        history_entry = {
-            "filename": filename,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "user": getpass.getuser(),
-            "update_message": update_message if update_message else "No message provided",
-            "file_size": len(script_code)
-        }
 
-        # Add to history
-        st.session_state.update_history.append(history_entry)
+def file_chunk_count(filename):
+    """Number of chunks a large file is shown in, or None for files loaded whole."""
+    try:
+        filepath = safe_join(SRC_DIR, filename)
+        cache = get_file_cache()
+        return cache.chunk_count(filepath) if cache.is_large(filepath) else None
+    except (OSError, ValueError):
+        return None
+
+
+def current_version(filename):
+    """Content hash of a file as it is on disk now (computed once per change by the shared cache), or None."""
+    try:
+        return get_file_cache().version(safe_join(SRC_DIR, filename))
+    except (OSError, ValueError):
+        return None
+
+
+def open_file(filename):
+    """Switch the editor to a file (safe to call from widget callbacks)."""
+    # Large files open read-only with only their first chunk loaded
+    st.session_state.loaded_chunks = 1 if file_chunk_count(filename) else None
+    st.session_state.highlight_line = None
+    st.session_state.draft_hash = None
+    st.session_state.selected_file = filename
+    set_script_content(load_file_content(filename, st.session_state.loaded_chunks), shared=True)
+    st.session_state.loaded_version = None if st.session_state.loaded_chunks else current_version(filename)
+    st.session_state.save_filename = filename
+    st.session_state.save_conflict = None
+
+
+def load_more_chunks(count=1):
+    """Show count more chunks of the current large file (None loads the rest for editing)."""
+    filename = st.session_state.selected_file
+    total = file_chunk_count(filename)
+    if count is None or not total or st.session_state.loaded_chunks + count >= total:
+        st.session_state.loaded_chunks = None
+    else:
+        st.session_state.loaded_chunks += count
+    set_script_content(load_file_content(filename, st.session_state.loaded_chunks), shared=True)
+    if st.session_state.loaded_chunks is None:
+        st.session_state.loaded_version = current_version(filename)
+
+
+def open_at_line(filename, line):
+    """Search result callback: open a file with one of its lines highlighted."""
+    if filename != st.session_state.selected_file:
+        open_file(filename)  # Staying in the open file keeps the editor's unsaved changes
+    if st.session_state.loaded_chunks is not None and line > get_script_content().count("\n"):
+        load_more_chunks(None)  # The hit is past the loaded chunks
+    st.session_state.highlight_line = line
+
+
+@st.fragment(run_every=0.5)
+def wait_for_symbol_index():
+    """Show that the background symbol index is still working and rerun once it has caught up."""
+    if not get_symbol_index().pending():
+        st.rerun()
+    st.caption("⏳ Indexing symbols...")
+
+
+@st.fragment(run_every=0.5)
+def wait_for_diagnostics(digest):
+    """Show that the background check is running and rerun to draw its annotations once it is done."""
+    try:
+        done = get_code_checker().diagnostics(digest) is not None
+    except KeyError:
+        done = True  # Dropped from the checker's cache: the rerun submits the text again
+    if done:
+        st.session_state.keep_save_notice = True  # The rerun would otherwise drop the save confirmation
+        st.rerun()
+    st.caption("⏳ Checking syntax...")
+
+
+def on_file_selected():
+    """File selector callback: open the picked file."""
+    if st.session_state.file_selector:
+        open_file(st.session_state.file_selector)
+
+
+def reset_history_page():
+    """Go back to the first history page (used when a history filter changes)."""
+    st.session_state.history_page = 1
+
+
+def save_script_to_file(script_code, filename="handler.py", update_message="", expected_version=None,
+                        create=False):
+    """
+    Save the script to a file and record update history.
+
+    Saves of the same file are serialized by a file lock and written atomically.
+    With expected_version (the content hash the editor loaded), a file that
+    someone else saved in the meantime raises SaveConflictError instead of
+    being overwritten; with create ("save as" under a new name), so does any
+    existing file.
+    """
+    try:
+        if script_code is None:
+            return False, "Error: No script content to save"
+
+        # Paths are relative to src/ (sub-folders allowed) and may not escape it
+        try:
+            filepath = safe_join(SRC_DIR, filename)
+        except ValueError as e:
+            return False, f"Error: {str(e)}"
+        filename = os.path.relpath(filepath, os.path.realpath(SRC_DIR)).replace(os.sep, "/")
 
-        # Save history to project root (one level up from src/)
-        project_root = os.path.dirname(src_dir)
-        history_file = os.path.join(project_root, ".script_history.json")
-        with open(history_file, 'w') as f:
-            json.dump(st.session_state.update_history, f, indent=2)
+        # Save the script to src/ directory
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with file_lock(filepath):
+            # The file and its history entry are written under the same lock so concurrent saves stay in order
+            write_if_unchanged(filepath, script_code, expected_version, create)
+
+            # Snapshot the contents as a delta against the file's previous saved version, recording the
+            # history entry in the same transaction (a single indexed insert, however long the history is)
+            previous = get_history_store().latest_snapshot(filename)
+            get_snapshot_store().put(script_code, previous["content_hash"] if previous else None, history_entry={
+                "filename": filename,
+                "user": getpass.getuser(),
+                "update_message": update_message if update_message else "No message provided",
+                "file_size": len(script_code),
+            })
+        get_file_index().invalidate(filename)
+        get_search_index().update(filename, script_code)
+        get_symbol_index().schedule(filename, script_code)
+        get_code_checker().submit(script_code, filename)
 
         return True, f"Script saved to src/{filename}"
+    except SaveConflictError:
+        raise
     except Exception as e:
         return False, f"Error saving script: {str(e)}"
 
 
+# New sessions open handler.py: the text is the shared cached copy, so a session only holds a reference.
+# The buffer lives in the shared session memory; session state only keeps its id.
+if 'buffer_id' not in st.session_state:
+    # Keyed by the session id so the buffer is released once the session ends
+    ctx = get_script_run_ctx()
+    st.session_state.buffer_id = ctx.session_id if ctx else uuid.uuid4().hex
+    if os.path.exists(os.path.join(SRC_DIR, 'handler.py')):
+        set_script_content(load_file_content('handler.py'), shared=True)
+        # Content hash of the open file as loaded from disk, checked on save to detect concurrent edits
+        st.session_state.loaded_version = current_version('handler.py')
+    else:
+        set_script_content(DEFAULT_SCRIPT)
+        st.session_state.loaded_version = None
+
+# Start the shared worker pool with the first page load so the first run is already warm
+get_run_queue()
+get_metrics_server()
+
 # Sidebar controls
 with st.sidebar:
     st.header("📂 File Browser")
 
-    # Get all Python files
-    python_files = get_python_files()
-
-    if python_files:
-        # Find the index of the currently selected file
-        try:
-            current_index = python_files.index(st.session_state.selected_file)
-        except ValueError:
-            current_index = 0
-            st.session_state.selected_file = python_files[0]
-
-        # File selector
-        selected = st.selectbox(
+    # Folders come from the shared index, which only rescans directories that changed
+    file_index = get_file_index()
+    folders = file_index.directories()
+
+    if any(file_index.files_in(folder) for folder in folders):
+        # Follow the edited file when it was switched elsewhere (save as, restore, new file)
+        if st.session_state.get('browsed_file') != st.session_state.selected_file:
+            st.session_state.browse_folder = os.path.dirname(st.session_state.selected_file)
+            st.session_state.browsed_file = st.session_state.selected_file
+        if st.session_state.get('browse_folder') not in folders:
+            st.session_state.browse_folder = folders[0]
+
+        # Folder and file selectors form the tree view
+        if len(folders) > 1:
+            st.selectbox("Folder:", folders, key="browse_folder",
+                         format_func=lambda folder: f"src/{folder}" if folder else "src/")
+        folder_files = file_index.files_in(st.session_state.browse_folder)
+        st.session_state.file_selector = (
+            st.session_state.selected_file if st.session_state.selected_file in folder_files else None
+        )
+        st.selectbox(
             "Select a Python file to edit:",
-            python_files,
-            index=current_index,
-            key="file_selector"
+            folder_files,
+            key="file_selector",
+            format_func=os.path.basename,
+            placeholder="Choose a file",
+            on_change=on_file_selected  # Loads the file before the rerun renders the editor
         )
 
-        # Load file content when selection changes
-        if selected != st.session_state.selected_file:
-            st.session_state.selected_file = selected
-            st.session_state.script_content = load_file_content(selected)
-            st.session_state.save_filename = selected
-            st.rerun()
-
         # Show file info
         st.caption(f"📄 Editing: **{st.session_state.selected_file}**")
-        try:
-            filepath = os.path.join(os.path.dirname(__file__) if os.path.dirname(__file__) else ".", st.session_state.selected_file)
-            file_size = os.path.getsize(filepath)
-            st.caption(f"📏 Size: {file_size} bytes")
-        except:
-            pass
+        file_stat = file_index.stat(st.session_state.selected_file)
+        if file_stat:
+            st.caption(f"📏 Size: {file_stat[0]} bytes")
     else:
         st.warning("No Python files found in directory")
 
+    # Search across every file, answered from the shared trigram index
+    with st.expander("🔎 Search Files"):
+        search_query = st.text_input("Search:", key="file_search", placeholder="Text or pattern in the .py files")
+        regex_col, case_col = st.columns(2)
+        with regex_col:
+            search_regex = st.checkbox("Regex", key="file_search_regex")
+        with case_col:
+            search_case = st.checkbox("Match case", key="file_search_case")
+        st.caption("Searches the Python files listed above (the files the editor can open)")
+        if search_query:
+            search_index = get_search_index()
+            search_index.sync(file_index)  # Re-stats the tree only when the listing changed or every few seconds
+            try:
+                hits = search_index.search(search_query, regex=search_regex, case_sensitive=search_case)
+            except re.error as e:
+                st.error(f"Invalid pattern: {e}")
+                hits = []
+            else:
+                st.caption(f"{len(hits)}{'+' if len(hits) >= DEFAULT_MAX_HITS else ''} matching lines")
+            for i, hit in enumerate(hits):
+                st.button(f"{hit['file']}:{hit['line']}  {hit['text'].strip()[:60]}", key=f"search_hit_{i}",
+                          use_container_width=True, on_click=open_at_line, args=(hit["file"], hit["line"]))
+
+    # Outline of the open file and jump-to-definition, answered from the background symbol index
+    with st.expander("🧭 Outline & Definitions"):
+        symbol_index = get_symbol_index()
+        symbol_index.sync(file_index)  # Re-stats the tree only when the listing changed or every few seconds
+        outline = symbol_index.outline(st.session_state.selected_file)
+        if outline:
+            for i, symbol in enumerate(outline):
+                icon = {"class": "🅲", "function": "ƒ", "method": "· ƒ", "variable": "𝑥"}[symbol["kind"]]
+                st.button(f"{icon} {symbol['qualname']}  (line {symbol['line']})", key=f"outline_{i}",
+                          use_container_width=True, on_click=open_at_line,
+                          args=(st.session_state.selected_file, symbol["line"]))
+        elif not symbol_index.pending(st.session_state.selected_file):
+            st.caption("No outline: the saved file is empty, too large or does not parse")
+
+        definition_query = st.text_input("Go to definition:", key="definition_query",
+                                         placeholder="generate_mediaconvert_job or Class.method")
+        if definition_query:
+            definitions = symbol_index.definitions(definition_query.strip())
+            if definitions:
+                for i, symbol in enumerate(definitions):
+                    st.button(f"{symbol['file']}:{symbol['line']}  {symbol['kind']} {symbol['qualname']}",
+                              key=f"definition_{i}", use_container_width=True, on_click=open_at_line,
+                              args=(symbol["file"], symbol["line"]))
+            elif not symbol_index.pending():
+                st.caption(f"No definition of '{definition_query.strip()}' found")
+        if symbol_index.pending():
+            wait_for_symbol_index()
+
     # Create new file option
     with st.expander("➕ Create New File"):
-        new_filename = st.text_input("New file name:", placeholder="my_script.py")
+        new_filename = st.text_input("New file name:", placeholder="my_script.py or tools/my_script.py")
         if st.button("Create File", use_container_width=True):
             if new_filename:
                 if new_filename.endswith('.py'):
                     try:
-                        filepath = os.path.join(os.path.dirname(__file__) if os.path.dirname(__file__) else ".", new_filename)
+                        filepath = safe_join(SRC_DIR, new_filename)
                         if not os.path.exists(filepath):
+                            os.makedirs(os.path.dirname(filepath), exist_ok=True)
                             with open(filepath, 'w') as f:
                                 f.write("# New Python script\n\ndef main():\n    print('Hello, World!')\n\nif __name__ == '__main__':\n    main()\n")
-                            st.session_state.selected_file = new_filename
-                            st.session_state.script_content = load_file_content(new_filename)
-                            st.session_state.save_filename = new_filename
+                            new_filename = os.path.relpath(filepath, os.path.realpath(SRC_DIR)).replace(os.sep, "/")
+                            get_file_index().invalidate(new_filename)
+                            open_file(new_filename)
                             st.success(f"Created {new_filename}")
                             st.rerun()
                         else:
@@ -252,14 +1044,31 @@ with st.sidebar:
 
     st.checkbox("Show Minimap", value=True, key="show_minimap")  # Binds directly to session state
 
+    st.markdown("---")
+    st.header("⏱️ Run Limits")
+
+    st.number_input("Time limit (seconds)", min_value=1, max_value=3600, step=5, key="run_timeout",
+                    help="Scripts running longer than this are stopped")
+
+    st.number_input("Memory limit (MB, 0 = none)", min_value=0, max_value=65536, step=128, key="run_memory_mb",
+                    help="Allocations beyond this raise MemoryError inside the script")
+
     st.markdown("---")
     st.header("📁 File Operations")
 
     if st.button("🔄 Reload Current File", use_container_width=True):
-        filepath = os.path.join(os.path.dirname(__file__) if os.path.dirname(__file__) else ".", st.session_state.selected_file)
-        if os.path.exists(filepath):
-            with open(filepath, 'r') as f:
-                st.session_state.script_content = f.read()
+        try:
+            filepath = safe_join(SRC_DIR, st.session_state.selected_file)
+        except ValueError:
+            filepath = None
+        if filepath and os.path.exists(filepath):
+            # Unchanged files come straight from the shared cache; changed ones have a new mtime and are re-read
+            set_script_content(load_file_content(st.session_state.selected_file, st.session_state.loaded_chunks),
+                               shared=True)
+            if st.session_state.loaded_chunks is None:
+                st.session_state.loaded_version = current_version(st.session_state.selected_file)
+            st.session_state.save_conflict = None
+            st.session_state.draft_hash = None  # The draft of the discarded edits is offered again
             st.success(f"Reloaded {st.session_state.selected_file}!")
             st.rerun()
         else:
@@ -267,21 +1076,78 @@ with st.sidebar:
 
     st.markdown("---")
     st.header("📊 History Stats")
-    history_count = len(st.session_state.update_history)
+    history_store = get_history_store()
+    history_count = history_store.count()
     st.metric("Total Updates", history_count)
     if history_count > 0:
-        last_update = st.session_state.update_history[-1]
+        last_update = history_store.latest()
         st.caption(f"Last update: {last_update['timestamp']}")
         st.caption(f"By: {last_update['user']}")
 
     st.markdown("---")
     st.info("💡 **Tip:** Select a file from the sidebar, edit it, then save or run.")
+    if 'first_render_ms' in st.session_state:
+        st.caption(f"⚡ This session's first page render took {st.session_state.first_render_ms:.0f} ms")
 
 # Main editor area
 st.subheader(f"📝 Code Editor - {st.session_state.selected_file}")
 
+editor_markers = []
+if st.session_state.highlight_line:
+    row = st.session_state.highlight_line - 1
+    editor_markers.append({"startRow": row, "startCol": 0, "endRow": row, "endCol": 1,
+                           "className": "ace_selection", "type": "fullLine"})
+    st.caption(f"🔎 Line {st.session_state.highlight_line} is highlighted")
+
+if st.session_state.pop('buffer_evicted', False):
+    st.info("♻️ This tab was idle and its editor text was released to save server memory; "
+            f"{st.session_state.selected_file} was reloaded from disk.")
+
+partial_file = st.session_state.loaded_chunks is not None
+if partial_file:
+    total_chunks = file_chunk_count(st.session_state.selected_file) or st.session_state.loaded_chunks
+    size_mb = (get_file_index().stat(st.session_state.selected_file) or (0, 0))[0] / (1024 * 1024)
+    info_col, more_col, all_col = st.columns([3, 1, 1])
+    with info_col:
+        st.info(f"📄 Large file ({size_mb:.1f} MB): showing the first {st.session_state.loaded_chunks} "
+                f"of {total_chunks} chunks, read-only. Load the whole file to edit, save or run it.")
+    with more_col:
+        st.button("⬇️ Load more", use_container_width=True, on_click=load_more_chunks)
+    with all_col:
+        st.button("📖 Load whole file", use_container_width=True, on_click=load_more_chunks, args=(None,))
+
+# Offer the draft autosaved when this file was last edited without saving (e.g. in a tab that was closed)
+if not partial_file and st.session_state.draft_hash is None:
+    draft_info = get_draft_store().info(get_draft_owner(), st.session_state.selected_file)
+    if draft_info and not draft_info["pending"] and draft_info["hash"] != content_hash(get_script_content()):
+        draft_col, restore_col, discard_col = st.columns([3, 1, 1])
+        with draft_col:
+            st.info(f"📝 Unsaved changes to {st.session_state.selected_file} were autosaved as a draft "
+                    f"at {draft_info['updated']}.")
+        with restore_col:
+            st.button("↩️ Restore draft", use_container_width=True, on_click=restore_draft,
+                      args=(st.session_state.selected_file,))
+        with discard_col:
+            st.button("🗑️ Discard draft", use_container_width=True, on_click=discard_draft,
+                      args=(st.session_state.selected_file,))
+
+# Gutter annotations from the background check of the loaded (or last saved) text
+code_checker = get_code_checker()
+checked_digest, diagnostics = None, None
+editor_annotations = []
+if not partial_file:
+    checked_digest = code_checker.submit(get_script_content(), st.session_state.selected_file)
+    try:
+        diagnostics = code_checker.diagnostics(checked_digest)
+    except KeyError:
+        diagnostics = None  # Dropped right after submit() by other sessions' checks; checked again below
+    editor_annotations = [
+        {"row": d["line"] - 1, "column": d["column"], "type": d["severity"], "text": d["message"]}
+        for d in diagnostics or []
+    ]
+
 code = st_ace(
-    value=st.session_state.script_content,
+    value=get_script_content(),
     height=500,
     language="python",
     theme=st.session_state.editor_theme if st.session_state.editor_theme != "vs-light" else "github",
@@ -292,8 +1158,12 @@ code = st_ace(
     show_print_margin=False,
     wrap=False,
     auto_update=False,  # Critical: prevents automatic updates that cause cursor reset
-    readonly=False,
-    key=f"code_editor_{st.session_state.selected_file}"  # Dynamic key per file for proper reloading
+    readonly=partial_file,
+    markers=editor_markers,
+    annotations=editor_annotations,
+    # Dynamic key per file (and per loaded chunk count) for proper reloading
+    key=f"code_editor_{st.session_state.selected_file}"
+        + (f"_{st.session_state.loaded_chunks}" if partial_file else "")
 )
 
 # Don't update session state here - it causes reruns and cursor resets!
@@ -302,7 +1172,21 @@ code = st_ace(
 
 # If code is None (shouldn't happen, but just in case), use session state
 if code is None:
-    code = st.session_state.script_content
+    code = get_script_content()
+
+# Autosave unsaved changes as a draft; the write happens in the background once the edits settle
+if not partial_file:
+    autosave_draft(code)
+    if st.session_state.draft_hash is not None:
+        st.caption("📝 Unsaved changes are autosaved as a draft")
+
+if diagnostics:
+    errors = sum(1 for d in diagnostics if d["severity"] == "error")
+    with st.expander(f"{'❌' if errors else '⚠️'} {len(diagnostics)} problem(s) found by the syntax check"):
+        for d in diagnostics:
+            st.markdown(f"{'❌' if d['severity'] == 'error' else '⚠️'} Line {d['line']}: {d['message']}")
+elif diagnostics is not None:
+    st.caption("✅ No syntax errors" + ("" if code_checker.lint_enabled else " (install pyflakes for lint checks)"))
 
 # File save form - prevents reruns while typing
 st.markdown("---")
@@ -326,16 +1210,38 @@ with st.form(key="save_form", clear_on_submit=False):
 
     save_submitted = st.form_submit_button("💾 Save to File", use_container_width=True)
 
-    if save_submitted:
+    # Show the last save's confirmation again only on the rerun that draws its check results
+    keep_save_notice = st.session_state.pop('keep_save_notice', False)
+    save_notice = st.session_state.pop('save_notice', None)
+    if keep_save_notice and save_notice and not save_submitted:
+        st.success(save_notice)
+
+    if save_submitted and partial_file:
+        st.error("Only part of this file is loaded: load the whole file before saving")
+    elif save_submitted:
         # Update session state with current editor content before saving
-        st.session_state.script_content = code
+        set_script_content(code)
 
         # Check if this is a new file (different from currently selected)
         is_new_file = filename_form != st.session_state.selected_file
 
-        success, message = save_script_to_file(code, filename_form, update_message_form)
+        # A save over the loaded file is checked against the loaded version; saving under a new
+        # name must not replace an existing file without confirmation
+        expected_version = st.session_state.loaded_version if not is_new_file else None
+        try:
+            success, message = save_script_to_file(code, filename_form, update_message_form, expected_version,
+                                                   create=is_new_file)
+        except SaveConflictError as e:
+            st.session_state.save_conflict = {"filename": filename_form, "code": code, "new_file": is_new_file,
+                                              "message": update_message_form, "their_text": e.current_text}
+            success, message = False, f"Not saved: {e}"
         if success:
+            get_draft_store().discard(get_draft_owner(), st.session_state.selected_file)
+            st.session_state.draft_hash = None
+            st.session_state.loaded_version = content_hash(code)
+            st.session_state.save_conflict = None
             st.success(message)
+            st.session_state.save_notice = message
             st.session_state.save_filename = filename_form
             st.session_state.update_message = ""  # Clear for next save
 
@@ -343,7 +1249,7 @@ with st.form(key="save_form", clear_on_submit=False):
             if is_new_file:
                 st.session_state.selected_file = filename_form
                 # Load the content we just saved to ensure consistency
-                st.session_state.script_content = code
+                set_script_content(code)
                 st.info(f"✨ Switched to editing: {filename_form}")
                 st.rerun()  # Rerun to refresh file list and editor
         else:
@@ -352,35 +1258,244 @@ with st.form(key="save_form", clear_on_submit=False):
 # Note: We don't update session state here to avoid triggering reruns while typing
 # The values will be used directly from the input variables when saving
 
+# A save refused because someone else saved the file first
+if st.session_state.save_conflict:
+    conflict = st.session_state.save_conflict
+    their_save = get_history_store().latest(conflict["filename"])
+    if conflict.get("new_file"):
+        st.warning(f"⚠️ {conflict['filename']} already exists. Your version was not saved.")
+    else:
+        st.warning(f"⚠️ {conflict['filename']} was saved"
+                   + (f" by {their_save['user']} at {their_save['timestamp']}" if their_save else " by someone else")
+                   + " after you loaded it. Your version was not saved.")
+    with st.expander("🔀 Their version → your version"):
+        conflict_diff = "".join(difflib.unified_diff(
+            conflict["their_text"].splitlines(keepends=True), conflict["code"].splitlines(keepends=True),
+            "saved", "yours"
+        ))
+        st.code(conflict_diff or "No differences", language="diff")
+    overwrite_col, theirs_col, dismiss_col = st.columns(3)
+    with overwrite_col:
+        if st.button("💾 Overwrite with my version", use_container_width=True):
+            try:
+                success, message = save_script_to_file(conflict["code"], conflict["filename"], conflict["message"],
+                                                       content_hash(conflict["their_text"]))
+            except SaveConflictError as e:
+                conflict["their_text"] = e.current_text  # Saved again meanwhile: show the newest version
+                success, message = False, f"Not saved: {e}"
+            if success:
+                get_draft_store().discard(get_draft_owner(), st.session_state.selected_file)
+                st.session_state.draft_hash = None
+                st.session_state.loaded_version = content_hash(conflict["code"])
+                st.session_state.save_conflict = None
+                st.session_state.update_message = ""
+                st.success(message)
+                if conflict.get("new_file"):
+                    # Confirmed "save as" over an existing file: continue editing it
+                    st.session_state.selected_file = conflict["filename"]
+                    st.session_state.save_filename = conflict["filename"]
+                    st.session_state.save_notice = message
+                    st.session_state.keep_save_notice = True
+                    st.rerun()
+            else:
+                st.error(message)
+    with theirs_col:
+        st.button("📥 Load their version", use_container_width=True, on_click=open_file,
+                  args=(conflict["filename"],))
+    with dismiss_col:
+        if st.button("✖️ Keep editing", use_container_width=True):
+            st.session_state.save_conflict = None
+            st.rerun()
+
+# Redraw the editor once the check of newly loaded or saved text finishes
+if not partial_file:
+    latest_digest = code_checker.submit(get_script_content(), st.session_state.selected_file)
+    if latest_digest != checked_digest or diagnostics is None:
+        wait_for_diagnostics(latest_digest)
+
 # Action buttons (Run Script and Show History)
 col1, col2, col3 = st.columns([1, 1, 2])
 
 with col1:
-    if st.button("▶️ Run Script", use_container_width=True, type="primary"):
-        # Update session state with current editor content before running
-        st.session_state.script_content = code
-
-        with st.spinner("Executing script..."):
-            success, output = execute_python_script(code)
-            st.session_state.execution_output = output
-            if success:
-                st.success("✅ Execution completed!")
-            else:
-                st.error("❌ Execution failed!")
+    run_clicked = st.button("▶️ Run Script", use_container_width=True, type="primary",
+                            disabled=st.session_state.active_run_id is not None)
 
 with col2:
     if st.button("📜 Show History", use_container_width=True):
         st.session_state.show_history = not st.session_state.get('show_history', False)
 
+with col3:
+    st.checkbox("📡 Stream output live", value=True, key="stream_output",
+                help="Show output while the script runs instead of only when it finishes")
+    st.checkbox("♻️ Reuse cached results", value=False, key="use_run_cache",
+                help="Return the stored output of an identical earlier run instead of running again. "
+                     "Only use this for scripts without side effects.")
+    st.checkbox("🔬 Run with profiler", value=False, key="profile_run",
+                help="Collect function timings, allocation sites and peak memory (slows the script down)")
+    st.checkbox("📦 Include import times", value=False, key="profile_imports",
+                disabled=not st.session_state.get("profile_run", False),
+                help="Also time the script's top-level imports in a fresh interpreter")
+
+if run_clicked and partial_file:
+    st.error("Only part of this file is loaded: load the whole file before running it")
+elif run_clicked:
+    # Update session state with current editor content before running
+    set_script_content(code)
+
+    success, message = execute_python_script(code, timeout=st.session_state.run_timeout,
+                                             memory_limit_mb=st.session_state.run_memory_mb or None,
+                                             use_cache=st.session_state.use_run_cache,
+                                             profile=st.session_state.profile_run,
+                                             import_time=st.session_state.profile_imports)
+    if success:
+        st.session_state.active_run_id = message
+        st.session_state.last_run_success = None
+        st.session_state.last_run_cached = False
+        st.session_state.last_run_profile = None
+        st.rerun()  # Rerun so the Run button shows as disabled while the script runs
+    else:
+        st.error(message)
+
+if st.session_state.active_run_id is not None:
+    show_active_run()
+elif st.session_state.last_run_success is True:
+    st.success("✅ Execution completed!")
+elif st.session_state.last_run_success is False:
+    st.error("❌ Execution failed!")
+
+# Benchmark section
+with st.expander("🏁 Benchmark against saved version", expanded=st.session_state.active_benchmark is not None):
+    bench_col1, bench_col2, bench_col3 = st.columns([1, 1, 1])
+    with bench_col1:
+        bench_iterations = st.number_input("Runs per version", min_value=2, max_value=200,
+                                           value=DEFAULT_ITERATIONS, key="benchmark_iterations")
+    with bench_col2:
+        bench_threshold = st.number_input("Regression threshold (%)", min_value=1, max_value=500,
+                                          value=int(DEFAULT_REGRESSION_THRESHOLD * 100), key="benchmark_threshold")
+    with bench_col3:
+        st.write("")  # Align the button with the inputs
+        bench_clicked = st.button("🏁 Run Benchmark", use_container_width=True,
+                                  disabled=st.session_state.active_benchmark is not None)
+
+    if bench_clicked:
+        success, message = start_benchmark(code, st.session_state.selected_file, bench_iterations,
+                                           bench_threshold / 100, timeout=st.session_state.run_timeout,
+                                           memory_limit_mb=st.session_state.run_memory_mb or None)
+        if success:
+            st.session_state.benchmark_report = None
+            st.rerun()
+        else:
+            st.error(message)
+
+    if st.session_state.active_benchmark is not None:
+        show_active_benchmark()
+    elif st.session_state.benchmark_report is not None:
+        show_benchmark_report(st.session_state.benchmark_report)
+
+# Parameter sweep section
+with st.expander("🧪 Sweep over inputs", expanded=st.session_state.active_sweep is not None):
+    st.caption(f"Run the editor script once per row (up to {MAX_ROWS}), in parallel across the shared workers. "
+               "Arguments are passed to the script as sys.argv[1:]; environment variables as KEY=value pairs.")
+    sweep_rows = st.data_editor(
+        [{"Arguments": "", "Environment": ""}],
+        num_rows="dynamic",
+        use_container_width=True,
+        key="sweep_table",
+        column_config={
+            "Arguments": st.column_config.TextColumn("Arguments", help="e.g. s3://bucket/input.mp4 --preset hd"),
+            "Environment": st.column_config.TextColumn("Environment", help="e.g. MEDIACONVERT_DESTINATION_STRATEGY=date MEDIACONVERT_JOB_CACHE=0"),
+        },
+        disabled=st.session_state.active_sweep is not None,
+    )
+    sweep_clicked = st.button("🧪 Run Sweep", use_container_width=True,
+                              disabled=st.session_state.active_sweep is not None)
+
+    if sweep_clicked and partial_file:
+        st.error("Only part of this file is loaded: load the whole file before running it")
+    elif sweep_clicked:
+        success, message = start_sweep(code, st.session_state.selected_file, sweep_rows,
+                                       timeout=st.session_state.run_timeout,
+                                       memory_limit_mb=st.session_state.run_memory_mb or None)
+        if success:
+            st.rerun()
+        else:
+            st.error(message)
+
+    if st.session_state.active_sweep is not None:
+        show_active_sweep()
+    elif st.session_state.sweep_report is not None:
+        show_sweep_report(st.session_state.sweep_report)
+
 # History display section
 if st.session_state.get('show_history', False):
     st.markdown("---")
     st.subheader("📜 Update History")
 
-    if st.session_state.update_history:
-        # Display history in reverse chronological order (newest first)
-        for idx, entry in enumerate(reversed(st.session_state.update_history)):
-            with st.expander(f"🕒 {entry['timestamp']} - {entry['filename']} by {entry['user']}", expanded=(idx == 0)):
+    history_store = get_history_store()
+    if history_store.count():
+        # Filters are applied in SQL; changing one jumps back to the first page
+        filter_col1, filter_col2, filter_col3, filter_col4 = st.columns([2, 2, 1, 1])
+        with filter_col1:
+            history_search = st.text_input("Search update messages", key="history_search", on_change=reset_history_page,
+                                           placeholder="e.g. fixed timeout")
+            history_file_filter = st.selectbox("File", ["All files"] + history_store.filenames(),
+                                               key="history_file_filter", on_change=reset_history_page)
+        with filter_col2:
+            history_user_filter = st.selectbox("User", ["All users"] + history_store.users(),
+                                               key="history_user_filter", on_change=reset_history_page)
+            history_page_size = st.selectbox("Entries per page", [10, 25, 50], key="history_page_size",
+                                             on_change=reset_history_page)
+        with filter_col3:
+            history_from = st.date_input("From", value=None, key="history_from", on_change=reset_history_page)
+        with filter_col4:
+            history_to = st.date_input("To", value=None, key="history_to", on_change=reset_history_page)
+
+        history_filters = {
+            "filename": None if history_file_filter == "All files" else history_file_filter,
+            "user": None if history_user_filter == "All users" else history_user_filter,
+            "since": f"{history_from} 00:00:00" if history_from else None,
+            "until": f"{history_to} 23:59:59" if history_to else None,
+            "search": history_search,
+        }
+        matching = history_store.count(**history_filters)
+        page_count = max(1, -(-matching // history_page_size))
+        page = min(max(1, st.session_state.get('history_page', 1)), page_count)
+
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+        with nav_col1:
+            if st.button("⬅️ Newer", use_container_width=True, disabled=page <= 1):
+                st.session_state.history_page = page - 1
+                st.rerun()
+        with nav_col2:
+            st.caption(f"Page {page} of {page_count} · {matching} matching updates")
+        with nav_col3:
+            if st.button("Older ➡️", use_container_width=True, disabled=page >= page_count):
+                st.session_state.history_page = page + 1
+                st.rerun()
+
+        with st.expander("🔀 Compare versions"):
+            compare_file = st.selectbox("File", history_store.filenames(), key="compare_file")
+            compare_versions = history_store.versions(compare_file) if compare_file else []
+            if len(compare_versions) < 2:
+                st.caption("Save this file at least twice to compare versions")
+            else:
+                old_col, new_col = st.columns(2)
+                with old_col:
+                    old_version = st.selectbox("Older", compare_versions, index=1, format_func=format_version,
+                                               key="compare_old")
+                with new_col:
+                    new_version = st.selectbox("Newer", compare_versions, index=0, format_func=format_version,
+                                               key="compare_new")
+                show_version_diff(old_version, new_version)
+
+        # Only the visible page is fetched and rendered, newest first
+        page_entries = history_store.entries(limit=history_page_size, offset=(page - 1) * history_page_size,
+                                             **history_filters)
+        if not page_entries:
+            st.info("No updates match these filters.")
+        for idx, entry in enumerate(page_entries):
+            with st.expander(f"🕒 {entry['timestamp']} - {entry['filename']} by {entry['user']}",
+                             expanded=(idx == 0 and page == 1)):
                 st.markdown(f"**File:** `{entry['filename']}`")
                 st.markdown(f"**User:** {entry['user']}")
                 st.markdown(f"**Timestamp:** {entry['timestamp']}")
@@ -388,12 +1503,25 @@ if st.session_state.get('show_history', False):
                 st.markdown(f"**Update Message:**")
                 st.info(entry['update_message'])
 
+                if entry["content_hash"]:
+                    restore_col, diff_col = st.columns(2)
+                    with restore_col:
+                        st.button("↩️ Restore in editor", key=f"restore_{entry['id']}", use_container_width=True,
+                                  on_click=restore_snapshot, args=(entry,))
+                    with diff_col:
+                        show_diff = st.toggle("🔍 Diff vs previous version", key=f"diff_{entry['id']}")
+                    if show_diff:
+                        previous = history_store.latest_snapshot(entry["filename"], before_id=entry["id"])
+                        if previous:
+                            show_version_diff(previous, entry)
+                        else:
+                            st.caption("This is the first saved version of the file")
+
         # Add clear history button
         if st.button("🗑️ Clear History"):
-            st.session_state.update_history = []
-            history_file = ".script_history.json"
-            if os.path.exists(history_file):
-                os.remove(history_file)
+            history_store.clear()
+            # Drop the cleared versions' snapshots, except those unsaved drafts are based on
+            get_snapshot_store().prune(keep=get_draft_store().bases())
             st.success("History cleared!")
             st.rerun()
     else:
@@ -403,4 +1531,20 @@ if st.session_state.get('show_history', False):
 if st.session_state.execution_output:
     st.markdown("---")
     st.subheader("📤 Execution Output")
-    st.code(st.session_state.execution_output, language="text")
+    if st.session_state.last_run_cached:
+        st.badge("cached", icon="♻️", color="blue")
+    if st.session_state.last_run_profile is not None:
+        output_col, profile_col = st.columns([3, 2])
+        with output_col:
+            show_execution_output(st.session_state.execution_output)
+        with profile_col:
+            show_profile_report(st.session_state.last_run_profile)
+    else:
+        show_execution_output(st.session_state.execution_output)
+
+# Time-to-first-render of new sessions (exported as editor_first_render_seconds when metrics are enabled),
+# counted from the session's first run even if that run was restarted by st.rerun()
+if 'first_render_ms' not in st.session_state:
+    first_render = time.perf_counter() - st.session_state.session_started
+    st.session_state.first_render_ms = first_render * 1000
+    EDITOR_FIRST_RENDER_SECONDS.observe(first_render)
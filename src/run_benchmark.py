@@ -0,0 +1,100 @@
+"""
+Benchmark summaries for the editor's "Benchmark vs saved" action.
+
+A benchmark queues the editor buffer as one repeated run with the last saved
+version of the file as its baseline (WorkerPool.submit(repeat=N, baseline=...)).
+The two versions alternate in the same warm worker, each iteration from a fresh
+fork, so they are measured under the same conditions rather than competing for
+the CPU. summarize() turns a repeated run's iterations into wall-time
+percentiles and peak RSS; compare() lines the two summaries up and flags every
+metric that got worse by more than the threshold.
+
+Peak RSS includes the warm worker's own preloaded modules, which are the same
+for both versions, so differences between them are what matters.
+"""
+import math
+
+DEFAULT_ITERATIONS = 10
+DEFAULT_REGRESSION_THRESHOLD = 0.10  # Flag metrics more than 10% worse than the saved version
+
+METRICS = (
+    ("p50_ms", "Wall time p50 (ms)"),
+    ("p95_ms", "Wall time p95 (ms)"),
+    ("p99_ms", "Wall time p99 (ms)"),
+    ("peak_rss_mb", "Peak RSS (MB)"),
+)
+
+
+def percentile(values, pct):
+    """
+    Linearly interpolated percentile of a list of numbers.
+
+    Args:
+        values (list): Sample values
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile, or NaN for an empty sample
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(result, key="iterations"):
+    """
+    Summarize a repeated run.
+
+    Args:
+        result (dict): Finished run result with an "iterations" list (a single
+            run without one counts as one iteration)
+        key (str): "baseline_iterations" to summarize the run's baseline instead
+
+    Returns:
+        dict: runs, failures, p50_ms, p95_ms, p99_ms, mean_ms and peak_rss_mb
+    """
+    iterations = result.get(key) or [
+        {"returncode": result["returncode"], "duration": result["duration"], "peak_rss": result.get("peak_rss")}
+    ]
+    durations = [i["duration"] * 1000 for i in iterations]
+    peaks = [i["peak_rss"] for i in iterations if i.get("peak_rss")]
+    return {
+        "runs": len(iterations),
+        "failures": sum(1 for i in iterations if i["returncode"] != 0),
+        "p50_ms": percentile(durations, 50),
+        "p95_ms": percentile(durations, 95),
+        "p99_ms": percentile(durations, 99),
+        "mean_ms": sum(durations) / len(durations),
+        "peak_rss_mb": max(peaks) / (1024 * 1024) if peaks else math.nan,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    Compare a benchmark summary against the saved version's summary.
+
+    Args:
+        current (dict): summarize() of the editor buffer
+        baseline (dict): summarize() of the saved version, or None
+        threshold (float): Relative slowdown/growth that counts as a regression
+
+    Returns:
+        list: One row per metric with saved, current, change_pct and regression
+    """
+    rows = []
+    for key, label in METRICS:
+        now = current[key]
+        before = baseline[key] if baseline else math.nan
+        change = (now - before) / before if before and not math.isnan(before) and not math.isnan(now) else math.nan
+        rows.append({
+            "metric": label,
+            "saved": None if math.isnan(before) else round(before, 2),
+            "current": None if math.isnan(now) else round(now, 2),
+            "change_pct": None if math.isnan(change) else round(change * 100, 1),
+            "regression": not math.isnan(change) and change > threshold,
+        })
+    return rows
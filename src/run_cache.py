@@ -0,0 +1,103 @@
+"""
+Opt-in cache of editor run results.
+
+Pressing Run on an unchanged, deterministic script (the handler variants, for
+example) re-executes the whole thing for the same output. RunResultCache keeps
+finished results under .run_cache/ in the project root, keyed by the SHA-256 of
+the script source, the interpreter version, the run's memory limit, the
+environment variables scripts read (AWS_*, MEDIACONVERT_*, PYTHON*) and the
+size and modification time of the modules a script can import from src/.
+Changing any of them is a miss.
+
+Storage and LRU eviction reuse JobCache, so the cache stays bounded by entry
+count and total size. Timed-out and cancelled runs are never stored.
+"""
+import json
+import os
+import sys
+
+from job_cache import JobCache, cache_key
+
+RESULT_CACHE_VERSION = "1"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".run_cache")
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 500
+ENV_PREFIXES = ("AWS_", "MEDIACONVERT_", "PYTHON")
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _module_stamps(directory):
+    """(name, size, mtime) of every importable module next to the editor."""
+    stamps = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.endswith(".py") and entry.is_file():
+                    stat = entry.stat()
+                    stamps.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    return sorted(stamps)
+
+
+def run_cache_key(source, memory_limit_mb=None, environ=None, module_dir=SRC_DIR):
+    """
+    Build the cache key for running source in the current environment.
+
+    Args:
+        source (str): Python source code of the script
+        memory_limit_mb (int): Memory cap of the run, which can change its outcome
+        environ (dict): Environment the workers inherit (defaults to os.environ)
+        module_dir (str): Directory whose modules scripts can import
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    environ = os.environ if environ is None else environ
+    env = sorted((name, value) for name, value in environ.items() if name.startswith(ENV_PREFIXES))
+    return cache_key(RESULT_CACHE_VERSION, source, sys.version, memory_limit_mb, env, _module_stamps(module_dir))
+
+
+class RunResultCache:
+    """LRU-evicted on-disk store of finished run results."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self._store = JobCache(cache_dir or os.environ.get("EDITOR_RUN_CACHE_DIR", DEFAULT_CACHE_DIR),
+                               max_bytes=max_bytes, max_entries=max_entries)
+
+    def get(self, key):
+        """Return the stored result for key (marked "cached"), or None on a miss."""
+        data = self._store.get(key)
+        if data is None:
+            return None
+        try:
+            result = json.loads(data)
+        except ValueError:
+            return None  # Torn or foreign file; the next put overwrites it
+        result["cached"] = True
+        return result
+
+    def put(self, key, result):
+        """
+        Store a finished result; timed-out and cancelled runs are skipped.
+
+        Returns:
+            bool: True if the result was stored
+        """
+        if result.get("timed_out") or result.get("cancelled"):
+            return False
+        stored = {
+            "returncode": result["returncode"],
+            "duration": result["duration"],
+            "stdout": result["stdout"],
+            "stderr": result["stderr"],
+            "timed_out": False,
+            "cancelled": False,
+        }
+        self._store.put(key, json.dumps(stored).encode("utf-8"))
+        return True
+
+    def clear(self):
+        """Remove every cached result."""
+        self._store.clear()
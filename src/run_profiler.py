@@ -0,0 +1,178 @@
+"""
+Profiling for "Run with profiler" editor runs.
+
+RunProfiler wraps one script execution inside the worker's forked child:
+cProfile records function-level timings and tracemalloc records allocations,
+so the report carries the slowest functions, the allocation sites still live
+when the script finished and the peak traced memory. Rows are plain dicts so
+they pickle back to the editor and render directly as tables.
+
+Import times cannot be measured inside a warm worker - json, boto3 and the job
+helpers are already imported there - so import_time_breakdown() re-imports the
+script's top-level imports in a fresh interpreter with "python -X importtime".
+"""
+import ast
+import cProfile
+import os
+import pstats
+import subprocess
+import sys
+import tracemalloc
+
+MAX_FUNCTION_ROWS = 50
+MAX_ALLOCATION_ROWS = 25
+MAX_IMPORT_ROWS = 200
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_MARKER = "-- script imports --"
+_IGNORED_ALLOCATION_FILES = (
+    tracemalloc.__file__,
+    os.path.abspath(__file__),
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+)
+
+
+class RunProfiler:
+    """Collect cProfile timings and tracemalloc allocations around one script run."""
+
+    def __init__(self, script_path, max_functions=MAX_FUNCTION_ROWS, max_allocations=MAX_ALLOCATION_ROWS):
+        """
+        Args:
+            script_path (str): Temporary file the script runs from, shown as <script>
+            max_functions (int): Function rows kept, slowest cumulative time first
+            max_allocations (int): Allocation site rows kept, largest first
+        """
+        self.script_path = script_path
+        self.max_functions = max_functions
+        self.max_allocations = max_allocations
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        tracemalloc.start()
+        self._profiler.enable()
+
+    def stop(self):
+        """
+        Stop both profilers; call while the script's globals are still referenced.
+
+        Returns:
+            dict: "functions" and "allocations" row lists plus "peak_memory" in bytes
+        """
+        self._profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            "functions": self._function_rows(),
+            "allocations": self._allocation_rows(snapshot),
+            "peak_memory": peak,
+        }
+
+    def _location(self, filename, lineno):
+        if filename == self.script_path:
+            filename = "<script>"
+        return f"{filename}:{lineno}"
+
+    def _function_rows(self):
+        rows = []
+        for (filename, lineno, name), (primitive, calls, total, cumulative, _) in pstats.Stats(self._profiler).stats.items():
+            if filename == "<frozen runpy>" or name == "<method 'disable' of '_lsprof.Profiler' objects>":
+                continue  # The runner's own frames around the script
+            rows.append({
+                "function": name,
+                "location": "built-in" if filename == "~" else self._location(filename, lineno),
+                "calls": calls,
+                "primitive_calls": primitive,
+                "total_s": round(total, 6),
+                "cumulative_s": round(cumulative, 6),
+                "per_call_ms": round(cumulative / calls * 1000, 3) if calls else 0.0,
+            })
+        rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+        return rows[:self.max_functions]
+
+    def _allocation_rows(self, snapshot):
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, path) for path in _IGNORED_ALLOCATION_FILES])
+        rows = []
+        for stat in snapshot.statistics("lineno")[:self.max_allocations]:
+            frame = stat.traceback[0]
+            rows.append({
+                "location": self._location(frame.filename, frame.lineno),
+                "size_kb": round(stat.size / 1024, 1),
+                "blocks": stat.count,
+                "avg_bytes": stat.size // stat.count if stat.count else 0,
+            })
+        return rows
+
+
+def top_level_imports(source):
+    """
+    Module names imported at the top level of a script (including try/if blocks).
+
+    Returns:
+        list: Absolute module names in first-seen order; empty if the source does not parse
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    names = []
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+        elif isinstance(node, (ast.If, ast.Try)):
+            pending.extend(node.body + node.orelse + getattr(node, "finalbody", []))
+            for handler in getattr(node, "handlers", []):
+                pending.extend(handler.body)
+    return list(dict.fromkeys(names))
+
+
+def import_time_breakdown(source, timeout=30, max_rows=MAX_IMPORT_ROWS):
+    """
+    Measure the script's imports in a fresh interpreter with -X importtime.
+
+    Args:
+        source (str): Python source code of the script
+        timeout (float): Seconds the measuring interpreter may take
+        max_rows (int): Rows kept, slowest cumulative time first
+
+    Returns:
+        list: Dicts with module, depth, self_ms and cumulative_ms
+    """
+    modules = top_level_imports(source)
+    if not modules:
+        return []
+    # Interpreter startup imports come before the marker; one failing import must not hide the others
+    code = f"import sys\nsys.stderr.write({_IMPORT_MARKER!r} + '\\n')\n" + "\n".join(
+        f"try:\n    import {name}\nexcept Exception:\n    pass" for name in modules)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    try:
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                                   text=True, timeout=timeout, env=env)
+    except subprocess.TimeoutExpired:
+        return []
+
+    rows = []
+    _, _, output = completed.stderr.partition(_IMPORT_MARKER)
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        rows.append({
+            "module": module,
+            "depth": (len(name) - len(module) - 1) // 2,
+            "self_ms": int(fields[0]) / 1000,
+            "cumulative_ms": int(fields[1]) / 1000,
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:max_rows]
@@ -0,0 +1,316 @@
+"""
+Shared, bounded run queue with per-user fair scheduling.
+
+Editor sessions submit scripts here instead of running them on the Streamlit
+script thread. A single dispatcher thread hands queued runs to the WorkerPool
+round-robin across users, so one person queueing many runs cannot starve
+everybody else, and never runs more scripts at once than the pool has workers.
+Sessions poll status(run_id) for progress, live output and the final result.
+The result only carries a bounded tail of each stream; the run's complete
+output stays in the worker's spool files, listed as "output_files" in the
+final status, until the session forgets the run (or it expires).
+With a result cache attached, runs submitted with a cache key finish instantly
+on a hit and store their result on completion.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+DEFAULT_MAX_PENDING = 50
+DEFAULT_MAX_PENDING_PER_USER = 3
+FINISHED_RUN_TTL = 600  # Seconds a finished result is kept for a session to collect
+DISPATCH_ACQUIRE_TIMEOUT = 5  # A worker is normally idle whenever the dispatcher starts a run
+
+_log = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the queue (or a user's share of it) has no room for another run."""
+
+
+def _failed_result(message, duration=0.0):
+    """Result of a run the queue could not start or follow to the end."""
+    return {"returncode": None, "duration": duration, "timed_out": False, "cancelled": False,
+            "stdout": "", "stderr": message}
+
+
+class _QueuedRun:
+    __slots__ = ("run_id", "user", "source", "options", "cache_key", "submitted",
+                 "handle", "result", "finished", "cancel_requested")
+
+    def __init__(self, run_id, user, source, options, cache_key):
+        self.run_id = run_id
+        self.user = user
+        self.source = source
+        self.options = options  # Keyword arguments for WorkerPool.submit()
+        self.cache_key = cache_key
+        self.submitted = time.monotonic()
+        self.handle = None
+        self.result = None
+        self.finished = None
+        self.cancel_requested = False
+
+
+class RunQueue:
+    """Per-user fair queue in front of a WorkerPool."""
+
+    def __init__(self, pool, max_pending=DEFAULT_MAX_PENDING, max_pending_per_user=DEFAULT_MAX_PENDING_PER_USER,
+                 cache=None):
+        """
+        Args:
+            pool (WorkerPool): Pool executing the runs; its size caps concurrent runs
+            max_pending (int): Queued (not yet running) runs across all users
+            max_pending_per_user (int): Queued runs allowed per user
+            cache (RunResultCache): Result cache consulted for runs submitted with a cache key
+        """
+        self.pool = pool
+        self.cache = cache
+        self.max_concurrent = pool.size
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._pending = OrderedDict()  # user -> deque of run ids, in round-robin order
+        self._runs = {}
+        self._running = set()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._dispatch_loop, name="run-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, user, source, timeout=30, memory_limit_mb=None, cache_key=None, profile=False,
+               import_time=False, repeat=1, argv=None, env=None, baseline=None):
+        """
+        Queue a script run.
+
+        Args:
+            user (str): Identity used for fair scheduling
+            source (str): Python source code to execute
+            timeout (float): Seconds the script may run once started
+            memory_limit_mb (int): Address-space cap for the script (None for no cap)
+            cache_key (str): Result cache key; None runs the script unconditionally
+            profile (bool): Collect a cProfile/tracemalloc report with the result
+            import_time (bool): Collect an import-time breakdown with the result
+            repeat (int): Run the script this many times in one worker (benchmarks)
+            argv (list): Command-line arguments passed to the script (parameter sweeps)
+            env (dict): Environment variables set for the script (parameter sweeps)
+            baseline (str): Source to alternate with each iteration in the same worker (benchmarks)
+
+        Returns:
+            str: Run id for status() and forget()
+
+        Raises:
+            QueueFullError: When the queue or the user's share is full
+        """
+        options = {"timeout": timeout, "memory_limit_mb": memory_limit_mb, "profile": profile,
+                   "import_time": import_time, "repeat": repeat, "argv": argv, "env": env,
+                   "baseline": baseline}
+        cached = None
+        if cache_key is not None and self.cache is not None:
+            cached = self.cache.get(cache_key)
+        with self._cond:
+            if cached is not None:
+                # Hits never occupy a worker, so they skip the queue limits too
+                run_id = uuid.uuid4().hex[:12]
+                run = _QueuedRun(run_id, user, None, options, cache_key)
+                run.result = cached
+                run.finished = time.monotonic()
+                self._runs[run_id] = run
+                return run_id
+            pending_total = sum(len(runs) for runs in self._pending.values())
+            if pending_total >= self.max_pending:
+                raise QueueFullError("The run queue is full, please try again shortly")
+            if len(self._pending.get(user, ())) >= self.max_pending_per_user:
+                raise QueueFullError(f"You already have {self.max_pending_per_user} runs waiting")
+            run_id = uuid.uuid4().hex[:12]
+            self._runs[run_id] = _QueuedRun(run_id, user, source, options, cache_key)
+            self._pending.setdefault(user, deque()).append(run_id)
+            self._cond.notify()
+            return run_id
+
+    def status(self, run_id):
+        """
+        Return a snapshot of a run.
+
+        Returns:
+            dict: state ("queued", "running" or "done") plus position (queued),
+                  stdout/stderr tails (running) or result (done); None if unknown.
+                  Finished runs that ran in a worker also have output_files, the
+                  (stdout, stderr) spool files with their complete output, which
+                  are deleted by forget()
+        """
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is None:
+                return None
+            if run.result is not None:
+                status = {"state": "done", "run_id": run_id, "result": run.result}
+                if run.handle is not None and run.result is run.handle.result:  # Not a failure reported by the queue
+                    status["output_files"] = (run.handle.stdout_path, run.handle.stderr_path)
+                return status
+            if run.handle is None:
+                return {"state": "queued", "run_id": run_id, "position": self._position(run)}
+            handle = run.handle
+        stdout, stderr = handle.read_output()
+        return {
+            "state": "running",
+            "run_id": run_id,
+            "elapsed": time.monotonic() - handle.started,
+            "stdout": stdout,
+            "stderr": stderr,
+        }
+
+    def cancel(self, run_id):
+        """
+        Cancel a queued or running run; a running script is killed immediately.
+
+        Returns:
+            bool: True if the run was cancelled, False if unknown or already finished
+        """
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is None or run.result is not None:
+                return False
+            if run.handle is None:
+                if run.run_id in self._running:
+                    run.cancel_requested = True  # Dispatcher cancels it as soon as it starts
+                    return True
+                runs = self._pending[run.user]
+                runs.remove(run_id)
+                if not runs:
+                    del self._pending[run.user]
+                run.result = {
+                    "returncode": None, "duration": 0.0, "timed_out": False,
+                    "cancelled": True, "stdout": "", "stderr": "",
+                }
+                run.finished = time.monotonic()
+                run.source = None
+                return True
+            handle = run.handle
+        # The dispatcher collects the cancelled result on its next poll
+        return handle.cancel()
+
+    def forget(self, run_id):
+        """Drop a finished run's result and output files once the session has collected them."""
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is None or run.result is None:
+                return
+            del self._runs[run_id]
+        if run.handle is not None:
+            run.handle.cleanup()
+
+    def stats(self):
+        """Return queue depth and running count for display."""
+        with self._cond:
+            return {
+                "pending": sum(len(runs) for runs in self._pending.values()),
+                "running": len(self._running),
+                "max_concurrent": self.max_concurrent,
+            }
+
+    def _position(self, run):
+        """Number of queued runs that will be dispatched before this one."""
+        if run.run_id in self._running:
+            return 0  # Picked by the dispatcher, handle not attached yet
+        ahead = 0
+        depth = 0
+        while True:
+            progressed = False
+            for runs in self._pending.values():
+                if depth < len(runs):
+                    progressed = True
+                    if runs[depth] == run.run_id:
+                        return ahead
+                    ahead += 1
+            if not progressed:
+                return ahead
+            depth += 1
+
+    def _next_pending(self):
+        """Pop the next run in round-robin user order."""
+        user, runs = self._pending.popitem(last=False)
+        run_id = runs.popleft()
+        if runs:
+            self._pending[user] = runs  # Re-append: this user goes to the back of the rotation
+        return self._runs[run_id]
+
+    def _dispatch_loop(self):
+        while True:
+            try:
+                self._dispatch()
+            except Exception:
+                # Never let the dispatcher die: every queued and future run depends on it
+                _log.exception("Run queue dispatcher error")
+                time.sleep(0.5)
+
+    def _dispatch(self):
+        with self._cond:
+            if not self._running and not self._pending:
+                self._cond.wait()
+            running = [self._runs[run_id] for run_id in self._running if self._runs[run_id].handle is not None]
+
+        # Poll outside the lock: finishing a run may respawn a worker
+        for run in running:
+            try:
+                result = run.handle.poll()
+            except Exception as e:
+                _log.exception("Polling run %s failed", run.run_id)
+                try:
+                    run.handle.cancel()  # Frees (and replaces) its worker
+                except Exception:
+                    pass
+                self._complete(run, _failed_result(f"Run failed: {e}", time.monotonic() - run.handle.started),
+                               cacheable=False)
+                continue
+            if result is not None:
+                self._complete(run, result)
+
+        to_start = []
+        with self._cond:
+            while self._pending and len(self._running) < self.max_concurrent:
+                run = self._next_pending()
+                self._running.add(run.run_id)
+                to_start.append(run)
+            expired = self._expire_finished()
+        for run in expired:
+            run.handle.cleanup()
+
+        for run in to_start:
+            try:
+                handle = self.pool.submit(run.source, acquire_timeout=DISPATCH_ACQUIRE_TIMEOUT, **run.options)
+            except Exception as e:
+                _log.exception("Starting run %s failed", run.run_id)
+                self._complete(run, _failed_result(f"Run could not be started: {e}"), cacheable=False)
+                continue
+            with self._cond:
+                run.handle = handle
+                cancel = run.cancel_requested
+            if cancel:
+                handle.cancel()
+
+        with self._cond:
+            if self._running and not to_start:
+                self._cond.wait(0.05)
+
+    def _complete(self, run, result, cacheable=True):
+        if cacheable and run.cache_key is not None and self.cache is not None:
+            try:
+                self.cache.put(run.cache_key, result)
+            except OSError:
+                pass  # A full or read-only disk only costs the next run a re-execution
+        with self._cond:
+            run.result = result
+            run.finished = time.monotonic()
+            run.source = None
+            self._running.discard(run.run_id)
+
+    def _expire_finished(self):
+        """Drop uncollected results past FINISHED_RUN_TTL; returns the runs whose output files are to be deleted."""
+        now = time.monotonic()
+        expired = [
+            run for run in self._runs.values()
+            if run.finished is not None and now - run.finished > FINISHED_RUN_TTL
+        ]
+        for run in expired:
+            del self._runs[run.run_id]
+        return [run for run in expired if run.handle is not None]
@@ -0,0 +1,114 @@
+"""
+Parameter sweeps for the editor's "Sweep" action.
+
+A sweep runs the editor buffer once per row of a table of inputs, typically
+one row per input video. Each row gives the script's command-line arguments
+(shell-style, e.g. `s3://bucket/in.mp4 --preset hd`) and extra environment
+variables (`KEY=value` pairs). The job helper modules are imported by each
+run, so MEDIACONVERT_* settings given in a row apply to that row. Rows are
+queued on the shared RunQueue, so they fan out across the warm WorkerPool as
+workers free up, each in a fresh fork.
+
+parse_rows() validates the table before anything is queued; result_row()
+turns a row's finished run into a line of the sortable results table.
+"""
+import re
+import shlex
+
+MAX_ROWS = 200
+OUTPUT_PREVIEW_CHARS = 120
+
+_ENV_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def parse_env(text):
+    """
+    Parse shell-style KEY=value pairs.
+
+    Returns:
+        dict: Variable names to values
+
+    Raises:
+        ValueError: On unbalanced quotes or a pair without a valid name
+    """
+    env = {}
+    for pair in shlex.split(text or ""):
+        name, sep, value = pair.partition("=")
+        if not sep or not _ENV_NAME.fullmatch(name):
+            raise ValueError(f"'{pair}' is not a KEY=value pair")
+        env[name] = value
+    return env
+
+
+def parse_rows(rows):
+    """
+    Turn the editor's sweep table into run parameters.
+
+    Args:
+        rows (list): Dicts with "Arguments" and "Environment" strings; rows
+            where both are blank are skipped
+
+    Returns:
+        list: Dicts with index (1-based table row), args/env (as typed), argv (list) and env_vars (dict)
+
+    Raises:
+        ValueError: If a row does not parse, or there are no rows or more than MAX_ROWS
+    """
+    params = []
+    for index, row in enumerate(rows, start=1):
+        args = (row.get("Arguments") or "").strip()
+        env = (row.get("Environment") or "").strip()
+        if not args and not env:
+            continue
+        try:
+            params.append({"index": index, "args": args, "env": env,
+                           "argv": shlex.split(args), "env_vars": parse_env(env)})
+        except ValueError as e:
+            raise ValueError(f"Row {index}: {e}") from None
+    if not params:
+        raise ValueError("Add at least one row of arguments or environment variables")
+    if len(params) > MAX_ROWS:
+        raise ValueError(f"A sweep can have at most {MAX_ROWS} rows")
+    return params
+
+
+def run_status(result):
+    """One-word outcome of a finished run."""
+    if result["cancelled"]:
+        return "cancelled"
+    if result["timed_out"]:
+        return "timed out"
+    return "ok" if result["returncode"] == 0 else "failed"
+
+
+def output_preview(result):
+    """Last non-empty output line of a run (stderr first, where errors end up), shortened for a table cell."""
+    for stream in (result.get("stderr") or "", result.get("stdout") or ""):
+        lines = [line for line in stream.splitlines() if line.strip()]
+        if lines:
+            line = lines[-1].strip()
+            return line if len(line) <= OUTPUT_PREVIEW_CHARS else line[:OUTPUT_PREVIEW_CHARS - 1] + "…"
+    return ""
+
+
+def result_row(params, state, result=None, elapsed=None):
+    """
+    One line of the sweep results table.
+
+    Args:
+        params (dict): Row parameters from parse_rows()
+        state (str): "pending", "queued" or "running" for unfinished rows
+        result (dict): The finished run's result, if any
+        elapsed (float): Seconds a running row has been running
+
+    Returns:
+        dict: row, arguments, environment, status, exit code, duration and output columns
+    """
+    row = {"row": params["index"], "arguments": params["args"], "environment": params["env"],
+           "status": state, "exit_code": None, "duration_s": elapsed, "output": ""}
+    if result is not None:
+        row.update(status=run_status(result), exit_code=result["returncode"], duration_s=result["duration"],
+                   output=output_preview(result))
+    if row["duration_s"] is not None:
+        row["duration_s"] = round(row["duration_s"], 3)
+    return row
@@ -0,0 +1,613 @@
+"""
+Pre-warmed worker pool for running editor scripts.
+
+Spawning a fresh interpreter for every "Run Script" click costs interpreter
+startup plus re-importing json, boto3 and friends each time. WorkerPool keeps a
+few worker processes alive instead, each of which imports PRELOAD_MODULES once
+at startup. Workers are plain child interpreters running this file (not
+multiprocessing children), so they never re-import the Streamlit app that
+Streamlit installs as __main__; requests and results travel as length-prefixed
+pickles over the worker's stdin/stdout.
+
+Each run executes the script as __main__ with stdout and stderr redirected at
+the file-descriptor level (so output from C extensions and child processes is
+captured too). On POSIX the worker forks a throwaway child per run, so a script
+can never leak module state, threads or environment changes into the next run;
+a timeout kills the worker's whole process group. Workers are still recycled
+after max_runs_per_worker runs, which also bounds state on platforms without
+fork, where scripts run inside the worker itself.
+
+Output is spooled to files on disk while the script runs. submit() returns a
+RunHandle immediately, so callers can tail the output as lines arrive; the
+result only ever carries a bounded tail of each stream, and runs whose spool
+grows past max_output_bytes are killed.
+"""
+import os
+import pickle
+import queue
+import runpy
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+# Only stdlib/third-party modules: the src/ helpers (job_metrics, job_cache, ...) read their MEDIACONVERT_*
+# settings at import time, so each run imports them afresh in its forked child, under the run's own
+# environment. Preloading their dependencies keeps that import down to a few milliseconds.
+PRELOAD_MODULES = ("json", "boto3", "argparse", "http.server", "sqlite3")
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_RUNS_PER_WORKER = 20
+MAX_OUTPUT_CHARS = 100_000
+MAX_OUTPUT_BYTES = 50 * 1024 * 1024
+DEFAULT_ACQUIRE_TIMEOUT = 30  # Seconds submit() waits for an idle worker
+
+
+class WorkerUnavailableError(Exception):
+    """Raised when no worker became idle in time (or none could be started)."""
+
+
+def _send_message(stream, message):
+    data = pickle.dumps(message)
+    stream.write(struct.pack("!I", len(data)) + data)
+    stream.flush()
+
+
+def _recv_message(stream):
+    header = stream.read(4)
+    if len(header) < 4:
+        raise EOFError("Channel closed")
+    (length,) = struct.unpack("!I", header)
+    data = stream.read(length)
+    if len(data) < length:
+        raise EOFError("Channel closed")
+    return pickle.loads(data)
+
+
+def _script_traceback(exc, script_path):
+    """Format a traceback starting at the first frame inside the user's script."""
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != script_path:
+        tb = tb.tb_next
+    return "".join(traceback.format_exception(type(exc), exc, tb or exc.__traceback__))
+
+
+def _execute(source, stdout_path, stderr_path, profile=False, import_time=False, argv=None, env=None):
+    """Run source as __main__ in this process with extra argv/env, spooling output to the given files."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp_file:
+        tmp_file.write(source)
+        script_path = tmp_file.name
+
+    profiler = None
+    if profile:
+        from run_profiler import RunProfiler
+        profiler = RunProfiler(script_path)
+    report = None
+
+    stdout_file = open(stdout_path, 'wb', buffering=0)
+    stderr_file = open(stderr_path, 'wb', buffering=0)
+    saved_argv, saved_path, saved_cwd = list(sys.argv), list(sys.path), os.getcwd()
+    saved_environ = dict(os.environ)
+    saved_modules = set(sys.modules)
+    saved_line_buffering = sys.stdout.line_buffering
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = (os.dup(1), os.dup(2))
+    os.dup2(stdout_file.fileno(), 1)
+    os.dup2(stderr_file.fileno(), 2)
+    # Flush every line so readers tailing the spool see output as it is printed
+    sys.stdout.reconfigure(line_buffering=True)
+
+    returncode = 0
+    start = time.perf_counter()
+    try:
+        sys.argv = [script_path] + list(argv or ())
+        os.environ.update(env or {})
+        sys.path.insert(0, os.path.dirname(script_path))
+        if profiler is None:
+            runpy.run_path(script_path, run_name="__main__")
+        else:
+            profiler.start()
+            script_globals = None
+            try:
+                script_globals = runpy.run_path(script_path, run_name="__main__")
+            finally:
+                # Stop while script_globals still keeps the script's objects alive for the snapshot
+                report = profiler.stop()
+                del script_globals
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException as e:
+        sys.stderr.write(_script_traceback(e, script_path))
+        returncode = 1
+    finally:
+        duration = time.perf_counter() - start
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdout.reconfigure(line_buffering=saved_line_buffering)
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        os.close(saved_fds[0])
+        os.close(saved_fds[1])
+        stdout_file.close()
+        stderr_file.close()
+        sys.argv, sys.path = saved_argv, saved_path
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        # Without fork the script runs inside the worker: forget the modules it imported (and their settings)
+        for name in set(sys.modules) - saved_modules:
+            del sys.modules[name]
+        os.chdir(saved_cwd)
+        os.unlink(script_path)
+
+    result = {"returncode": returncode, "duration": duration}
+    if report is not None:
+        result["profile"] = report
+    if import_time:
+        from run_profiler import import_time_breakdown
+        result["import_times"] = import_time_breakdown(source)
+    return result
+
+
+def _apply_memory_limit(limit_bytes):
+    """Cap this process's address space (POSIX only; no-op elsewhere)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit_bytes = min(limit_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, hard))
+
+
+def _reset_peak_rss():
+    """Reset this process's peak RSS counter (Linux only) so a forked child measures just its own run."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes, or None where unknown."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
+
+
+def _iterations(results):
+    return [{"returncode": r["returncode"], "duration": r["duration"], "peak_rss": r.get("peak_rss")}
+            for r in results]
+
+
+def _run_isolated(request, channel_fds):
+    """
+    Run a request once, or request["repeat"] times with a fresh forked child each time.
+
+    Repeated runs return the last run's result with the total duration and an
+    "iterations" list of per-run returncode, duration and peak_rss. With a
+    request["baseline"] source, every iteration first runs the baseline (output
+    discarded) and its timings are returned as "baseline_iterations"; both
+    versions then share one worker and alternate, so neither is measured while
+    the other competes for the CPU.
+    """
+    repeat = max(1, int(request.get("repeat") or 1))
+    baseline = request.get("baseline")
+    baseline_request = None
+    if baseline is not None:
+        baseline_request = dict(request, source=baseline, stdout_path=os.devnull, stderr_path=os.devnull,
+                                profile=False, import_time=False)
+    results, baseline_results = [], []
+    for _ in range(repeat):
+        if baseline_request is not None:
+            baseline_results.append(_run_forked(baseline_request, channel_fds))
+        results.append(_run_forked(request, channel_fds))
+    if repeat == 1 and baseline_request is None:
+        return results[0]
+    result = dict(results[-1])
+    result["duration"] = sum(r["duration"] for r in results)
+    result["iterations"] = _iterations(results)
+    if baseline_request is not None:
+        result["baseline_iterations"] = _iterations(baseline_results)
+    return result
+
+
+def _run_forked(request, channel_fds):
+    """Run a request in a forked child of this warm worker (in-process without fork)."""
+    args = (request["source"], request["stdout_path"], request["stderr_path"],
+            request.get("profile", False), request.get("import_time", False),
+            request.get("argv"), request.get("env"))
+    if not hasattr(os, "fork"):
+        # Limits cannot be undone inside a long-lived worker, so they need fork
+        return _execute(*args)
+
+    read_fd, write_fd = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        # The control channel belongs to the worker; the child reports back through its own pipe
+        for fd in channel_fds:
+            os.close(fd)
+        try:
+            if request.get("memory_limit_bytes"):
+                _apply_memory_limit(request["memory_limit_bytes"])
+            _reset_peak_rss()
+            result = _execute(*args)
+            result["peak_rss"] = _peak_rss()
+            payload = pickle.dumps(result)
+            with os.fdopen(write_fd, 'wb') as pipe:
+                pipe.write(payload)
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as pipe:
+        payload = pipe.read()
+    _, status = os.waitpid(pid, 0)
+    if payload:
+        return pickle.loads(payload)
+    with open(request["stderr_path"], 'ab') as f:
+        f.write(b"\nScript process exited unexpectedly\n")
+    return {"returncode": os.waitstatus_to_exitcode(status), "duration": 0.0}
+
+
+def _worker_main(max_runs, preload):
+    """Worker loop: receive script source, run it, send back the result."""
+    # Move the control channel off stdin/stdout so nothing a script does can corrupt it
+    channel_in = os.fdopen(os.dup(0), 'rb')
+    channel_out = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    channel_fds = (channel_in.fileno(), channel_out.fileno())
+
+    for module_name in preload:
+        try:
+            __import__(module_name)
+        except ImportError:
+            pass
+
+    for _ in range(max_runs):
+        try:
+            request = _recv_message(channel_in)
+        except EOFError:
+            break
+        if request is None:
+            break
+        _send_message(channel_out, _run_isolated(request, channel_fds))
+
+
+class _Worker:
+    """Parent-side handle for one worker process."""
+
+    EXITED = object()
+
+    def __init__(self, process):
+        self.process = process
+        self.runs = 0
+        self.results = queue.Queue()
+        self._reader = threading.Thread(target=self._read_results, name=f"worker-{process.pid}", daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        try:
+            while True:
+                self.results.put(_recv_message(self.process.stdout))
+        except (EOFError, OSError, ValueError, pickle.UnpicklingError):
+            self.results.put(self.EXITED)
+
+    def send(self, message):
+        _send_message(self.process.stdin, message)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.is_alive():
+            try:
+                # Worker runs in its own session: take down everything the script started too
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (AttributeError, ProcessLookupError, PermissionError):
+                self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+def _read_tail(path, max_chars):
+    """Read at most max_chars from the end of a spool file, noting any truncation."""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # UTF-8 needs at most 4 bytes per character
+            if size > max_chars * 4:
+                f.seek(size - max_chars * 4)
+            text = f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return ""  # Not written yet, or deleted by cleanup() while a status poll reads it
+    if len(text) <= max_chars and size <= max_chars * 4:
+        return text
+    return f"[... output truncated, showing the last {max_chars} characters ...]\n" + text[-max_chars:]
+
+
+class RunHandle:
+    """A script run in progress: poll it for the result and tail its output."""
+
+    def __init__(self, pool, worker, spool_dir, timeout, max_output_bytes):
+        self.spool_dir = spool_dir
+        self.stdout_path = os.path.join(spool_dir, "stdout.txt")
+        self.stderr_path = os.path.join(spool_dir, "stderr.txt")
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.started = time.monotonic()
+        self.result = None
+        self._pool = pool
+        self._worker = worker
+        self._lock = threading.Lock()
+
+    def spool_size(self):
+        """Total bytes written to stdout and stderr so far."""
+        total = 0
+        for path in (self.stdout_path, self.stderr_path):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def read_output(self, max_chars=MAX_OUTPUT_CHARS):
+        """
+        Return the current tail of both output streams.
+
+        Returns:
+            tuple: (stdout: str, stderr: str), each bounded to max_chars
+        """
+        return _read_tail(self.stdout_path, max_chars), _read_tail(self.stderr_path, max_chars)
+
+    def poll(self, wait=0):
+        """
+        Return the result dict once the run has finished, otherwise None.
+
+        Args:
+            wait (float): Seconds to block waiting for the result
+        """
+        worker = self._worker
+        if worker is None:
+            return self.result
+        try:
+            message = worker.results.get(timeout=wait) if wait > 0 else worker.results.get_nowait()
+        except queue.Empty:
+            message = None
+
+        with self._lock:
+            if self.result is not None:
+                return self.result
+            if message is _Worker.EXITED:
+                with open(self.stderr_path, 'ab') as f:
+                    f.write(b"\nWorker process exited unexpectedly\n")
+                self._finish({"returncode": self._worker.process.poll(), "duration": time.monotonic() - self.started})
+            elif message is not None:
+                self._finish(message, healthy=True)
+            elif time.monotonic() - self.started >= self.timeout:
+                self._finish({"returncode": None, "duration": self.timeout, "timed_out": True})
+            elif self.spool_size() > self.max_output_bytes:
+                with open(self.stderr_path, 'ab') as f:
+                    f.write(f"\nOutput limit of {self.max_output_bytes} bytes exceeded, run stopped\n".encode())
+                self._finish({"returncode": None, "duration": time.monotonic() - self.started})
+            return self.result
+
+    def cancel(self):
+        """
+        Stop the run now, killing the script and every process it started.
+
+        Returns:
+            bool: True if the run was still going and has been cancelled
+        """
+        with self._lock:
+            if self.result is not None:
+                return False
+            self._finish({"returncode": None, "duration": time.monotonic() - self.started, "cancelled": True})
+            return True
+
+    def wait(self, interval=0.1):
+        """Block until the run finishes and return its result."""
+        while self.result is None:
+            remaining = self.timeout - (time.monotonic() - self.started)
+            self.poll(wait=max(0.001, min(interval, remaining)))
+        return self.result
+
+    def cleanup(self):
+        """Delete the spooled output files."""
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _finish(self, result, healthy=False):
+        result.setdefault("timed_out", False)
+        result.setdefault("cancelled", False)
+        result["stdout"], result["stderr"] = self.read_output()
+        self.result = result
+        self._pool._release(self._worker, healthy)
+        self._worker = None
+
+
+class WorkerPool:
+    """Fixed-size pool of warm Python worker processes for running scripts."""
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_runs_per_worker=DEFAULT_MAX_RUNS_PER_WORKER,
+                 preload=PRELOAD_MODULES, max_output_bytes=MAX_OUTPUT_BYTES):
+        """
+        Args:
+            size (int): Number of worker processes kept alive
+            max_runs_per_worker (int): Runs after which a worker is replaced
+            preload (tuple): Modules each worker imports once at startup
+            max_output_bytes (int): Spooled output size at which a run is killed
+        """
+        self.size = size
+        self.max_runs_per_worker = max_runs_per_worker
+        self.max_output_bytes = max_output_bytes
+        self.preload = tuple(preload)
+        self.spool_root = tempfile.mkdtemp(prefix="editor-runs-")
+        self._idle = queue.Queue()
+        self._closed = False
+        self._missing = 0  # Workers that could not be replaced; submit() retries starting them
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(self.max_runs_per_worker), ",".join(self.preload)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=True,  # Own process group (POSIX), so kill() reaches grandchildren
+        )
+        return _Worker(process)
+
+    def _release(self, worker, healthy):
+        worker.runs += 1
+        if self._closed:
+            worker.kill()
+            return
+        if healthy and worker.runs < self.max_runs_per_worker and worker.is_alive():
+            self._idle.put(worker)
+        else:
+            worker.kill()
+            self._replace()
+
+    def _replace(self):
+        try:
+            self._idle.put(self._spawn())
+        except OSError:
+            with self._lock:
+                self._missing += 1
+
+    def _acquire(self, timeout):
+        with self._lock:
+            missing, self._missing = self._missing, 0
+        for _ in range(missing):
+            self._replace()
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerUnavailableError(f"No worker became available within {timeout:g} seconds") from None
+
+    def submit(self, source, timeout=30, memory_limit_mb=None, profile=False, import_time=False, repeat=1,
+               argv=None, env=None, baseline=None, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        """
+        Start a script in a warm worker without waiting for it to finish.
+
+        Args:
+            source (str): Python source code to execute
+            timeout (float): Seconds before the worker is killed
+            memory_limit_mb (int): Address-space cap for the script (None for no cap)
+            profile (bool): Add a cProfile/tracemalloc report as result["profile"]
+            import_time (bool): Add an import-time breakdown as result["import_times"]
+            repeat (int): Run the script this many times, each in a fresh child; the timeout
+                covers all of them and result["iterations"] holds per-run timings
+            argv (list): Command-line arguments passed to the script (sys.argv[1:])
+            env (dict): Environment variables set for the script on top of the worker's
+            baseline (str): Source of a version to benchmark against; it runs before
+                each iteration in the same worker and its timings are returned as
+                result["baseline_iterations"]
+            acquire_timeout (float): Seconds to wait for a worker to become idle
+
+        Returns:
+            RunHandle: Handle for polling, cancelling and tailing output
+
+        Raises:
+            WorkerUnavailableError: If no worker became idle within acquire_timeout
+        """
+        worker = self._acquire(acquire_timeout)
+        try:
+            spool_dir = tempfile.mkdtemp(dir=self.spool_root)
+        except BaseException:
+            self._idle.put(worker)
+            raise
+        handle = RunHandle(self, worker, spool_dir, timeout, self.max_output_bytes)
+        try:
+            worker.send({
+                "source": source,
+                "stdout_path": handle.stdout_path,
+                "stderr_path": handle.stderr_path,
+                "memory_limit_bytes": int(memory_limit_mb * 1024 * 1024) if memory_limit_mb else None,
+                "profile": profile,
+                "import_time": import_time,
+                "repeat": repeat,
+                "argv": list(argv or ()),
+                "env": dict(env or {}),
+                "baseline": baseline,
+            })
+        except OSError:
+            pass  # The reader thread reports the dead worker on the next poll()
+        return handle
+
+    def run(self, source, timeout=30, memory_limit_mb=None, profile=False, import_time=False, repeat=1,
+            argv=None, env=None, baseline=None):
+        """
+        Run a script in a warm worker and wait for it.
+
+        Args:
+            source (str): Python source code to execute
+            timeout (float): Seconds before the worker is killed
+            memory_limit_mb (int): Address-space cap for the script (None for no cap)
+            profile (bool): Add a cProfile/tracemalloc report as result["profile"]
+            import_time (bool): Add an import-time breakdown as result["import_times"]
+            repeat (int): Run the script this many times (see submit())
+            argv (list): Command-line arguments passed to the script (sys.argv[1:])
+            env (dict): Environment variables set for the script on top of the worker's
+            baseline (str): Source of a version to benchmark against (see submit())
+
+        Returns:
+            dict: returncode, stdout, stderr, duration, timed_out and cancelled
+                  (plus profile/import_times/iterations/baseline_iterations when requested)
+        """
+        handle = self.submit(source, timeout, memory_limit_mb, profile, import_time, repeat, argv, env, baseline)
+        try:
+            return handle.wait()
+        finally:
+            handle.cleanup()
+
+    def close(self):
+        """Stop every idle worker; busy workers are stopped when released."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()
+        shutil.rmtree(self.spool_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    _worker_main(int(sys.argv[1]), [name for name in sys.argv[2].split(",") if name])
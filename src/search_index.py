@@ -0,0 +1,216 @@
+"""
+Trigram index for searching every Python file the editor can open.
+
+TrigramIndex keeps each file's lines and the set of lowercase three-character
+sequences (trigrams) it contains. A query only scans the files that contain
+all of its trigrams, so substring searches across the tree take milliseconds
+instead of a grep over every file. Regular expressions are narrowed the same
+way by the literal runs they require; patterns without one (e.g. "\\d+") fall
+back to scanning every file.
+
+Only files the editor can open are indexed (whatever FileIndex lists: the .py
+files under src/), since every hit has to open in the editor; other text files
+are out of scope.
+
+The index is maintained incrementally: update() re-indexes a single file (the
+editor calls it on save) and sync() compares the FileIndex listing with what
+was indexed, re-reading only files whose size or mtime changed and dropping
+deleted ones. Because that comparison stats every file, sync() only makes it
+when the listing's version moved or sync_interval seconds have gone by;
+files rewritten in place by other tools show up within that interval.
+"""
+import os
+import re
+import threading
+import time
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+DEFAULT_MAX_FILE_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_HITS = 200
+DEFAULT_SYNC_INTERVAL = 5.0
+
+
+def trigrams(text):
+    """Set of lowercase trigrams in text."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _required_literals(pattern, flags=0):
+    """
+    Literal strings every match of a regular expression must contain.
+
+    Only consecutive literal characters at the top level of the pattern count;
+    anything optional or alternative ends the current run.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return []
+    literals, current = [], []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(arg))
+            continue
+        if op is sre_parse.MAX_REPEAT and arg[0] >= 1 and len(arg[2]) == 1 and arg[2][0][0] is sre_parse.LITERAL:
+            # "a+" or "a{2,}": the first repetition is still required, then the run ends
+            current.append(chr(arg[2][0][1]))
+        if current:
+            literals.append("".join(current))
+            current = []
+    if current:
+        literals.append("".join(current))
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class TrigramIndex:
+    """Incrementally maintained trigram index of files under a root directory."""
+
+    def __init__(self, root, max_file_bytes=DEFAULT_MAX_FILE_BYTES, sync_interval=DEFAULT_SYNC_INTERVAL):
+        """
+        Args:
+            root (str): Directory the indexed relative paths are under
+            max_file_bytes (int): Larger files are not indexed
+            sync_interval (float): Seconds between sync() checks of every file while the listing is unchanged
+        """
+        self.root = os.path.abspath(root)
+        self.max_file_bytes = max_file_bytes
+        self.sync_interval = sync_interval
+        self._synced = (None, 0.0)  # (FileIndex version, monotonic time) of the last full sync
+        self._files = {}  # relpath -> ((size, mtime_ns), lines)
+        self._postings = {}  # trigram -> set of relpaths
+        self._lock = threading.Lock()
+
+    def update(self, relpath, text=None, stamp=None):
+        """
+        (Re-)index one file.
+
+        Args:
+            relpath (str): Path relative to the root
+            text (str): Current contents (read from disk if omitted)
+            stamp (tuple): (size, mtime_ns) of the contents, used by sync()
+        """
+        path = os.path.join(self.root, relpath)
+        try:
+            if stamp is None:
+                stat = os.stat(path)
+                stamp = (stat.st_size, stat.st_mtime_ns)
+            if text is None:
+                if stamp[0] > self.max_file_bytes:
+                    self.remove(relpath)
+                    return
+                with open(path, 'r', errors="replace") as f:
+                    text = f.read()
+        except OSError:
+            self.remove(relpath)
+            return
+        lines = text.splitlines()
+        grams = trigrams("\n".join(lines))
+        with self._lock:
+            self._unpost(relpath)
+            self._files[relpath] = (stamp, lines)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(relpath)
+
+    def remove(self, relpath):
+        """Drop a file from the index."""
+        with self._lock:
+            self._unpost(relpath)
+            self._files.pop(relpath, None)
+
+    def _unpost(self, relpath):
+        entry = self._files.get(relpath)
+        if entry is None:
+            return
+        for gram in trigrams("\n".join(entry[1])):
+            paths = self._postings.get(gram)
+            if paths is not None:
+                paths.discard(relpath)
+                if not paths:
+                    del self._postings[gram]
+
+    def sync(self, file_index, force=False):
+        """
+        Bring the index in line with a FileIndex listing.
+
+        Args:
+            file_index (FileIndex): Listing to follow
+            force (bool): Check every file even if the listing is unchanged and was checked recently
+
+        Returns:
+            int: Number of files re-indexed or removed
+        """
+        file_index.refresh()
+        version, now = file_index.version, time.monotonic()
+        with self._lock:
+            if not force and self._synced[0] == version and now - self._synced[1] < self.sync_interval:
+                return 0
+            self._synced = (version, now)
+        current = {relpath: file_index.stat(relpath) for relpath in file_index.files()}
+        with self._lock:
+            indexed = {relpath: entry[0] for relpath, entry in self._files.items()}
+        changed = 0
+        for relpath in indexed.keys() - current.keys():
+            self.remove(relpath)
+            changed += 1
+        for relpath, stamp in current.items():
+            if stamp is not None and indexed.get(relpath) != stamp:
+                self.update(relpath, stamp=stamp)
+                changed += 1
+        return changed
+
+    def search(self, query, regex=False, case_sensitive=False, max_hits=DEFAULT_MAX_HITS):
+        """
+        Find lines matching a query.
+
+        Args:
+            query (str): Substring, or regular expression if regex is set
+            regex (bool): Treat query as a regular expression
+            case_sensitive (bool): Match case exactly
+            max_hits (int): Stop after this many matching lines
+
+        Returns:
+            list: Hits as dicts with file, line (1-based) and text, by file then line
+
+        Raises:
+            re.error: For an invalid regular expression
+        """
+        if not query:
+            return []
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if regex:
+            matcher = re.compile(query, flags).search
+            required = _required_literals(query, flags)
+        else:
+            needle = query if case_sensitive else query.lower()
+            matcher = (lambda line: needle in line) if case_sensitive else (lambda line: needle in line.lower())
+            required = [query] if len(query) >= 3 else []
+
+        with self._lock:
+            candidates = None
+            for gram in set().union(*(trigrams(literal) for literal in required)):
+                paths = self._postings.get(gram, set())
+                candidates = set(paths) if candidates is None else candidates & paths
+                if not candidates:
+                    return []
+            if candidates is None:
+                candidates = self._files.keys()
+            files = [(relpath, self._files[relpath][1]) for relpath in sorted(candidates)]
+
+        hits = []
+        for relpath, lines in files:
+            for number, line in enumerate(lines, 1):
+                if matcher(line):
+                    hits.append({"file": relpath, "line": number, "text": line})
+                    if len(hits) >= max_hits:
+                        return hits
+        return hits
+
+    def stats(self):
+        """Indexed file and trigram counts."""
+        with self._lock:
+            return {"files": len(self._files), "trigrams": len(self._postings)}
@@ -0,0 +1,295 @@
+"""
+Bounded memory for per-session editor state.
+
+Every open browser tab used to keep its editor buffer and its last run's
+complete output in st.session_state for as long as the tab stayed open, so
+memory grew with the number of tabs. Two process-wide helpers bound that:
+
+- SessionMemory holds the sessions' editor buffers. Sessions keep only an id
+  in their session state and read and write their buffer through it. When
+  the buffers exceed the memory budget, the buffers of the sessions that
+  have been idle longest are zlib-compressed (and transparently decompressed
+  on their next access); if that is not enough, idle sessions' buffers are
+  evicted altogether, and get() returns None so the caller can reload the
+  file from disk. Buffers loaded unchanged from the shared file cache are
+  marked shared: sessions holding the same cached text count it once against
+  the budget, and such buffers are never compressed (only released). Buffers
+  of sessions that ended, or were unused for max_idle_seconds, are released
+  regardless of the budget.
+
+- OutputSpool keeps run output up to cap_bytes in memory and writes anything
+  larger to a file in .output_spool/ (override with EDITOR_OUTPUT_SPOOL_DIR),
+  which the editor shows one page at a time. store_parts() copies a run's
+  complete stdout and stderr from the worker's spool files, so the pages
+  cover all of the output rather than the tail carried by the run result;
+  the copy is deleted when the session discards it.
+"""
+import os
+import shutil
+import threading
+import time
+import uuid
+import zlib
+
+from file_cache import FileContentCache
+from history_store import PROJECT_ROOT
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+DEFAULT_IDLE_SECONDS = 300
+DEFAULT_COMPRESS_MIN_BYTES = 64 * 1024
+DEFAULT_MAX_IDLE_SECONDS = 3600
+RELEASE_CHECK_INTERVAL = 30  # Seconds between checks for ended or abandoned sessions
+COMPRESSION_LEVEL = 6
+
+DEFAULT_SPOOL_DIR = os.path.join(PROJECT_ROOT, ".output_spool")
+DEFAULT_OUTPUT_CAP_BYTES = 32 * 1024
+DEFAULT_PAGE_BYTES = 32 * 1024
+DEFAULT_SPOOL_MAX_AGE = 24 * 3600
+
+
+class _Buffer:
+    __slots__ = ("text", "compressed", "size", "shared", "last_used")
+
+    def __init__(self, text, shared, now):
+        self.text = text
+        self.compressed = None
+        self.size = len(text)
+        self.shared = shared
+        self.last_used = now
+
+
+class SessionMemory:
+    """Editor buffers of all sessions, compressed or evicted when idle under a memory budget."""
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES, idle_seconds=DEFAULT_IDLE_SECONDS,
+                 compress_min_bytes=DEFAULT_COMPRESS_MIN_BYTES, max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS,
+                 is_active=None):
+        """
+        Args:
+            budget_bytes (int): Memory the buffers may use before idle ones are compressed or released
+            idle_seconds (float): Sessions unused for this long count as idle
+            compress_min_bytes (int): Smaller buffers are never compressed
+            max_idle_seconds (float): Buffers unused for this long are released even under budget
+            is_active (callable): Takes a session id and returns False once that session has ended
+        """
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self.compress_min_bytes = compress_min_bytes
+        self.max_idle_seconds = max_idle_seconds
+        self.is_active = is_active
+        self._buffers = {}  # session id -> _Buffer
+        self._lock = threading.Lock()
+        self._last_release_check = time.monotonic()
+
+    def get(self, session_id):
+        """Text of a session's buffer, or None if it never had one or it was evicted."""
+        with self._lock:
+            buffer = self._buffers.get(session_id)
+            if buffer is None:
+                return None
+            buffer.last_used = time.monotonic()
+            text = buffer.text
+            if text is None:
+                text = buffer.text = zlib.decompress(buffer.compressed).decode("utf-8")
+                buffer.compressed = None
+                self._enforce_budget(buffer.last_used)  # May compress this buffer again if idle_seconds is 0
+            self._maybe_release(buffer.last_used)
+            return text
+
+    def set(self, session_id, text, shared=False):
+        """
+        Store a session's buffer.
+
+        Args:
+            session_id (str): Owning session
+            text (str): Buffer contents
+            shared (bool): text is the shared cached copy of an unchanged file
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._buffers[session_id] = _Buffer(text, shared, now)
+            self._enforce_budget(now)
+            self._maybe_release(now)
+
+    def discard(self, session_id):
+        """Release a session's buffer."""
+        with self._lock:
+            self._buffers.pop(session_id, None)
+
+    def release_inactive(self):
+        """
+        Release the buffers of ended sessions and of sessions unused for max_idle_seconds.
+
+        Returns:
+            int: Number of buffers released
+        """
+        with self._lock:
+            return self._release_inactive(time.monotonic())
+
+    def _maybe_release(self, now):
+        if now - self._last_release_check >= RELEASE_CHECK_INTERVAL:
+            self._release_inactive(now)
+
+    def _release_inactive(self, now):
+        self._last_release_check = now
+        released = [
+            session_id for session_id, buffer in self._buffers.items()
+            if now - buffer.last_used >= self.max_idle_seconds
+            or (self.is_active is not None and not self.is_active(session_id))
+        ]
+        for session_id in released:
+            del self._buffers[session_id]
+        return len(released)
+
+    def _usage(self):
+        # A cached text shared by several sessions is only held once
+        shared = {id(b.text): b.size for b in self._buffers.values() if b.shared}
+        return sum(shared.values()) + sum(self._footprint(b) for b in self._buffers.values() if not b.shared)
+
+    def _enforce_budget(self, now):
+        used = self._usage()
+        if used <= self.budget_bytes:
+            return
+        idle = sorted(
+            (b for b in self._buffers.values() if now - b.last_used >= self.idle_seconds),
+            key=lambda b: b.last_used,
+        )
+        # Compress the longest-idle unshared buffers first...
+        for buffer in idle:
+            if used <= self.budget_bytes:
+                return
+            if not buffer.shared and buffer.text is not None and buffer.size >= self.compress_min_bytes:
+                before = self._footprint(buffer)
+                buffer.compressed = zlib.compress(buffer.text.encode("utf-8"), COMPRESSION_LEVEL)
+                buffer.text = None
+                used -= before - self._footprint(buffer)
+        # ...then drop idle buffers (shared ones included) altogether, oldest first
+        idle = set(map(id, idle))
+        for session_id, buffer in sorted(self._buffers.items(), key=lambda item: item[1].last_used):
+            if used <= self.budget_bytes:
+                return
+            if id(buffer) in idle:
+                del self._buffers[session_id]
+                used = self._usage()
+
+    @staticmethod
+    def _footprint(buffer):
+        return buffer.size if buffer.text is not None else len(buffer.compressed)
+
+    def stats(self):
+        """Session count and resident/shared/compressed buffer bytes."""
+        with self._lock:
+            buffers = list(self._buffers.values())
+            return {
+                "sessions": len(buffers),
+                "resident_bytes": sum(b.size for b in buffers if b.text is not None and not b.shared),
+                "shared_bytes": sum({id(b.text): b.size for b in buffers if b.shared}.values()),
+                "compressed_bytes": sum(len(b.compressed) for b in buffers if b.text is None),
+                "compressed_sessions": sum(1 for b in buffers if b.text is None),
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+class OutputSpool:
+    """Keeps large run output on disk and serves it a page at a time."""
+
+    def __init__(self, spool_dir=None, cap_bytes=DEFAULT_OUTPUT_CAP_BYTES, page_bytes=DEFAULT_PAGE_BYTES,
+                 max_age=DEFAULT_SPOOL_MAX_AGE):
+        """
+        Args:
+            spool_dir (str): Directory for spooled output (defaults to .output_spool in the project root)
+            cap_bytes (int): Larger output is spooled to disk
+            page_bytes (int): Approximate size of a viewer page (pages end on line boundaries)
+            max_age (float): Spool files older than this many seconds are deleted on startup
+        """
+        self.spool_dir = spool_dir or os.environ.get("EDITOR_OUTPUT_SPOOL_DIR", DEFAULT_SPOOL_DIR)
+        self.cap_bytes = cap_bytes
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._pages = FileContentCache(max_bytes=16 * page_bytes, large_file_bytes=0, chunk_bytes=page_bytes)
+        self._sweep(max_age)
+
+    def _sweep(self, max_age):
+        cutoff = time.time() - max_age
+        with os.scandir(self.spool_dir) as it:
+            for entry in it:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError:
+                    continue
+
+    def store(self, text):
+        """
+        Keep text in memory if it is small, otherwise write it to a spool file.
+
+        Returns:
+            dict: {"text": ...} or {"path": ..., "size": ...}; pass it to page() and discard()
+        """
+        data = text.encode("utf-8")
+        if len(data) <= self.cap_bytes:
+            return {"text": text}
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.txt")
+        with open(path, 'wb') as f:
+            f.write(data)
+        return {"path": path, "size": len(data)}
+
+    def store_parts(self, parts):
+        """
+        Store output assembled from text and whole files, e.g. a run's complete stdout and stderr.
+
+        Args:
+            parts (list): str pieces, and pathlib.Path files whose contents are copied in
+
+        Returns:
+            dict: Handle as from store()
+
+        Raises:
+            OSError: If a file cannot be read
+        """
+        size = sum(os.path.getsize(part) if isinstance(part, os.PathLike) else len(part.encode("utf-8"))
+                   for part in parts)
+        if size <= self.cap_bytes:
+            return self.store("".join(
+                part.read_text("utf-8", errors="replace") if isinstance(part, os.PathLike) else part for part in parts
+            ))
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.txt")
+        try:
+            with open(path, 'wb') as out:
+                for part in parts:
+                    if isinstance(part, os.PathLike):
+                        with open(part, 'rb') as f:
+                            shutil.copyfileobj(f, out)
+                    else:
+                        out.write(part.encode("utf-8"))
+                size = out.tell()
+        except OSError:
+            self.discard({"path": path})
+            raise
+        return {"path": path, "size": size}
+
+    def page_count(self, handle):
+        if "text" in handle:
+            return 1
+        try:
+            return self._pages.chunk_count(handle["path"])
+        except OSError:
+            return 0
+
+    def page(self, handle, index):
+        """
+        Text of one page of stored output.
+
+        Raises:
+            OSError: If the spool file is gone
+        """
+        if "text" in handle:
+            return handle["text"]
+        return self._pages.read_chunk(handle["path"], index)
+
+    def discard(self, handle):
+        """Delete a spool file once its output is no longer shown."""
+        if handle and "path" in handle:
+            try:
+                os.unlink(handle["path"])
+            except OSError:
+                pass
@@ -0,0 +1,212 @@
+"""
+Content-addressed, delta-compressed snapshots of saved files.
+
+Every save stores the file's contents in a blobs table in the history database
+(.script_history.db), keyed by the SHA-256 of the text, so saving identical
+contents twice - or the same handler under two names - stores nothing new.
+A new version is stored as a line-level delta against the file's previous
+snapshot whenever that is smaller than the full text. Both forms are
+zlib-compressed.
+
+Delta chains are capped at MAX_CHAIN_DEPTH: the next snapshot after that is a
+full "keyframe", so restoring any version applies at most MAX_CHAIN_DEPTH
+deltas and takes milliseconds.
+"""
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+from history_store import BUSY_TIMEOUT, DEFAULT_DB_PATH, insert_entry
+
+MAX_CHAIN_DEPTH = 16
+COMPRESSION_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    base TEXT,
+    kind TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+
+def content_hash(text):
+    """Hex SHA-256 of a file's text, the address of its snapshot."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_delta(base_lines, lines):
+    """
+    Encode lines as copy/insert operations against base_lines.
+
+    Returns:
+        list: [start, end] ranges copied from the base and lists of inserted lines
+    """
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(lines[j1:j2])
+    return ops
+
+
+def apply_delta(base_lines, ops):
+    """Rebuild the lines encoded by make_delta()."""
+    lines = []
+    for op in ops:
+        if len(op) == 2 and isinstance(op[0], int):
+            lines.extend(base_lines[op[0]:op[1]])
+        else:
+            lines.extend(op)
+    return lines
+
+
+class SnapshotStore:
+    """Deduplicated, delta-compressed file snapshots addressed by content hash."""
+
+    def __init__(self, db_path=None, max_chain_depth=MAX_CHAIN_DEPTH):
+        """
+        Args:
+            db_path (str): SQLite database (defaults to the history database)
+            max_chain_depth (int): Deltas allowed before the next full keyframe
+        """
+        self.db_path = db_path or os.environ.get("EDITOR_HISTORY_DB", DEFAULT_DB_PATH)
+        self.max_chain_depth = max_chain_depth
+        self.conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def put(self, text, base_hash=None, history_entry=None):
+        """
+        Store a snapshot of text, as a delta against base_hash where that pays off.
+
+        Args:
+            text (str): File contents
+            base_hash (str): Snapshot of the file's previous version, if any
+            history_entry (dict): HistoryStore.append() arguments (without content_hash)
+                of the save this snapshot belongs to; the entry is inserted in the
+                same transaction, so a crash never leaves one without the other
+
+        Returns:
+            str: Content hash addressing the snapshot
+        """
+        digest = content_hash(text)
+        with self._lock:
+            blob = None
+            if self._row(digest) is None:  # Identical contents are stored once
+                full = zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+                kind, base, depth, data = "full", None, 0, full
+                base_row = self._row(base_hash) if base_hash else None
+                if base_row is not None and base_row[2] + 1 <= self.max_chain_depth:
+                    base_lines = self._text(base_hash).splitlines(keepends=True)
+                    ops = make_delta(base_lines, text.splitlines(keepends=True))
+                    delta = zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"),
+                                          COMPRESSION_LEVEL)
+                    if len(delta) < len(full):
+                        kind, base, depth, data = "delta", base_hash, base_row[2] + 1, delta
+                blob = (digest, base, kind, depth, len(text), data)
+
+            if blob is not None or history_entry is not None:
+                with self.conn:
+                    if blob is not None:
+                        self.conn.execute(
+                            "INSERT OR IGNORE INTO blobs (hash, base, kind, depth, size, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            blob,
+                        )
+                    if history_entry is not None:
+                        insert_entry(self.conn, content_hash=digest, **history_entry)
+        return digest
+
+    def get(self, digest):
+        """
+        Restore the text of a snapshot.
+
+        Raises:
+            KeyError: If no snapshot has that hash
+        """
+        with self._lock:
+            return self._text(digest)
+
+    def has(self, digest):
+        with self._lock:
+            return self._row(digest) is not None
+
+    def diff(self, old_hash, new_hash, old_name="before", new_name="after"):
+        """Unified diff between two snapshots."""
+        with self._lock:
+            old_lines = self._text(old_hash).splitlines(keepends=True)
+            new_lines = self._text(new_hash).splitlines(keepends=True)
+        return "".join(difflib.unified_diff(old_lines, new_lines, old_name, new_name))
+
+    def prune(self, keep=()):
+        """
+        Delete snapshots no history entry refers to (after the history was cleared).
+
+        Snapshots that a kept one is a delta against are kept too.
+
+        Args:
+            keep (iterable): Other snapshot hashes that are still needed (e.g. draft bases)
+
+        Returns:
+            int: Number of snapshots deleted
+        """
+        with self._lock, self.conn:
+            # Block other savers so no entry starts referring to a snapshot being deleted
+            self.conn.execute("BEGIN IMMEDIATE")
+            needed = set(keep)
+            if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history'").fetchone():
+                needed.update(row[0] for row in self.conn.execute(
+                    "SELECT DISTINCT content_hash FROM history WHERE content_hash IS NOT NULL"))
+            bases = dict(self.conn.execute("SELECT hash, base FROM blobs"))
+            live = set()
+            for digest in needed:
+                while digest in bases and digest not in live:
+                    live.add(digest)
+                    digest = bases[digest]
+            dead = [digest for digest in bases if digest not in live]
+            self.conn.executemany("DELETE FROM blobs WHERE hash = ?", ((digest,) for digest in dead))
+        return len(dead)
+
+    def stats(self):
+        """Snapshot counts and stored vs original bytes."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(kind = 'delta'), 0) FROM blobs"
+            ).fetchone()
+        return {"snapshots": row[0], "stored_bytes": row[1], "original_bytes": row[2], "deltas": row[3]}
+
+    def _row(self, digest):
+        return self.conn.execute("SELECT kind, base, depth, data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+
+    def _text(self, digest):
+        # Walk back to the keyframe, then replay the deltas forwards
+        chain = []
+        while True:
+            row = self._row(digest)
+            if row is None:
+                raise KeyError(f"No snapshot {digest}")
+            kind, base, _, data = row
+            chain.append(zlib.decompress(data))
+            if kind == "full":
+                break
+            digest = base
+        lines = chain.pop().decode("utf-8").splitlines(keepends=True)
+        while chain:
+            lines = apply_delta(lines, json.loads(chain.pop()))
+        return "".join(lines)
@@ -0,0 +1,236 @@
+"""
+Symbol index behind the editor's outline and jump-to-definition.
+
+SymbolIndex parses files with the ast module and records their classes,
+functions, methods and module-level names. Parsed symbols are cached by the
+SHA-256 of the file's contents, so the many handler variants that share code
+are parsed once, and a file is only reparsed when its contents changed since
+it was last indexed.
+
+Parsing happens on a single background thread: schedule() and sync() only
+queue work and return immediately, and outline()/definitions() answer from
+whatever has been indexed so far. pending() tells callers whether an answer
+may still change.
+
+sync() runs on every editor rerun, but stat-ing every listed file is only
+worth it when the FileIndex listing changed or sync_interval seconds passed,
+so calls in between return at once. Saves from the editor go through
+schedule() and are never delayed by that.
+"""
+import ast
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from snapshot_store import content_hash
+
+DEFAULT_MAX_FILE_BYTES = 4 * 1024 * 1024
+DEFAULT_SYNC_INTERVAL = 5.0
+
+_log = logging.getLogger(__name__)
+
+
+def parse_symbols(text):
+    """
+    Symbols defined in Python source.
+
+    Returns:
+        list: Dicts with name, qualname, kind ("class", "function", "method" or
+            "variable"), line and end_line, in source order
+
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    tree = ast.parse(text)
+    symbols = []
+
+    def visit(body, parent=None):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                if isinstance(node, ast.ClassDef):
+                    kind = "class"
+                else:
+                    kind = "method" if parent and parent["kind"] == "class" else "function"
+                qualname = f"{parent['qualname']}.{node.name}" if parent else node.name
+                symbol = {"name": node.name, "qualname": qualname, "kind": kind,
+                          "line": node.lineno, "end_line": node.end_lineno}
+                symbols.append(symbol)
+                visit(node.body, symbol)
+            elif parent is None and isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        symbols.append({"name": target.id, "qualname": target.id, "kind": "variable",
+                                        "line": node.lineno, "end_line": node.end_lineno})
+
+    visit(tree.body)
+    return symbols
+
+
+class SymbolIndex:
+    """Content-hash-cached symbol tables of files under a root, built on a background thread."""
+
+    def __init__(self, root, max_file_bytes=DEFAULT_MAX_FILE_BYTES, sync_interval=DEFAULT_SYNC_INTERVAL):
+        """
+        Args:
+            root (str): Directory the indexed relative paths are under
+            max_file_bytes (int): Larger files are not parsed
+            sync_interval (float): Seconds between sync() checks of every file while the listing is unchanged
+        """
+        self.root = os.path.abspath(root)
+        self.max_file_bytes = max_file_bytes
+        self.sync_interval = sync_interval
+        self._synced = (None, 0.0)  # (FileIndex version, monotonic time) of the last full sync
+        self._files = {}  # relpath -> (stamp, content hash)
+        self._symbols = {}  # content hash -> symbol list, or None if it did not parse
+        self._queue = deque()  # (relpath, text or None, stamp or None)
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._index_loop, name="symbol-index", daemon=True)
+        self._thread.start()
+
+    def schedule(self, relpath, text=None):
+        """Queue a file for (re-)indexing; text is read from disk when omitted."""
+        with self._cond:
+            self._enqueue(relpath, text, None)
+
+    def sync(self, file_index, force=False):
+        """
+        Queue every file a FileIndex lists whose size or mtime changed since it was indexed.
+
+        Skipped while the listing's version is unchanged and the last full
+        check is less than sync_interval seconds old, unless force is set.
+
+        Returns:
+            int: Number of files queued or dropped
+        """
+        file_index.refresh()
+        version, now = file_index.version, time.monotonic()
+        with self._cond:
+            if not force and self._synced[0] == version and now - self._synced[1] < self.sync_interval:
+                return 0
+            self._synced = (version, now)
+        current = {relpath: file_index.stat(relpath) for relpath in file_index.files()}
+        changed = 0
+        with self._cond:
+            for relpath in self._files.keys() - current.keys():
+                del self._files[relpath]
+                changed += 1
+            for relpath, stamp in current.items():
+                entry = self._files.get(relpath)
+                if stamp is not None and (entry is None or entry[0] != stamp) and relpath not in self._queued:
+                    self._enqueue(relpath, None, stamp)
+                    changed += 1
+            if changed:
+                self._prune()
+        return changed
+
+    def _enqueue(self, relpath, text, stamp):
+        # Newer contents replace a queued read of the same file
+        if relpath in self._queued:
+            self._queue = deque(item for item in self._queue if item[0] != relpath)
+        self._queue.append((relpath, text, stamp))
+        self._queued.add(relpath)
+        self._cond.notify()
+
+    def _prune(self):
+        # Keep only the symbol tables some indexed file still refers to
+        live = {digest for _, digest in self._files.values()}
+        for digest in [digest for digest in self._symbols if digest not in live]:
+            del self._symbols[digest]
+
+    def _index_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                relpath, text, stamp = self._queue.popleft()
+            try:
+                self._index(relpath, text, stamp)
+            except Exception:
+                _log.exception("Indexing %s failed", relpath)  # Keep the thread alive for the other files
+            finally:
+                with self._cond:
+                    if not any(item[0] == relpath for item in self._queue):
+                        self._queued.discard(relpath)
+                    self._cond.notify_all()
+
+    def _index(self, relpath, text, stamp):
+        path = os.path.join(self.root, relpath)
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_size, stat.st_mtime_ns) if text is None or stamp is None else stamp
+            if text is None:
+                if stat.st_size > self.max_file_bytes:
+                    with self._cond:
+                        self._files[relpath] = (stamp, None)  # Remembered so sync() does not requeue it
+                    return
+                with open(path, 'r', errors="replace") as f:
+                    text = f.read()
+        except OSError:
+            with self._cond:
+                self._files.pop(relpath, None)
+            return
+        digest = content_hash(text)
+        with self._cond:
+            cached = digest in self._symbols
+        if not cached:
+            try:
+                symbols = parse_symbols(text)
+            except (SyntaxError, ValueError):
+                symbols = None
+            except Exception:  # e.g. RecursionError on deeply nested code
+                _log.warning("Could not parse symbols of %s", relpath, exc_info=True)
+                symbols = None
+            with self._cond:
+                self._symbols[digest] = symbols
+        with self._cond:
+            self._files[relpath] = (stamp, digest)
+
+    def pending(self, relpath=None):
+        """True while files (or relpath) are still queued for indexing."""
+        with self._cond:
+            return relpath in self._queued if relpath else bool(self._queued)
+
+    def wait(self, timeout=None):
+        """Block until the queue is empty; False if the timeout expired first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queued, timeout)
+
+    def outline(self, relpath):
+        """
+        Symbols of one indexed file.
+
+        Returns:
+            list: Symbols as from parse_symbols(), or None if the file is not
+                indexed yet or its current contents do not parse
+        """
+        with self._cond:
+            entry = self._files.get(relpath)
+            return self._symbols.get(entry[1]) if entry else None
+
+    def definitions(self, name):
+        """
+        Where a name is defined across all indexed files.
+
+        Args:
+            name (str): Plain name ("generate_mediaconvert_job") or qualified
+                name ("RunQueue.submit")
+
+        Returns:
+            list: Symbols with an added "file" key, sorted by file and line
+        """
+        matches = []
+        with self._cond:
+            for relpath, (_, digest) in self._files.items():
+                for symbol in self._symbols.get(digest) or ():
+                    if name in (symbol["name"], symbol["qualname"]):
+                        matches.append(dict(symbol, file=relpath))
+        return sorted(matches, key=lambda symbol: (symbol["file"], symbol["line"]))
+
+    def stats(self):
+        """Indexed file, distinct content and queued counts."""
+        with self._cond:
+            return {"files": len(self._files), "parsed": len(self._symbols), "queued": len(self._queued)}
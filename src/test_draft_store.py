@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Tests for write-behind autosave drafts (draft_store.DraftStore)"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import draft_store
+from draft_store import DraftStore
+from snapshot_store import SnapshotStore, content_hash
+
+SAVED = "def main():\n    print('saved')\n"
+EDITED = "def main():\n    print('edited')\n"
+
+
+class DraftStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshots = SnapshotStore(os.path.join(self.tmp.name, "history.db"))
+        self.drafts_dir = os.path.join(self.tmp.name, "drafts")
+        self.drafts = DraftStore(self.snapshots, drafts_dir=self.drafts_dir, debounce=60)
+
+    def tearDown(self):
+        self.snapshots.close()
+        self.tmp.cleanup()
+
+    def draft_files(self):
+        return [name for name in os.listdir(self.drafts_dir) if name.endswith(".draft")]
+
+    def test_stage_is_debounced(self):
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        self.assertEqual(self.draft_files(), [])
+        self.assertTrue(self.drafts.info("alice", "handler.py")["pending"])
+        self.assertEqual(self.drafts.load("alice", "handler.py"), EDITED)
+
+    def test_flush_writes_a_delta_against_the_saved_version(self):
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        self.drafts.flush()
+        self.assertEqual(len(self.draft_files()), 1)
+        info = self.drafts.info("alice", "handler.py")
+        self.assertEqual(info["hash"], content_hash(EDITED))
+        self.assertEqual(info["base"], content_hash(SAVED))
+        self.assertFalse(info["pending"])
+        self.assertEqual(self.drafts.bases(), {content_hash(SAVED)})
+
+        # Another server process sees the same draft
+        other = DraftStore(self.snapshots, drafts_dir=self.drafts_dir)
+        self.assertEqual(other.load("alice", "handler.py"), EDITED)
+        self.assertIsNone(other.load("bob", "handler.py"))
+
+    def test_background_writer(self):
+        drafts = DraftStore(self.snapshots, drafts_dir=self.drafts_dir, debounce=0.05)
+        drafts.stage("alice", "handler.py", EDITED, SAVED)
+        deadline = time.monotonic() + 5
+        while drafts.info("alice", "handler.py")["pending"]:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(drafts.load("alice", "handler.py"), EDITED)
+
+    def test_discard(self):
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        self.drafts.flush()
+        self.drafts.discard("alice", "handler.py")
+        self.assertEqual(self.draft_files(), [])
+        self.assertIsNone(self.drafts.info("alice", "handler.py"))
+        self.assertIsNone(self.drafts.load("alice", "handler.py"))
+
+    def test_discard_during_the_write_leaves_no_draft(self):
+        real_write = draft_store.atomic_write
+
+        def write_then_discard(path, text):
+            real_write(path, text)
+            self.drafts.discard("alice", "handler.py")  # Saved while the draft was being written
+
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        with mock.patch.object(draft_store, "atomic_write", write_then_discard):
+            self.drafts.flush()
+        self.assertEqual(self.draft_files(), [])
+
+    def test_failed_writes_back_off_and_give_up(self):
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        with mock.patch.object(draft_store, "atomic_write", side_effect=OSError("disk full")), \
+                self.assertLogs("draft_store", level="WARNING"):
+            self.drafts.flush()
+            due = self.drafts._pending[("alice", "handler.py")][2]
+            self.assertGreater(due - time.monotonic(), draft_store.RETRY_DELAY / 2)  # Not retried right away
+            for _ in range(draft_store.MAX_WRITE_ATTEMPTS - 1):
+                self.drafts.flush()
+        self.assertIsNone(self.drafts.info("alice", "handler.py"))
+        self.assertEqual(self.draft_files(), [])
+
+    def test_unchanged_text_is_not_staged_again(self):
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        self.drafts.flush()
+        self.drafts.stage("alice", "handler.py", EDITED, SAVED)
+        self.assertFalse(self.drafts.info("alice", "handler.py")["pending"])
+
+
+if __name__ == "__main__":
+    unittest.main()
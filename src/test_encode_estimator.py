@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Tests for the batch cost/turnaround estimator (encode_estimator)"""
+
+import json
+import random
+import unittest
+
+from encode_estimator import (
+    ACCELERATION,
+    CODECS,
+    DEFAULT_SLOTS_PER_QUEUE,
+    ENCODE_MINUTES_PER_MINUTE,
+    MULTI_PASS_MULTIPLIER,
+    PRICE_PER_MINUTE,
+    estimate_batch,
+    job_features,
+    preset_features,
+    tier_for_height,
+)
+
+
+def make_job(source, name_modifier, codec=None, height=None, multi_pass=False):
+    video = {"CodecSettings": {}}
+    if codec:
+        settings = {"QualityTuningLevel": "MULTI_PASS_HQ" if multi_pass else "SINGLE_PASS_HQ"}
+        video["CodecSettings"] = {"Codec": codec, f"{codec.replace('_', '')}Settings": settings}
+    if height:
+        video["Height"] = height
+    return {"Settings": {
+        "Inputs": [{"FileInput": source}],
+        "OutputGroups": [{"Outputs": [{"NameModifier": name_modifier, "VideoDescription": video}]}],
+    }}
+
+
+def scalar_estimate(jobs, durations_seconds, scenario):
+    """Per-job reference for one scenario, written without NumPy."""
+    speed, price_multiplier = ACCELERATION[scenario.get("acceleration", "DISABLED")]
+    slots = max(1, scenario.get("queues", 1) * scenario.get("slots_per_queue", DEFAULT_SLOTS_PER_QUEUE))
+    total_encode = total_cost = longest = 0.0
+    for job, seconds in zip(jobs, durations_seconds):
+        output = job["Settings"]["OutputGroups"][0]["Outputs"][0]
+        video = output["VideoDescription"]
+        codec, tier = preset_features(output["NameModifier"])
+        if video["CodecSettings"].get("Codec") in CODECS:
+            codec = CODECS.index(video["CodecSettings"]["Codec"])
+        if "Height" in video:
+            tier = tier_for_height(video["Height"])
+        if scenario.get("preset"):
+            codec, tier = preset_features(scenario["preset"])
+        passes = 1.0
+        for value in video["CodecSettings"].values():
+            if isinstance(value, dict) and value.get("QualityTuningLevel", "").startswith("MULTI_PASS"):
+                passes = MULTI_PASS_MULTIPLIER
+        minutes = seconds / 60.0
+        encode = minutes * ENCODE_MINUTES_PER_MINUTE[codec][tier] * passes * speed
+        total_encode += encode
+        total_cost += minutes * PRICE_PER_MINUTE[codec][tier] * passes * price_multiplier
+        longest = max(longest, encode)
+    return {"encode_minutes": round(total_encode, 2), "cost_usd": round(total_cost, 2),
+            "makespan_minutes": round(max(total_encode / slots, longest), 2), "slots": slots}
+
+
+class PresetFeaturesTest(unittest.TestCase):
+    def test_codec_and_tier_from_preset_names(self):
+        cases = {
+            "HD_1080p_H264": ("H_264", 1),
+            "System-Generic_Hd_Mp4_Av1_Aac_16x9_1920x1080p_24Hz_6000Kbps": ("AV1", 1),
+            "Av1_3840x2160p": ("AV1", 2),
+            "SD_480p_HEVC": ("H_265", 0),
+            "UHD_H265": ("H_265", 2),
+            "mobile_sd": ("H_264", 0),
+            "web_4k": ("H_264", 2),
+            "default": ("H_264", 1),
+        }
+        for name, (codec, tier) in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(preset_features(name), (CODECS.index(codec), tier))
+
+    def test_tier_boundaries(self):
+        self.assertEqual([tier_for_height(h) for h in (480, 576, 720, 1080, 1440, 2160)], [0, 0, 1, 1, 2, 2])
+
+
+class EstimateBatchTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        presets = ["_HD_1080p_H264", "_SD_480p_HEVC", "_Av1_3840x2160p", "_web"]
+        self.jobs = []
+        for i in range(200):
+            codec = rng.choice([None, "H_264", "H_265", "AV1"])
+            self.jobs.append(make_job(f"s3://in/{i}.mp4", rng.choice(presets), codec=codec,
+                                      height=rng.choice([None, 480, 720, 2160]), multi_pass=rng.random() < 0.3))
+        self.durations = [rng.uniform(10, 7200) for _ in self.jobs]
+
+    def test_matches_a_per_job_loop(self):
+        scenarios = [
+            {"name": "as generated"},
+            {"name": "accelerated", "acceleration": "ENABLED", "queues": 4},
+            {"name": "preferred", "acceleration": "PREFERRED", "queues": 2, "slots_per_queue": 5},
+            {"name": "av1-4k", "preset": "Av1_3840x2160p", "queues": 10},
+        ]
+        results = estimate_batch(self.jobs, self.durations, scenarios)
+        for scenario, result in zip(scenarios, results):
+            with self.subTest(scenario=scenario["name"]):
+                expected = scalar_estimate(self.jobs, self.durations, scenario)
+                for column, value in expected.items():
+                    self.assertAlmostEqual(result[column], value, delta=0.011, msg=column)  # Both sides are rounded
+                self.assertEqual(result["name"], scenario["name"])
+                self.assertEqual(result["jobs"], len(self.jobs))
+
+    def test_features_and_json_text_give_the_same_estimate(self):
+        scenarios = [{"acceleration": "ENABLED"}]
+        features = job_features([json.dumps(job) for job in self.jobs])
+        self.assertEqual(features["source"][0], "s3://in/0.mp4")
+        self.assertEqual(estimate_batch(features, self.durations, scenarios),
+                         estimate_batch(self.jobs, self.durations, scenarios))
+
+    def test_unnamed_scenarios_and_empty_batches(self):
+        result = estimate_batch([], [], [{}])[0]
+        self.assertEqual((result["name"], result["jobs"], result["makespan_minutes"]), ("scenario-1", 0, 0.0))
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            estimate_batch(self.jobs, self.durations[:-1], [{}])
+        with self.assertRaises(ValueError):
+            estimate_batch(self.jobs, self.durations, [{"acceleration": "TURBO"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
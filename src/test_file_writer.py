@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Tests for locked, conflict-checked, atomic saves (file_writer)"""
+
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from file_writer import SaveConflictError, disk_version, file_lock, write_if_unchanged
+from snapshot_store import content_hash
+
+
+class WriteIfUnchangedTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "handler.py")
+        with open(self.path, 'w') as f:
+            f.write("print('loaded')\n")
+        self.loaded = disk_version(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def write_elsewhere(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def test_saves_over_the_loaded_version(self):
+        version = write_if_unchanged(self.path, "print('mine')\n", self.loaded)
+        self.assertEqual(version, content_hash("print('mine')\n"))
+        self.assertEqual(self.read(), "print('mine')\n")
+
+    def test_refuses_when_the_file_changed_on_disk(self):
+        self.write_elsewhere("print('theirs')\n")
+        with self.assertRaises(SaveConflictError) as caught:
+            write_if_unchanged(self.path, "print('mine')\n", self.loaded)
+        self.assertEqual(caught.exception.current_text, "print('theirs')\n")
+        self.assertEqual(self.read(), "print('theirs')\n")
+
+    def test_identical_contents_are_not_a_conflict(self):
+        self.write_elsewhere("print('same')\n")
+        write_if_unchanged(self.path, "print('same')\n", self.loaded)
+        self.assertEqual(self.read(), "print('same')\n")
+
+    def test_no_expected_version_overwrites(self):
+        self.write_elsewhere("print('theirs')\n")
+        write_if_unchanged(self.path, "print('mine')\n")
+        self.assertEqual(self.read(), "print('mine')\n")
+
+    def test_create_refuses_an_existing_file(self):
+        with self.assertRaises(SaveConflictError):
+            write_if_unchanged(self.path, "print('new file')\n", create=True)
+        self.assertEqual(self.read(), "print('loaded')\n")
+
+        new_path = os.path.join(self.tmp.name, "new.py")
+        write_if_unchanged(new_path, "print('new file')\n", create=True)
+        write_if_unchanged(new_path, "print('new file')\n", create=True)  # Saving the same text again is fine
+        self.assertEqual(disk_version(new_path), content_hash("print('new file')\n"))
+
+    def test_replace_is_atomic_and_keeps_permissions(self):
+        os.chmod(self.path, 0o755)
+        write_if_unchanged(self.path, "print('mine')\n", self.loaded)
+        self.assertEqual(os.listdir(self.tmp.name), ["handler.py"])  # No temp file left behind
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o755)
+
+    def test_failed_write_leaves_the_file_and_no_temp_file(self):
+        with mock.patch("file_writer.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_if_unchanged(self.path, "print('mine')\n", self.loaded)
+        self.assertEqual(self.read(), "print('loaded')\n")
+        self.assertEqual(os.listdir(self.tmp.name), ["handler.py"])
+
+
+class FileLockTest(unittest.TestCase):
+    def test_saves_of_the_same_file_are_serialized(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path, lock_dir = os.path.join(tmp, "handler.py"), os.path.join(tmp, "locks")
+            order = []
+            holding = threading.Event()
+
+            def second_save():
+                holding.wait()
+                with file_lock(path, lock_dir):
+                    order.append("second")
+
+            thread = threading.Thread(target=second_save)
+            thread.start()
+            with file_lock(path, lock_dir):
+                holding.set()
+                time.sleep(0.2)  # The other save has to wait for this block
+                order.append("first")
+            thread.join(5)
+            self.assertEqual(order, ["first", "second"])
+
+    def test_other_files_are_not_blocked(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lock_dir = os.path.join(tmp, "locks")
+            with file_lock(os.path.join(tmp, "a.py"), lock_dir):
+                acquired = threading.Event()
+
+                def other_save():
+                    with file_lock(os.path.join(tmp, "b.py"), lock_dir):
+                        acquired.set()
+
+                thread = threading.Thread(target=other_save)
+                thread.start()
+                self.assertTrue(acquired.wait(5))
+                thread.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,79 +1,104 @@
 #!/usr/bin/env python3
-"""Test script to verify history tracking functionality"""
+"""Tests for the SQLite update history (history_store.HistoryStore)"""
 
-import os
 import json
-from datetime import datetime
-import getpass
-
-def save_script_to_file(script_code, filename="handler.py", update_message=""):
-    """Save the script to a file and record update history."""
-    try:
-        if script_code is None:
-            return False, "Error: No script content to save"
-
-        # Save the script
-        with open(filename, 'w') as f:
-            f.write(script_code)
-
-        # Load existing history
-        history_file = ".script_history.json"
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                update_history = json.load(f)
-        else:
-            update_history = []
-
-        # Record history entry
-        history_entry = {
-            "filename": filename,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "user": getpass.getuser(),
-            "update_message": update_message if update_message else "No message provided",
-            "file_size": len(script_code)
-        }
-
-        # Add to history
-        update_history.append(history_entry)
-
-        # Save history to file
-        with open(history_file, 'w') as f:
-            json.dump(update_history, f, indent=2)
-
-        return True, f"Script saved to {filename}"
-    except Exception as e:
-        return False, f"Error saving script: {str(e)}"
+import os
+import tempfile
+import unittest
 
-if __name__ == "__main__":
-    print("Testing history tracking functionality...\n")
-
-    # Test 1: Save with message
-    success, msg = save_script_to_file('print("Hello World")', 'test_script.py', 'Initial commit')
-    print(f"✅ Test 1: {msg}")
-
-    # Test 2: Save another file
-    success, msg = save_script_to_file('print("Updated code")', 'test_script.py', 'Fixed bug in print statement')
-    print(f"✅ Test 2: {msg}")
-
-    # Test 3: Save without message
-    success, msg = save_script_to_file('print("No message")', 'another_file.py', '')
-    print(f"✅ Test 3: {msg}")
-
-    # Display history
-    print("\n📜 Update History:")
-    print("=" * 80)
-    if os.path.exists('.script_history.json'):
-        with open('.script_history.json', 'r') as f:
-            history = json.load(f)
-        print(f"Total entries: {len(history)}\n")
-        for i, entry in enumerate(history, 1):
-            print(f"{i}. File: {entry['filename']}")
-            print(f"   User: {entry['user']}")
-            print(f"   Time: {entry['timestamp']}")
-            print(f"   Message: {entry['update_message']}")
-            print(f"   Size: {entry['file_size']} characters")
-            print()
-
-    print("=" * 80)
-    print("\n✅ All tests completed successfully!")
+from history_store import HistoryStore
+from snapshot_store import SnapshotStore
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "history.db")
+        self.store = HistoryStore(self.db_path, legacy_path=None)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_append_and_entries(self):
+        self.store.append("handler.py", "alice", "Initial commit", 20, timestamp="2026-01-01 10:00:00")
+        self.store.append("handler.py", "bob", "Fixed bug in print statement", 22, timestamp="2026-01-02 10:00:00")
+        self.store.append("other.py", "alice", "No message provided", 5, timestamp="2026-01-03 10:00:00")
+
+        entries = self.store.entries()
+        self.assertEqual([e["update_message"] for e in entries],
+                         ["No message provided", "Fixed bug in print statement", "Initial commit"])
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual(self.store.count(filename="handler.py"), 2)
+        self.assertEqual(self.store.count(user="alice"), 2)
+        self.assertEqual(self.store.count(since="2026-01-02", until="2026-01-02 23:59:59"), 1)
+        self.assertEqual(self.store.filenames(), ["handler.py", "other.py"])
+        self.assertEqual(self.store.latest("handler.py")["user"], "bob")
+
+    def test_paging(self):
+        for i in range(7):
+            self.store.append("handler.py", "alice", f"Save {i}", i)
+        pages = [self.store.entries(limit=3, offset=offset) for offset in (0, 3, 6)]
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(pages[0][0]["update_message"], "Save 6")
+        self.assertEqual(pages[2][0]["update_message"], "Save 0")
 
+    def test_search_matches_every_word(self):
+        self.store.append("handler.py", "alice", "Fixed preset lookup", 1)
+        self.store.append("handler.py", "alice", "Added preset", 1)
+        self.assertEqual(self.store.count(search="preset"), 2)
+        self.assertEqual(self.store.count(search="fix preset"), 1)
+
+    def test_count_sees_writes_from_other_connections(self):
+        self.store.append("handler.py", "alice", "One", 1)
+        self.assertEqual(self.store.count(), 1)  # Cached from here on
+        other = HistoryStore(self.db_path, legacy_path=None)
+        try:
+            other.append("handler.py", "bob", "Two", 1)
+        finally:
+            other.close()
+        self.assertEqual(self.store.count(), 2)
+        self.store.clear()
+        self.assertEqual(self.store.count(), 0)
+
+    def test_latest_snapshot_skips_entries_without_one(self):
+        first = self.store.append("handler.py", "alice", "With snapshot", 1, content_hash="abc")
+        self.store.append("handler.py", "alice", "Imported", 1)
+        self.assertEqual(self.store.latest_snapshot("handler.py")["id"], first["id"])
+        self.assertIsNone(self.store.latest_snapshot("handler.py", before_id=first["id"]))
+
+    def test_snapshot_and_entry_are_recorded_together(self):
+        snapshots = SnapshotStore(self.db_path)
+        try:
+            digest = snapshots.put("print('Hello World')\n", history_entry={
+                "filename": "handler.py", "user": "alice", "update_message": "Initial commit", "file_size": 21,
+            })
+            entry = self.store.latest("handler.py")
+            self.assertEqual(entry["content_hash"], digest)
+            self.assertEqual(snapshots.get(entry["content_hash"]), "print('Hello World')\n")
+
+            with self.assertRaises(TypeError):  # Bad entry: neither the snapshot nor the entry is stored
+                snapshots.put("print('Updated')\n", history_entry={"filename": "handler.py"})
+            self.assertEqual(self.store.count(), 1)
+            self.assertEqual(snapshots.stats()["snapshots"], 1)
+        finally:
+            snapshots.close()
+
+    def test_legacy_json_is_imported_once(self):
+        legacy_path = os.path.join(self.tmp.name, ".script_history.json")
+        with open(legacy_path, 'w') as f:
+            json.dump([{"filename": "handler.py", "timestamp": "2025-12-31 09:00:00", "user": "alice",
+                        "update_message": "From the JSON file", "file_size": 10}], f)
+        db_path = os.path.join(self.tmp.name, "imported.db")
+        store = HistoryStore(db_path, legacy_path=legacy_path)
+        store.close()
+        store = HistoryStore(db_path, legacy_path=legacy_path)
+        try:
+            self.assertEqual(store.count(), 1)
+            self.assertEqual(store.latest()["update_message"], "From the JSON file")
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Tests for the job JSON memo cache (job_cache.JobCache) and how the handler uses it"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import handler
+from job_cache import EVICT_TO, JobCache, cache_key
+
+
+class JobCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fill(self, cache, count, size=10):
+        """Put count entries, the first one least recently used."""
+        keys = [cache_key("1", i) for i in range(count)]
+        for i, key in enumerate(keys):
+            cache.put(key, b"x" * size)
+            os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+        return keys
+
+    def test_get_and_put(self):
+        cache = JobCache(self.cache_dir)
+        key = cache_key("1", "in.mp4", "out/", "HD")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, b'{"Role": "r"}')
+        self.assertEqual(cache.get(key), b'{"Role": "r"}')
+        self.assertNotEqual(key, cache_key("2", "in.mp4", "out/", "HD"))  # A new template version misses
+
+    def test_usage_is_tracked_without_rescanning(self):
+        cache = JobCache(self.cache_dir)
+        key = cache_key("1", "a")
+        cache.put(key, b"x" * 10)
+        cache.put(key, b"x" * 25)  # Replacing an entry does not add one
+        cache.put(cache_key("1", "b"), b"x" * 5)
+        self.assertEqual(cache._usage, [30, 2])
+
+    def test_entry_limit_evicts_least_recently_used_down_to_evict_to(self):
+        cache = JobCache(self.cache_dir, max_entries=10)
+        keys = self.fill(cache, 10)
+        self.assertIsNotNone(cache.get(keys[0]))  # Now the most recently used
+        cache.put(cache_key("1", "new"), b"x" * 10)
+        remaining = [key for key in keys if os.path.exists(cache._path(key))]
+        self.assertEqual(len(remaining) + 1, int(10 * EVICT_TO))
+        self.assertIn(keys[0], remaining)
+        self.assertNotIn(keys[1], remaining)
+        self.assertEqual(cache._usage, [int(10 * EVICT_TO) * 10, int(10 * EVICT_TO)])
+
+    def test_byte_limit(self):
+        cache = JobCache(self.cache_dir, max_bytes=100)
+        keys = self.fill(cache, 10)
+        cache.put(cache_key("1", "big"), b"x" * 40)
+        self.assertLessEqual(cache._usage[0], 100 * EVICT_TO)
+        self.assertFalse(os.path.exists(cache._path(keys[0])))
+        self.assertTrue(os.path.exists(cache._path(keys[-1])))
+
+    def test_existing_entries_are_counted_on_the_first_write(self):
+        self.fill(JobCache(self.cache_dir), 5)
+        cache = JobCache(self.cache_dir, max_entries=5)  # E.g. the next handler process
+        cache.put(cache_key("1", "new"), b"x" * 10)
+        self.assertEqual(len(os.listdir(self.cache_dir)), int(5 * EVICT_TO))
+
+    def test_clear(self):
+        cache = JobCache(self.cache_dir)
+        self.fill(cache, 3)
+        cache.clear()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        cache.put(cache_key("1", "new"), b"x")
+        self.assertEqual(cache._usage, [1, 1])
+
+
+class HandlerCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = JobCache(os.path.join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def get_job(self, input_path="s3://in/video.mp4", output_path="s3://out/"):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            job_bytes = handler.get_mediaconvert_job_json(input_path, output_path, "HD", cache=self.cache)
+        return job_bytes, output.getvalue()
+
+    def test_hits_are_not_validated_again(self):
+        built, _ = self.get_job()
+        with mock.patch.object(handler, "validate_mediaconvert_job") as validate:
+            cached, _ = self.get_job()
+        self.assertEqual(cached, built)
+        validate.assert_not_called()
+
+    def test_invalid_jobs_are_not_cached(self):
+        for _ in range(2):
+            _, printed = self.get_job(output_path="/local/out/")
+            self.assertIn("WARNING: Destination is not an S3 path", printed)
+        self.assertFalse(os.path.exists(self.cache.cache_dir))  # Nothing was ever written
+
+
+if __name__ == "__main__":
+    unittest.main()
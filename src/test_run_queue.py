@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Tests for the fair run queue (run_queue.RunQueue) against an in-memory pool"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import run_queue
+from run_queue import QueueFullError, RunQueue
+
+
+class FakeHandle:
+    def __init__(self, source):
+        self.source = source
+        self.stdout_path = f"/spool/{source}/stdout.txt"
+        self.stderr_path = f"/spool/{source}/stderr.txt"
+        self.started = time.monotonic()
+        self.result = None
+        self.poll_error = None
+        self.cleaned_up = False
+
+    def finish(self, returncode=0):
+        self.result = {"returncode": returncode, "duration": 0.01, "timed_out": False, "cancelled": False,
+                       "stdout": f"{self.source}\n", "stderr": ""}
+
+    def poll(self, wait=0):
+        if self.poll_error is not None:
+            raise self.poll_error
+        return self.result
+
+    def cancel(self):
+        if self.result is not None:
+            return False
+        self.result = {"returncode": None, "duration": 0.0, "timed_out": False, "cancelled": True,
+                       "stdout": "", "stderr": ""}
+        return True
+
+    def read_output(self):
+        return "", ""
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+class FakePool:
+    """Starts runs instantly; tests finish them explicitly through the handles."""
+
+    def __init__(self, size):
+        self.size = size
+        self.handles = []
+        self.submit_error = None
+        self.lock = threading.Lock()
+
+    def submit(self, source, acquire_timeout=None, **options):
+        if self.submit_error is not None:
+            raise self.submit_error
+        handle = FakeHandle(source)
+        with self.lock:
+            self.handles.append(handle)
+        return handle
+
+    def started(self):
+        with self.lock:
+            return [handle.source for handle in self.handles]
+
+
+class DictCache:
+    def __init__(self):
+        self.results = {}
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def put(self, key, result):
+        self.results[key] = result
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not reached in time")
+        time.sleep(0.01)
+
+
+class RunQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool(size=1)
+        self.cache = DictCache()
+        self.queue = RunQueue(self.pool, max_pending=4, max_pending_per_user=2, cache=self.cache)
+
+    def finish_next(self, count=1):
+        """Finish the oldest unfinished run(s) and wait for the dispatcher to start the next."""
+        for _ in range(count):
+            started = len(self.pool.started())
+            handle = next(h for h in self.pool.handles if h.result is None)
+            handle.finish()
+            wait_until(lambda: len(self.pool.started()) > started or not self.queue.stats()["pending"])
+
+    def test_runs_complete_with_their_result(self):
+        run_id = self.queue.submit("alice", "a1")
+        wait_until(lambda: self.queue.status(run_id)["state"] == "running")
+        self.pool.handles[0].finish()
+        wait_until(lambda: self.queue.status(run_id)["state"] == "done")
+        status = self.queue.status(run_id)
+        self.assertEqual(status["result"]["stdout"], "a1\n")
+        self.assertEqual(status["output_files"], ("/spool/a1/stdout.txt", "/spool/a1/stderr.txt"))
+        self.assertFalse(self.pool.handles[0].cleaned_up)  # Kept for the session to copy the full output
+        self.queue.forget(run_id)
+        self.assertIsNone(self.queue.status(run_id))
+        self.assertTrue(self.pool.handles[0].cleaned_up)
+
+    def test_uncollected_results_expire_with_their_output_files(self):
+        run_id = self.queue.submit("alice", "a1")
+        wait_until(lambda: self.queue.status(run_id)["state"] == "running")
+        with mock.patch.object(run_queue, "FINISHED_RUN_TTL", 0):
+            self.pool.handles[0].finish()
+            self.queue.submit("bob", "b1")  # Wakes the dispatcher, which expires finished runs
+            wait_until(lambda: self.pool.handles[0].cleaned_up)
+        self.assertIsNone(self.queue.status(run_id))
+
+    def test_users_take_turns(self):
+        first = self.queue.submit("alice", "a1")
+        wait_until(lambda: self.queue.status(first)["state"] == "running")
+        self.queue.submit("alice", "a2")
+        self.queue.submit("alice", "a3")
+        self.queue.submit("bob", "b1")
+        self.finish_next(3)
+        self.assertEqual(self.pool.started(), ["a1", "a2", "b1", "a3"])
+
+    def test_pending_limits(self):
+        first = self.queue.submit("alice", "a1")
+        wait_until(lambda: self.queue.status(first)["state"] == "running")
+        self.queue.submit("alice", "a2")
+        self.queue.submit("alice", "a3")
+        with self.assertRaises(QueueFullError):
+            self.queue.submit("alice", "a4")
+        self.queue.submit("bob", "b1")
+        self.queue.submit("bob", "b2")
+        with self.assertRaises(QueueFullError):
+            self.queue.submit("carol", "c1")
+
+    def test_queued_run_can_be_cancelled(self):
+        first = self.queue.submit("alice", "a1")
+        wait_until(lambda: self.queue.status(first)["state"] == "running")
+        second = self.queue.submit("bob", "b1")
+        self.assertEqual(self.queue.status(second), {"state": "queued", "run_id": second, "position": 0})
+        self.assertTrue(self.queue.cancel(second))
+        self.assertTrue(self.queue.status(second)["result"]["cancelled"])
+        self.finish_next()
+        self.assertEqual(self.pool.started(), ["a1"])
+
+    def test_cache_hits_skip_the_pool(self):
+        run_id = self.queue.submit("alice", "a1", cache_key="k")
+        wait_until(lambda: self.queue.status(run_id)["state"] == "running")
+        self.pool.handles[0].finish()
+        wait_until(lambda: self.queue.status(run_id)["state"] == "done")
+        hit = self.queue.submit("alice", "a1", cache_key="k")
+        self.assertEqual(self.queue.status(hit)["result"]["stdout"], "a1\n")
+        self.assertEqual(self.pool.started(), ["a1"])
+
+    def test_failed_start_fails_the_run_and_keeps_dispatching(self):
+        self.pool.submit_error = RuntimeError("no worker")
+        failed = self.queue.submit("alice", "a1", cache_key="k")
+        wait_until(lambda: self.queue.status(failed)["state"] == "done")
+        self.assertIn("no worker", self.queue.status(failed)["result"]["stderr"])
+        self.assertNotIn("k", self.cache.results)
+
+        self.pool.submit_error = None
+        run_id = self.queue.submit("alice", "a2")
+        wait_until(lambda: self.queue.status(run_id)["state"] == "running")
+
+    def test_failed_poll_fails_the_run_and_keeps_dispatching(self):
+        failed = self.queue.submit("alice", "a1")
+        wait_until(lambda: self.queue.status(failed)["state"] == "running")
+        self.pool.handles[0].poll_error = OSError("spool gone")
+        wait_until(lambda: self.queue.status(failed)["state"] == "done")
+        self.assertIn("spool gone", self.queue.status(failed)["result"]["stderr"])
+        self.assertNotIn("output_files", self.queue.status(failed))  # The error is only in the result
+
+        run_id = self.queue.submit("alice", "a2")
+        wait_until(lambda: self.queue.status(run_id)["state"] == "running")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Tests for parameter sweep table parsing and result rows (run_sweep)"""
+
+import unittest
+
+from run_sweep import MAX_ROWS, OUTPUT_PREVIEW_CHARS, parse_env, parse_rows, result_row
+
+
+class ParseEnvTest(unittest.TestCase):
+    def test_pairs(self):
+        self.assertEqual(parse_env("MEDIACONVERT_METRICS=1 PRESET=hd"), {"MEDIACONVERT_METRICS": "1", "PRESET": "hd"})
+        self.assertEqual(parse_env(""), {})
+        self.assertEqual(parse_env(None), {})
+
+    def test_quoting(self):
+        self.assertEqual(parse_env("TITLE='My video' NOTE=\"a b\" EMPTY= EQ=a=b"),
+                         {"TITLE": "My video", "NOTE": "a b", "EMPTY": "", "EQ": "a=b"})
+        self.assertEqual(parse_env(r"PATH_PART=with\ space"), {"PATH_PART": "with space"})
+
+    def test_bad_pairs(self):
+        for text in ("NOVALUE", "=value", "1ABC=x", "BAD-NAME=x", "'SPACED NAME=x'", "KEY='unclosed"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_env(text)
+
+
+class ParseRowsTest(unittest.TestCase):
+    def test_rows(self):
+        params = parse_rows([
+            {"Arguments": "s3://in/a.mp4 --preset 'HD 1080p'", "Environment": "MEDIACONVERT_JOB_CACHE=0"},
+            {"Arguments": "  ", "Environment": ""},  # Blank rows are skipped but keep their number
+            {"Arguments": None, "Environment": "PRESET=sd"},
+        ])
+        self.assertEqual([p["index"] for p in params], [1, 3])
+        self.assertEqual(params[0]["argv"], ["s3://in/a.mp4", "--preset", "HD 1080p"])
+        self.assertEqual(params[0]["env_vars"], {"MEDIACONVERT_JOB_CACHE": "0"})
+        self.assertEqual((params[1]["argv"], params[1]["args"]), ([], ""))
+
+    def test_errors_name_the_row(self):
+        with self.assertRaisesRegex(ValueError, "Row 2: 'oops' is not a KEY=value pair"):
+            parse_rows([{"Arguments": "a.mp4"}, {"Arguments": "b.mp4", "Environment": "oops"}])
+        with self.assertRaisesRegex(ValueError, "Row 1"):
+            parse_rows([{"Arguments": "'unclosed"}])
+
+    def test_row_limits(self):
+        with self.assertRaisesRegex(ValueError, "at least one row"):
+            parse_rows([{"Arguments": "", "Environment": " "}])
+        rows = [{"Arguments": f"in{i}.mp4"} for i in range(MAX_ROWS)]
+        self.assertEqual(len(parse_rows(rows)), MAX_ROWS)
+        with self.assertRaisesRegex(ValueError, f"at most {MAX_ROWS} rows"):
+            parse_rows(rows + [{"Arguments": "one-too-many.mp4"}])
+
+
+class ResultRowTest(unittest.TestCase):
+    params = {"index": 4, "args": "a.mp4", "env": "PRESET=hd"}
+
+    def result(self, **overrides):
+        result = {"returncode": 0, "duration": 1.23456, "timed_out": False, "cancelled": False,
+                  "stdout": "Generated job\nSaved to out.json\n", "stderr": ""}
+        result.update(overrides)
+        return result
+
+    def test_finished_rows(self):
+        row = result_row(self.params, None, self.result())
+        self.assertEqual(row, {"row": 4, "arguments": "a.mp4", "environment": "PRESET=hd", "status": "ok",
+                               "exit_code": 0, "duration_s": 1.235, "output": "Saved to out.json"})
+        failed = result_row(self.params, None, self.result(returncode=1, stderr="Traceback\nValueError: bad\n"))
+        self.assertEqual((failed["status"], failed["output"]), ("failed", "ValueError: bad"))
+        self.assertEqual(result_row(self.params, None, self.result(timed_out=True))["status"], "timed out")
+        self.assertEqual(result_row(self.params, None, self.result(cancelled=True))["status"], "cancelled")
+
+    def test_unfinished_rows_and_long_output(self):
+        row = result_row(self.params, "running", elapsed=2.5)
+        self.assertEqual((row["status"], row["duration_s"], row["exit_code"]), ("running", 2.5, None))
+        long_line = result_row(self.params, None, self.result(stdout="x" * 500))["output"]
+        self.assertEqual(len(long_line), OUTPUT_PREVIEW_CHARS)
+        self.assertTrue(long_line.endswith("…"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the pre-warmed worker pool (script_runner.WorkerPool)"""
+
+import os
+import time
+import unittest
+
+from script_runner import WorkerPool, WorkerUnavailableError, _read_tail
+
+
+class WorkerPoolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = WorkerPool(size=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_captures_output_and_exit_code(self):
+        result = self.pool.run("import sys\nprint('out')\nprint('err', file=sys.stderr)\nsys.exit(3)")
+        self.assertEqual(result["stdout"], "out\n")
+        self.assertEqual(result["stderr"], "err\n")
+        self.assertEqual(result["returncode"], 3)
+        self.assertFalse(result["timed_out"])
+
+    def test_exception_traceback_starts_in_the_script(self):
+        result = self.pool.run("def main():\n    raise ValueError('boom')\n\nmain()")
+        self.assertEqual(result["returncode"], 1)
+        self.assertIn("ValueError: boom", result["stderr"])
+        self.assertNotIn("runpy", result["stderr"])
+
+    def test_output_of_child_processes_is_captured(self):
+        result = self.pool.run("import os\nos.system('echo from-shell')")
+        self.assertEqual(result["stdout"], "from-shell\n")
+
+    def test_argv_and_env_apply_to_one_run(self):
+        source = "import os, sys\nprint(sys.argv[1:], os.environ.get('MEDIACONVERT_TEST_SETTING'))"
+        result = self.pool.run(source, argv=["in.mp4", "--preset", "hd"], env={"MEDIACONVERT_TEST_SETTING": "on"})
+        self.assertEqual(result["stdout"], "['in.mp4', '--preset', 'hd'] on\n")
+        self.assertEqual(self.pool.run(source)["stdout"], "[] None\n")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "runs share the worker without fork")
+    def test_runs_do_not_leak_state(self):
+        self.pool.run("import json\njson.leaked = True\nimport os\nos.environ['LEAKED'] = '1'")
+        result = self.pool.run("import json, os\nprint(hasattr(json, 'leaked'), 'LEAKED' in os.environ)")
+        self.assertEqual(result["stdout"], "False False\n")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "job helpers are only re-imported per run with fork")
+    def test_job_helpers_read_the_run_environment(self):
+        source = "import job_metrics\nprint(job_metrics.ENABLED)"
+        self.assertEqual(self.pool.run(source, env={"MEDIACONVERT_METRICS": "1"})["stdout"], "True\n")
+        self.assertEqual(self.pool.run(source)["stdout"], "False\n")
+
+    def test_timeout_kills_the_run(self):
+        started = time.monotonic()
+        result = self.pool.run("import time\nprint('started', flush=True)\ntime.sleep(30)", timeout=1)
+        self.assertTrue(result["timed_out"])
+        self.assertIsNone(result["returncode"])
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(self.pool.run("print('next')")["stdout"], "next\n")  # The pool recovered
+
+    def test_cancel(self):
+        handle = self.pool.submit("import time\ntime.sleep(30)")
+        try:
+            self.assertIsNone(handle.poll())
+            self.assertTrue(handle.cancel())
+            self.assertTrue(handle.result["cancelled"])
+            self.assertFalse(handle.cancel())
+        finally:
+            handle.cleanup()
+
+    def test_repeat_with_baseline_alternates_in_one_worker(self):
+        result = self.pool.run("print('current')", repeat=3, baseline="print('baseline')")
+        self.assertEqual(result["stdout"], "current\n")  # Baseline output is discarded
+        self.assertEqual(len(result["iterations"]), 3)
+        self.assertEqual(len(result["baseline_iterations"]), 3)
+        self.assertTrue(all(i["returncode"] == 0 for i in result["iterations"] + result["baseline_iterations"]))
+
+    def test_output_deleted_while_reading(self):
+        handle = self.pool.submit("print('done')")
+        handle.wait()
+        handle.cleanup()
+        self.assertEqual(handle.read_output(), ("", ""))
+        self.assertEqual(_read_tail(os.path.join(handle.spool_dir, "missing.txt"), 10), "")
+
+    def test_acquire_timeout_when_every_worker_is_busy(self):
+        handle = self.pool.submit("import time\ntime.sleep(30)")
+        try:
+            with self.assertRaises(WorkerUnavailableError):
+                self.pool.submit("print('never')", acquire_timeout=0.2)
+        finally:
+            handle.cancel()
+            handle.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the trigram search index (search_index.TrigramIndex)"""
+
+import os
+import re
+import tempfile
+import unittest
+
+from file_index import FileIndex
+from search_index import TrigramIndex, _required_literals
+
+FILES = {
+    "handler.py": "def handler(event):\n    return foo_bar(event)\n",
+    "presets.py": "PRESETS = {'hd': 1080, 'sd': 480}\nBAR = 'bar'\n",
+    "convert.py": "import foo\nfoo.convert('in.mp4')\nprint('FOOBAR')\n",
+    "tools/paths.py": "OUTPUT = 'out.py'\nPATTERN = r'\\d+'\nacbc = 'bc'\n",
+    "tools/empty.py": "",
+}
+
+PATTERNS = [
+    "foo", "a|b", "foo|bar", "hand|preset", "(foo)?bar", "(foo)?_bar", "[ab]c", "[hs]d",
+    "(?i)foobar", "(?i:FOO)bar", "(?i)BAR|hand", r"out\.py", r"\\d\+", r"in\.mp4'\)", r"\bfoo\b",
+    "fo+_bar", "re?turn", "x*foo", "foo{0}bar", "^def", "PRE.ETS", "BAR|",
+]
+
+
+class RequiredLiteralsTest(unittest.TestCase):
+    def test_required_runs(self):
+        self.assertEqual(_required_literals("foo.*bar"), ["foo", "bar"])
+        self.assertEqual(_required_literals("ab+c"), [])  # "ab" is too short to narrow by
+        self.assertEqual(_required_literals("abb+c"), ["abb"])
+        self.assertEqual(_required_literals(r"out\.py"), ["out.py"])
+
+    def test_optional_and_alternative_parts_are_not_required(self):
+        expected = {"a|b": [], "foo|bar": [], "(foo)?bar": ["bar"], "[ab]cde": ["cde"],
+                    "x*foo": ["foo"], "foo{0}bar": ["bar"], "(?i:foo)bar": ["bar"]}
+        for pattern, literals in expected.items():
+            self.assertEqual(_required_literals(pattern), literals, pattern)
+
+    def test_invalid_pattern(self):
+        self.assertEqual(_required_literals("(unclosed"), [])
+
+
+class TrigramIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for relpath, text in FILES.items():
+            path = os.path.join(self.tmp.name, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(text)
+        self.file_index = FileIndex(self.tmp.name)
+        self.index = TrigramIndex(self.tmp.name)
+        self.index.sync(self.file_index)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def brute_force(self, pattern, case_sensitive):
+        matcher = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+        return [{"file": relpath, "line": number, "text": line}
+                for relpath in sorted(FILES)
+                for number, line in enumerate(FILES[relpath].splitlines(), 1) if matcher.search(line)]
+
+    def test_regex_results_match_a_full_scan(self):
+        for pattern in PATTERNS:
+            for case_sensitive in (False, True):
+                with self.subTest(pattern=pattern, case_sensitive=case_sensitive):
+                    self.assertEqual(self.index.search(pattern, regex=True, case_sensitive=case_sensitive),
+                                     self.brute_force(pattern, case_sensitive))
+
+    def test_substring_search(self):
+        for query in ("foo", "FOO", "bc", "'hd'"):
+            for case_sensitive in (False, True):
+                with self.subTest(query=query, case_sensitive=case_sensitive):
+                    self.assertEqual(self.index.search(query, case_sensitive=case_sensitive),
+                                     self.brute_force(re.escape(query), case_sensitive))
+
+    def test_invalid_regex_raises(self):
+        with self.assertRaises(re.error):
+            self.index.search("(unclosed", regex=True)
+
+    def test_sync_skips_the_full_check_until_the_listing_changes(self):
+        with open(os.path.join(self.tmp.name, "handler.py"), 'a') as f:
+            f.write("# rewritten in place\n")
+        self.assertEqual(self.index.sync(self.file_index), 0)  # Listing unchanged and checked just now
+        self.assertEqual(self.index.sync(self.file_index, force=True), 1)
+        self.assertEqual(len(self.index.search("rewritten in place")), 1)
+
+        with open(os.path.join(self.tmp.name, "new.py"), 'w') as f:
+            f.write("rewritten elsewhere\n")
+        self.file_index.invalidate("new.py")
+        self.assertEqual(self.index.sync(self.file_index), 1)
+        self.assertEqual(len(self.index.search("rewritten")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
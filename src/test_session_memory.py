@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Tests for budgeted editor buffers and spooled run output (session_memory)"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from session_memory import OutputSpool, SessionMemory
+
+
+def incompressible(size):
+    return os.urandom(size // 2).hex()
+
+
+class SessionMemoryTest(unittest.TestCase):
+    def test_idle_buffers_are_compressed_before_anything_is_released(self):
+        memory = SessionMemory(budget_bytes=150_000, idle_seconds=0, compress_min_bytes=1000)
+        memory.set("a", "a = 1\n" * 20_000)
+        memory.set("b", "b = 2\n" * 20_000)
+        stats = memory.stats()
+        self.assertEqual((stats["sessions"], stats["compressed_sessions"]), (2, 1))
+        self.assertLessEqual(stats["resident_bytes"] + stats["compressed_bytes"], 150_000)
+        self.assertEqual(memory.get("a"), "a = 1\n" * 20_000)
+        self.assertEqual(memory.get("b"), "b = 2\n" * 20_000)
+
+    def test_active_buffers_are_left_alone(self):
+        memory = SessionMemory(budget_bytes=1000, idle_seconds=300)
+        memory.set("a", "x" * 10_000)
+        memory.set("b", "y" * 10_000)
+        self.assertEqual(memory.stats()["compressed_sessions"], 0)
+        self.assertEqual(memory.get("a"), "x" * 10_000)
+
+    def test_longest_idle_buffers_are_evicted_when_compressing_is_not_enough(self):
+        memory = SessionMemory(budget_bytes=70_000, idle_seconds=0, compress_min_bytes=1000)
+        first, second = incompressible(100_000), incompressible(100_000)
+        memory.set("a", first)
+        memory.set("b", second)
+        self.assertIsNone(memory.get("a"))
+        self.assertEqual(memory.get("b"), second)
+
+    def test_shared_unchanged_file_is_counted_once(self):
+        memory = SessionMemory(budget_bytes=150_000, idle_seconds=0, compress_min_bytes=1000)
+        cached = "print('shared')\n" * 6250
+        for session_id in ("a", "b", "c"):
+            memory.set(session_id, cached, shared=True)
+        stats = memory.stats()
+        self.assertEqual((stats["sessions"], stats["shared_bytes"], stats["compressed_sessions"]), (3, 100_000, 0))
+
+        memory.set("d", "edited = True\n" * 7000)  # Over budget only together with the unshared buffer
+        stats = memory.stats()
+        self.assertEqual(stats["sessions"], 4)
+        self.assertEqual(stats["compressed_sessions"], 1)  # The unshared buffer, never the shared copy
+        self.assertEqual(memory.get("b"), cached)
+
+    def test_ended_and_abandoned_sessions_are_released(self):
+        memory = SessionMemory(max_idle_seconds=3600, is_active=lambda session_id: session_id != "closed")
+        memory.set("open", "a")
+        memory.set("closed", "b")
+        self.assertEqual(memory.release_inactive(), 1)
+        self.assertIsNone(memory.get("closed"))
+        memory.max_idle_seconds = 0
+        self.assertEqual(memory.release_inactive(), 1)
+        self.assertEqual(memory.stats()["sessions"], 0)
+
+
+class OutputSpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = OutputSpool(os.path.join(self.tmp.name, "spool"), cap_bytes=100, page_bytes=64)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_all(self, handle):
+        return "".join(self.spool.page(handle, i) for i in range(self.spool.page_count(handle)))
+
+    def test_small_output_stays_in_memory(self):
+        handle = self.spool.store("done\n")
+        self.assertEqual(handle, {"text": "done\n"})
+        self.assertEqual(self.spool.page_count(handle), 1)
+
+    def test_large_output_is_paged_from_disk(self):
+        text = "".join(f"line {i}\n" for i in range(100))
+        handle = self.spool.store(text)
+        self.assertGreater(self.spool.page_count(handle), 1)
+        self.assertEqual(self.read_all(handle), text)
+        self.spool.discard(handle)
+        self.assertFalse(os.path.exists(handle["path"]))
+        self.assertEqual(self.spool.page_count(handle), 0)
+
+    def test_parts_copy_whole_files(self):
+        stdout = Path(self.tmp.name, "stdout.txt")
+        stdout.write_text("".join(f"out {i}\n" for i in range(1000)))
+        handle = self.spool.store_parts(["STDOUT:\n", stdout, "\n\nSTDERR:\n", "boom\n"])
+        self.assertEqual(handle["size"], os.path.getsize(handle["path"]))
+        self.assertEqual(self.read_all(handle), "STDOUT:\n" + stdout.read_text() + "\n\nSTDERR:\nboom\n")
+
+        small = Path(self.tmp.name, "small.txt")
+        small.write_text("ok\n")
+        self.assertEqual(self.spool.store_parts(["STDOUT:\n", small]), {"text": "STDOUT:\nok\n"})
+
+    def test_missing_file_leaves_no_spool_file(self):
+        stdout = Path(self.tmp.name, "stdout.txt")
+        stdout.write_text("x" * 1000)
+        parts = [stdout, Path(self.tmp.name, "missing.txt")]
+        with self.assertRaises(OSError):
+            self.spool.store_parts(parts)
+        self.assertEqual(os.listdir(self.spool.spool_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests for delta-compressed file snapshots (snapshot_store.SnapshotStore)"""
+
+import os
+import tempfile
+import unittest
+
+from history_store import HistoryStore
+from snapshot_store import SnapshotStore, apply_delta, content_hash, make_delta
+
+
+def numbered_lines(count, changed=()):
+    return "".join(f"changed line {i}\n" if i in changed else f"line {i} of the handler\n" for i in range(count))
+
+
+class DeltaTest(unittest.TestCase):
+    def test_round_trip(self):
+        base = ["a\n", "b\n", "c\n", "d\n"]
+        for lines in (["a\n", "x\n", "c\n", "d\n"], [], ["d\n", "a\n"], base + ["e\n"], ["only\n"]):
+            self.assertEqual(apply_delta(base, make_delta(base, lines)), lines)
+
+
+class SnapshotStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "history.db")
+        self.store = SnapshotStore(self.db_path, max_chain_depth=3)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        text = numbered_lines(50)
+        digest = self.store.put(text)
+        self.assertEqual(digest, content_hash(text))
+        self.assertEqual(self.store.get(digest), text)
+        self.assertTrue(self.store.has(digest))
+        with self.assertRaises(KeyError):
+            self.store.get(content_hash("never stored"))
+
+    def test_identical_contents_are_stored_once(self):
+        text = numbered_lines(50)
+        self.store.put(text)
+        self.store.put(text)
+        self.assertEqual(self.store.stats()["snapshots"], 1)
+
+    def test_versions_are_deltas_with_capped_chains(self):
+        digests, base = [], None
+        for version in range(6):
+            base = self.store.put(numbered_lines(300, changed=range(version)), base)
+            digests.append(base)
+        stats = self.store.stats()
+        self.assertEqual(stats["snapshots"], 6)
+        self.assertEqual(stats["deltas"], 4)  # Versions 1-3 chain on 0; version 4 is a new keyframe
+        self.assertLess(stats["stored_bytes"], stats["original_bytes"] / 5)
+        for version, digest in enumerate(digests):
+            self.assertEqual(self.store.get(digest), numbered_lines(300, changed=range(version)))
+
+    def test_diff(self):
+        old = self.store.put("a\nb\n")
+        new = self.store.put("a\nc\n", old)
+        self.assertIn("-b\n+c\n", self.store.diff(old, new))
+
+    def test_prune_keeps_referenced_snapshots_and_their_bases(self):
+        history = HistoryStore(self.db_path, legacy_path=None)
+        try:
+            base = None
+            for version in range(3):
+                base = self.store.put(numbered_lines(300, changed=range(version)), base, history_entry={
+                    "filename": "handler.py", "user": "alice", "update_message": f"v{version}", "file_size": 1,
+                })
+            draft_base = base
+            orphan = self.store.put("not referenced\n")
+            history.clear()
+            referenced = self.store.put(numbered_lines(10), history_entry={
+                "filename": "other.py", "user": "alice", "update_message": "kept", "file_size": 1,
+            })
+
+            self.assertEqual(self.store.prune(keep={draft_base}), 1)
+            self.assertFalse(self.store.has(orphan))
+            self.assertEqual(self.store.get(draft_base), numbered_lines(300, changed=range(2)))
+            self.assertTrue(self.store.has(referenced))
+        finally:
+            history.close()
+
+
+if __name__ == "__main__":
+    unittest.main()